@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for Drive Master on simulated hardware.
+
+Builds synthetic block-device topologies (fake sysfs, udev data, mountinfo,
+lsblk -J output, sparse GPT/NTFS disk images) and stub sudo/mount/umount/mkdir/chown/mountpoint
+tools on a temporary PATH, then measures scan latency, subprocess count,
+peak memory and bulk mount/unmount throughput. Results are printed as JSON.
+
+    python3 benchmark.py --topology 1x1,10x4,100x4,500x8 --output bench.json
+"""
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import struct
+import time
+import tracemalloc
+import uuid
+import zlib
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+
+import click
+
+import mount_drive
+
+MAX_DISKS = 500
+MAX_PARTITIONS = 128
+DEFAULT_TOPOLOGIES = "1x1,10x4,50x4,100x8,500x4,20x128"
+
+STUB_SCRIPT = """#!/bin/sh
+echo "{name} $*" >> "$DRIVE_MASTER_BENCH_LOG"
+{body}
+"""
+
+STUBS = {
+    'sudo': '[ "$1" = -v ] && exit 0\nexec "$@"',
+    'lsblk': 'cat "$DRIVE_MASTER_BENCH_DIR/lsblk.json"',
+    'mount': 'sleep "$DRIVE_MASTER_BENCH_DELAY"',
+    'umount': 'sleep "$DRIVE_MASTER_BENCH_DELAY"',
+    'mkdir': 'exit 0',
+    'chown': 'exit 0',
+    'mountpoint': 'exit 1',
+}
+
+def disk_name(index):
+    """sda, sdb, ... sdz, sdaa, sdab, ... like the kernel names them"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('a') + rem) + letters
+    return f"sd{letters}"
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+GPT_BASIC_DATA = uuid.UUID('ebd0a0a2-b9e5-4433-87c0-68b6b72699c7').bytes_le
+GPT_ENTRIES = 128
+
+def ntfs_volume(sectors, serial, label):
+    """(boot sector, offset and bytes of MFT record 3 with the volume label) for a minimal NTFS volume"""
+    boot = bytearray(512)
+    boot[0:11] = b'\xebR\x90NTFS    '
+    struct.pack_into('<HB', boot, 11, 512, 8)
+    struct.pack_into('<QQQ', boot, 0x28, sectors - 1, 4, 8)
+    struct.pack_into('<bxxxbxxxQ', boot, 0x40, -10, 1, serial)
+    boot[510:512] = b'\x55\xaa'
+
+    record = bytearray(1024)
+    record[0:4] = b'FILE'
+    struct.pack_into('<HH', record, 4, 0x30, 3)
+    struct.pack_into('<H', record, 0x14, 0x38)
+    name = label.encode('utf-16-le')
+    length = (0x18 + len(name) + 7) // 8 * 8
+    struct.pack_into('<IIBBHHHIHBx', record, 0x38, 0x60, length, 0, 0, 0x18, 0, 0, len(name), 0x18, 0)
+    record[0x38 + 0x18:0x38 + 0x18 + len(name)] = name
+    struct.pack_into('<I', record, 0x38 + length, 0xFFFFFFFF)
+    # Update sequence: sector tails hold the USN, the array at 0x30 holds the real bytes
+    record[0x32:0x34], record[0x34:0x36] = record[510:512], record[1022:1024]
+    record[0x30:0x32] = record[510:512] = record[1022:1024] = b'\x01\x00'
+    return bytes(boot), 4 * 4096 + 3 * 1024, bytes(record)
+
+def gpt_header(disk_sectors, current, backup, entries_lba, entries_crc, disk_guid):
+    header = bytearray(struct.pack('<8sIIIIQQQQ16sQIII', b'EFI PART', 0x10000, 92, 0, 0, current, backup,
+                                   34, disk_sectors - 34, disk_guid, entries_lba, GPT_ENTRIES, 128, entries_crc))
+    struct.pack_into('<I', header, 16, zlib.crc32(header))
+    return bytes(header)
+
+def build_disk_image(path, disk_sectors, volumes):
+    """Sparse disk image: protective MBR, primary and backup GPT, one NTFS volume per (start, sectors, serial, label)"""
+    entries = bytearray(GPT_ENTRIES * 128)
+    for i, (start, sectors, serial, label) in enumerate(volumes):
+        struct.pack_into('<16s16sQQQ72s', entries, i * 128, GPT_BASIC_DATA, uuid.UUID(int=serial).bytes_le,
+                         start, start + sectors - 1, 0, label.encode('utf-16-le'))
+    crc = zlib.crc32(entries)
+    disk_guid = uuid.UUID(int=disk_sectors).bytes_le
+    mbr = bytearray(512)
+    struct.pack_into('<B3sB3sII', mbr, 446, 0, b'\x00\x02\x00', 0xEE, b'\xff\xff\xff', 1, min(disk_sectors - 1, 0xFFFFFFFF))
+    mbr[510:512] = b'\x55\xaa'
+    with open(path, 'wb') as f:
+        f.truncate(disk_sectors * 512)
+        f.write(mbr + gpt_header(disk_sectors, 1, disk_sectors - 1, 2, crc, disk_guid).ljust(512, b'\0') + entries)
+        f.seek((disk_sectors - 33) * 512)
+        f.write(entries + gpt_header(disk_sectors, disk_sectors - 1, 1, disk_sectors - 33, crc, disk_guid))
+        for start, sectors, serial, label in volumes:
+            boot, record_offset, record = ntfs_volume(sectors, serial, label)
+            f.seek(start * 512)
+            f.write(boot)
+            f.seek(start * 512 + record_offset)
+            f.write(record)
+
+def build_topology(root, disks, partitions, user):
+    """Create fake sysfs/udev/mountinfo trees, lsblk output and disk images"""
+    sys_block = os.path.join(root, 'sys', 'block')
+    sys_class = os.path.join(root, 'sys', 'class', 'block')
+    udev = os.path.join(root, 'udev')
+    os.makedirs(sys_block)
+    os.makedirs(sys_class)
+    os.makedirs(udev)
+
+    dev_dir = os.path.join(root, 'dev')
+    os.makedirs(dev_dir)
+    lsblk_devices = []
+    mountinfo = []
+    minor = 0
+    part_sectors = 2 * 1024 * 1024  # 1 GiB per partition
+
+    for d in range(disks):
+        name = disk_name(d)
+        usb = d % 2 == 0
+        bus = f"usb1/1-{d}" if usb else f"ata{d}"
+        disk_dir = os.path.join(root, 'sys', 'devices', 'pci0000:00', bus, f"host{d}", 'block', name)
+        disk_sectors = part_sectors * partitions + 4096
+        write(os.path.join(disk_dir, 'size'), f"{disk_sectors}\n")
+        write(os.path.join(disk_dir, 'removable'), "1\n" if usb else "0\n")
+        write(os.path.join(disk_dir, 'dev'), f"8:{minor}\n")
+        write(os.path.join(disk_dir, 'device', 'model'), "Bench Stick\n")
+        os.symlink(disk_dir, os.path.join(sys_block, name))
+        os.symlink(disk_dir, os.path.join(sys_class, name))
+        minor += 1
+
+        children = []
+        volumes = []
+        for p in range(1, partitions + 1):
+            part = f"{name}{p}"
+            part_dir = os.path.join(disk_dir, part)
+            devnum = f"8:{minor}"
+            minor += 1
+            write(os.path.join(part_dir, 'partition'), f"{p}\n")
+            write(os.path.join(part_dir, 'size'), f"{part_sectors}\n")
+            write(os.path.join(part_dir, 'dev'), f"{devnum}\n")
+            os.symlink(part_dir, os.path.join(sys_class, part))
+            uuid = f"{d:04X}{p:04X}"
+            label = f"BENCH_{d}_{p}"
+            write(os.path.join(udev, f"b{devnum}"),
+                  f"E:ID_FS_TYPE=ntfs\nE:ID_FS_UUID={uuid}\nE:ID_FS_LABEL={label}\n"
+                  f"E:ID_FS_LABEL_ENC={label}\nE:ID_PART_ENTRY_TYPE=ebd0a0a2-b9e5-4433-87c0-68b6b72699c7\n")
+            volumes.append((2048 + (p - 1) * part_sectors, part_sectors, d << 16 | p, label))
+            mountpoint = None
+            # Mount every other partition so both mount and unmount paths have work
+            if p % 2 == 0:
+                mountpoint = f"/media/{user}/{label}"
+                mountinfo.append(f"{100 + minor} 1 0:{minor} / {mountpoint} rw,relatime - fuseblk /dev/{part} rw")
+            children.append({'name': part, 'size': '1G', 'type': 'part', 'tran': None, 'rm': usb,
+                             'model': None, 'fstype': 'ntfs', 'label': label, 'mountpoint': mountpoint, 'uuid': uuid})
+        build_disk_image(os.path.join(dev_dir, name), disk_sectors, volumes)
+        lsblk_devices.append({'name': name, 'size': f"{partitions}G", 'type': 'disk', 'tran': 'usb' if usb else 'sata',
+                              'rm': usb, 'model': 'Bench Stick', 'fstype': None, 'label': None, 'mountpoint': None,
+                              'uuid': None, 'children': children})
+
+    write(os.path.join(root, 'lsblk.json'), json.dumps({'blockdevices': lsblk_devices}))
+    write(os.path.join(root, 'mountinfo'), "\n".join(mountinfo) + "\n")
+
+def install_stubs(bin_dir):
+    os.makedirs(bin_dir, exist_ok=True)
+    for name, body in STUBS.items():
+        path = os.path.join(bin_dir, name)
+        write(path, STUB_SCRIPT.format(name=name, body=body))
+        os.chmod(path, 0o755)
+
+@contextmanager
+def simulated_system(root, mount_delay):
+    """Point Drive Master at the fake trees and stub tools"""
+    saved_env = dict(os.environ)
+    saved = {key: getattr(mount_drive, key) for key in ('SYS_BLOCK', 'SYS_CLASS_BLOCK', 'UDEV_DATA', 'DEV_DIR', 'BOOT_ID_PATH',
+                                                        '_mount_table', '_inventory', 'check_block_device')}
+    bin_dir = os.path.join(root, 'bin')
+    install_stubs(bin_dir)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+    os.environ['DRIVE_MASTER_BENCH_LOG'] = os.path.join(root, 'calls.log')
+    os.environ['DRIVE_MASTER_BENCH_DIR'] = root
+    os.environ['DRIVE_MASTER_BENCH_DELAY'] = str(mount_delay)
+    os.environ.pop('DRIVE_MASTER_HELPER', None)
+    os.environ['XDG_RUNTIME_DIR'] = os.path.join(root, 'run')
+    write(os.path.join(root, 'boot_id'), "bench\n")
+    mount_drive.BOOT_ID_PATH = os.path.join(root, 'boot_id')
+    mount_drive.SYS_BLOCK = os.path.join(root, 'sys', 'block')
+    mount_drive.SYS_CLASS_BLOCK = os.path.join(root, 'sys', 'class', 'block')
+    mount_drive.UDEV_DATA = os.path.join(root, 'udev')
+    mount_drive.DEV_DIR = os.path.join(root, 'dev')
+    mount_drive._mount_table = mount_drive.MountTable(os.path.join(root, 'mountinfo'))
+    mount_drive._inventory = mount_drive.DriveInventory()
+    # The fake /dev nodes are image files: let mounts by device path through the block-device check
+    mount_drive.check_block_device = lambda path: path
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+        for key, value in saved.items():
+            setattr(mount_drive, key, value)
+
+def take_calls(root):
+    """Number of stub tool invocations since the last call, resetting the log"""
+    log = os.path.join(root, 'calls.log')
+    if not os.path.exists(log):
+        return 0
+    with open(log) as f:
+        count = sum(1 for _ in f)
+    os.remove(log)
+    return count
+
+def measure(root, fn, *args):
+    """Run fn once; returns (result, seconds, subprocess count)"""
+    take_calls(root)
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, take_calls(root)
+
+def peak_memory(fn, *args):
+    """Peak Python allocation while running fn (separate run: tracemalloc skews timing)"""
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def run_topology(disks, partitions, mount_delay, workers):
+    root = tempfile.mkdtemp(prefix='drive-master-bench-')
+    user = mount_drive.get_user()
+    try:
+        build_topology(root, disks, partitions, user)
+        with simulated_system(root, mount_delay):
+            report = {'disks': disks, 'partitions_per_disk': partitions, 'devices': disks * partitions}
+
+            disk_paths = [f"/dev/{disk_name(d)}" for d in range(disks)]
+            for key, fn, args in (('scan_probe_lsblk', mount_drive.get_probe_lsblk_drives, ()),
+                                  ('scan_sysfs', mount_drive.get_sysfs_drives, ()),
+                                  ('probe_partition_tables', mount_drive.probe_disks, (disk_paths,))):
+                drives, elapsed, calls = measure(root, fn, *args)
+                report[key] = {'seconds': elapsed, 'subprocesses': calls, 'peak_bytes': peak_memory(fn, *args), 'found': len(drives)}
+
+            inventory = mount_drive.get_inventory()
+            inventory.get()
+            _, elapsed, calls = measure(root, inventory.get)
+            report['inventory_cached_get'] = {'seconds': elapsed, 'subprocesses': calls}
+
+            # Cold start: a fresh inventory seeded from the snapshot the scan above saved, up to the menu
+            def first_menu():
+                cold = mount_drive.DriveInventory()
+                cold.load_snapshot()
+                mount_drive.print_main_menu()
+                return cold.drives
+            with redirect_stdout(io.StringIO()):
+                loaded, elapsed, calls = measure(root, first_menu)
+            report['first_menu_snapshot'] = {'seconds': elapsed, 'subprocesses': calls, 'found': len(loaded)}
+
+            drives = inventory.get()
+            for key, compact in (('render_listing', False), ('render_table', True)):
+                out = io.StringIO()
+                with redirect_stdout(out):
+                    view = mount_drive.ListView(compact=compact, page_size=0)
+                    _, elapsed, calls = measure(root, mount_drive.show_drive_list, drives, view)
+                report[key] = {'seconds': elapsed, 'subprocesses': calls, 'bytes': len(out.getvalue().encode())}
+
+            unmounted = {p: d for p, d in drives.items() if not mount_drive.is_drive_mounted(d)}
+            results, elapsed, calls = measure(root, mount_drive.mount_all_parallel, unmounted, workers)
+            report['mount_all'] = {'seconds': elapsed, 'subprocesses': calls, 'drives': len(results),
+                                   'drives_per_second': len(results) / elapsed if elapsed else None,
+                                   'failed': sum(1 for r in results if r['status'] == 'failed')}
+
+            targets = mount_drive.get_unmount_targets(drives)
+            results, elapsed, calls = measure(root, mount_drive.unmount_in_order, targets, workers)
+            report['unmount_all'] = {'seconds': elapsed, 'subprocesses': calls, 'drives': len(results),
+                                     'drives_per_second': len(results) / elapsed if elapsed else None,
+                                     'failed': sum(1 for r in results if r['status'] != 'unmounted')}
+            return report
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def parse_topologies(text):
+    topologies = []
+    for item in text.split(','):
+        disks, _, partitions = item.strip().partition('x')
+        disks, partitions = int(disks), int(partitions or 1)
+        if not (1 <= disks <= MAX_DISKS and 1 <= partitions <= MAX_PARTITIONS):
+            raise click.BadParameter(f"{item}: need 1-{MAX_DISKS} disks and 1-{MAX_PARTITIONS} partitions")
+        topologies.append((disks, partitions))
+    return topologies
+
+@click.command()
+@click.option('--topology', default=DEFAULT_TOPOLOGIES, show_default=True,
+              help="Comma-separated DISKSxPARTITIONS topologies to simulate")
+@click.option('--mount-delay', type=float, default=0.005, show_default=True,
+              help="Seconds each stub mount/umount takes")
+@click.option('--workers', type=int, default=mount_drive.DEFAULT_WORKERS, show_default=True,
+              help="Parallel workers for bulk mount/unmount")
+@click.option('--output', type=click.Path(dir_okay=False), help="Write JSON here instead of stdout")
+def main(topology, mount_delay, workers, output):
+    """Benchmark drive scanning and bulk operations on simulated hardware"""
+    results = {
+        'version': mount_drive.VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'mount_delay': mount_delay,
+        'workers': workers,
+        'runs': [],
+    }
+    for disks, partitions in parse_topologies(topology):
+        print(f"⏱️  {disks} disk(s) x {partitions} partition(s)...", file=sys.stderr)
+        results['runs'].append(run_topology(disks, partitions, mount_delay, workers))
+
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + "\n")
+        print(f"✅ Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
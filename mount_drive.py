@@ -4,10 +4,225 @@ import os
 import sys
 import time
 import shutil
+import select
+import socket
+import struct
+import ctypes
+import threading
+import asyncio
+import signal
+import json
+import base64
+import stat
+import atexit
+import tempfile
+import functools
+import mmap
+import random
+import errno
+import zlib
+import queue
+import fcntl
+import bisect
+from contextlib import contextmanager
+import re
+import pwd
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 
 VERSION = "3.2.0"
 
+# Kernel/udev sources used by the native drive scanner
+SYS_BLOCK = '/sys/block'
+UDEV_DATA = '/run/udev/data'
+MOUNTINFO = '/proc/self/mountinfo'
+MEMINFO = '/proc/meminfo'
+SYS_CLASS_BLOCK = '/sys/class/block'
+DISK_BY_UUID = '/dev/disk/by-uuid'
+DISK_BY_LABEL = '/dev/disk/by-label'
+DISK_BY_PARTLABEL = '/dev/disk/by-partlabel'
+
+# Native prober: bytes read per disk head / volume head, and devices never probed (optical)
+DEV_DIR = '/dev'
+PROBE_HEAD_BYTES = 32 << 10
+PROBE_FS_BYTES = 8 << 10
+# Filesystems that can sit directly on LBA 0 of a disk with no partition table
+SUPERFLOPPY_TYPES = ('vfat', 'ntfs', 'exfat')
+PROBE_SKIP_PREFIXES = ('sr', 'ram', 'zram')
+GPT_SIGNATURE = b'EFI PART'
+MBR_EXTENDED_TYPES = (0x05, 0x0f, 0x85)
+MBR_MAX_LOGICAL = 128
+EXT_MAGIC = 0xEF53
+EXT4_INCOMPAT = 0x40 | 0x80 | 0x200  # extents, 64bit, flex_bg
+EXT4_RO_COMPAT = 0x8 | 0x10 | 0x400  # huge_file, gdt_csum, metadata_csum
+
+# Scanning: seconds a disk probe may take before the disk is reported unresponsive (default for
+# DRIVE_MASTER_SCAN_DEADLINE), probe threads
+SCAN_DEADLINE = 3.0
+SCAN_WORKERS = 16
+SCAN_IDLE_EXIT = 30.0
+
+# Drive listing: lines per detailed card
+CARD_LINES = 9
+
+# Last scan, reloaded at startup while a background rescan runs; only valid for the same boot
+SNAPSHOT_FILE = 'inventory.json'
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+
+# Hotplug notification sources
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+UEVENT_UDEV_GROUP = 2
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+
+# Exit codes for the scripted subcommands
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_NOT_FOUND = 3
+EXIT_BUSY = 4
+
+# Parallelism for bulk operations (override with DRIVE_MASTER_WORKERS)
+DEFAULT_WORKERS = 8
+
+# Live progress rows: redraw interval, bar width; output lines kept from streamed commands
+PROGRESS_REDRAW = 0.1
+PROGRESS_BAR = 20
+STREAM_TAIL_LINES = 20
+
+# Batch formatting: default label template, mkfs progress ('12/80', '42%', '42 percent'), never-format mounts
+FORMAT_LABEL_TEMPLATE = 'DRIVE{n:02d}'
+MKFS_PROGRESS = re.compile(r'(\d+)\s*/\s*(\d+)|(\d+(?:\.\d+)?)\s*(?:%|percent)')
+SYSTEM_MOUNTS = ('/', '/boot', '/boot/efi', '/home', '/usr', '/var')
+# Longest label (UTF-8 bytes) a filesystem stores; mke2fs silently cuts longer ones (FAT labels are cut to 11 here)
+FORMAT_LABEL_BYTES = {'ext4': 16}
+
+# Format profiles: extra mkfs flags per filesystem. 'fast' also TRIMs SSDs first (so mke2fs skips its own
+# discard), 'throughput' uses large clusters/allocation units, 'compat' keeps the tools' defaults.
+FORMAT_PROFILES = {
+    'fast': {
+        'vfat': ('-F', '32'),
+        'ntfs': ('-f',),
+        'ext4': ('-E', 'lazy_itable_init=1,lazy_journal_init=1,nodiscard'),
+    },
+    'throughput': {
+        'vfat': ('-F', '32'),
+        'ntfs': ('-f', '-c', '65536'),
+        'ext4': ('-T', 'largefile', '-E', 'lazy_itable_init=1,lazy_journal_init=1'),
+    },
+    'compat': {
+        'vfat': ('-F', '32'),
+        'ntfs': ('-f',),
+        'ext4': (),
+    },
+}
+FORMAT_PROFILE_HELP = {
+    'fast': "quick format, lazy ext4 inode tables, TRIM SSDs first",
+    'throughput': "large clusters for video/disk images (64K FAT32/NTFS, 1 ext4 inode per MiB)",
+    'compat': "tool defaults, readable everywhere",
+}
+FORMAT_DISCARD_PROFILES = ('fast',)
+# FAT32 cluster bytes for the throughput profile by minimum volume size (smaller volumes keep the default)
+FAT_THROUGHPUT_CLUSTERS = ((32 << 30, 64 << 10), (8 << 30, 32 << 10))
+FORMAT_TIMES_FILE = 'format-times.json'
+FORMAT_TIME_SAMPLES = 20
+
+# Speed probe: temp file size, block sizes, random-read budget and concurrency cap
+SPEED_CACHE_FILE = 'speed.json'
+SPEED_TEST_BYTES = 64 << 20
+SPEED_BLOCK = 1 << 20
+SPEED_ALIGN = 4096
+SPEED_RANDOM_OPS = 2000
+SPEED_RANDOM_SECONDS = 3.0
+SPEED_MAX_WORKERS = 4
+
+# Capacity check: probe block, sample count, bisection resolution; offsets below MIN_ALIAS are never written
+CAPACITY_MAGIC = b'DMCAPCHK'
+CAPACITY_BLOCK = 4096
+CAPACITY_SAMPLES = 64
+CAPACITY_MIN_ALIAS = 1 << 20
+CAPACITY_RESOLUTION = 1 << 20
+
+# Secure wipe: block ioctls (linux/fs.h), ioctl range per call, overwrite buffer and threads per device,
+# read-back samples. A plain discard is no erase (trimmed blocks may still read back), so it is not offered.
+BLKSECDISCARD = 0x127d
+BLKZEROOUT = 0x127f
+WIPE_IOCTLS = {'secdiscard': BLKSECDISCARD, 'zeroout': BLKZEROOUT}
+WIPE_METHODS = ('auto', 'secdiscard', 'zeroout', 'zeros', 'random')
+WIPE_IOCTL_CHUNK = 1 << 30
+WIPE_BLOCK = 4 << 20
+WIPE_THREADS = 4
+WIPE_VERIFY_BLOCK = 4096
+WIPE_VERIFY_SAMPLES = 256
+
+# Surface scan: sequential read size, bad-block map file, and the unit of each mkfs's -l bad-block list
+SURFACE_BLOCK = 4 << 20
+SURFACE_SECTOR = 512
+BADBLOCKS_FILE = 'badblocks.json'
+BADBLOCK_LIST_UNITS = {'ext4': 4096, 'vfat': 1024}
+
+# Recovery imaging (ddrescue-style): first-pass and trim read sizes, skip growth on read errors, sector retry
+# passes, how often the map is saved, and where images go by default
+IMAGE_BLOCK = 1 << 20
+IMAGE_TRIM_BLOCK = 64 << 10
+IMAGE_SKIP_MAX = 64 << 20
+IMAGE_RETRIES = 1
+IMAGE_MAP_INTERVAL = 1.0
+IMAGE_DIR = '~/drive-master-recovery'
+
+# Hotplug daemon timing (seconds)
+DAEMON_DEBOUNCE = 0.5
+DAEMON_MAX_DELAY = 2.0
+DAEMON_PROBE_RETRIES = 3
+DAEMON_POLL_INTERVAL = 2.0
+
+# Privileged helper allow-list
+MEDIA_ROOT = '/media/'
+HELPER_OPS = ('mkdir', 'rmdir', 'chown', 'mount', 'umount', 'probe')
+HELPER_FSTYPES = ('ntfs-3g', 'ntfs3', 'ntfs', 'vfat', 'exfat', 'ext2', 'ext3', 'ext4')
+# Mount options the helper passes through (name or name=value); nosuid,nodev are always added
+HELPER_MOUNT_OPTIONS = ('ro', 'rw', 'noatime', 'relatime', 'nodiratime', 'lazytime', 'sync', 'flush', 'discard',
+                        'prealloc', 'big_writes', 'utf8', 'windows_names', 'noexec', 'nosuid', 'nodev')
+HELPER_MOUNT_VALUE_OPTIONS = ('uid', 'gid', 'umask', 'dmask', 'fmask', 'iocharset', 'codepage', 'errors')
+HELPER_FORCED_OPTIONS = ('nosuid', 'nodev')
+# Largest single read the prober makes: a full 1024-entry GPT partition array
+HELPER_MAX_PROBE = 128 << 10
+# Error of every record of a bulk operation aborted because sudo -v was refused
+SUDO_FAILED = 'sudo authentication failed'
+
+# Mount driver selection: candidate drivers per filesystem (fastest first) and option profiles
+PROC_FILESYSTEMS = '/proc/filesystems'
+MOUNT_DRIVERS = {
+    'ntfs': ('ntfs3', 'ntfs-3g'),
+    'vfat': ('vfat',),
+    'exfat': ('exfat',),
+    'ext4': ('ext4',),
+    'ext3': ('ext3', 'ext4'),
+    'ext2': ('ext2', 'ext4'),
+}
+MOUNT_PROFILES = {
+    'throughput': {
+        'ntfs3': ('noatime', 'prealloc', 'iocharset=utf8'),
+        'ntfs-3g': ('noatime', 'big_writes'),
+        'vfat': ('noatime', 'iocharset=utf8'),
+        'exfat': ('noatime', 'iocharset=utf8'),
+        'ext4': ('noatime',), 'ext3': ('noatime',), 'ext2': ('noatime',),
+    },
+    # Removable media: flush FAT writes early so a yanked stick loses less
+    'removable': {
+        'ntfs3': ('noatime', 'iocharset=utf8'),
+        'ntfs-3g': ('noatime', 'big_writes'),
+        'vfat': ('noatime', 'flush', 'iocharset=utf8'),
+        'exfat': ('noatime', 'iocharset=utf8'),
+        'ext4': ('noatime',), 'ext3': ('noatime',), 'ext2': ('noatime',),
+    },
+    'compat': {},
+}
+OWNER_DRIVERS = ('ntfs3', 'ntfs-3g', 'vfat', 'exfat')
+DISCARD_DRIVERS = ('ntfs3', 'vfat', 'exfat', 'ext4')
+
 # Colors and styling
 class Colors:
     CYAN = '\033[96m'
@@ -23,8 +238,339 @@ class Colors:
     END = '\033[0m'
     BLINK = '\033[5m'
 
+class Tracer:
+    """Records timed spans (phases and external commands) for --profile"""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._tids = {}
+
+    def _tid(self):
+        ident = threading.get_ident()
+        with self._lock:
+            return self._tids.setdefault(ident, len(self._tids) + 1)
+
+    def add(self, name, cat, start, end, args=None):
+        """Store one complete span (Chrome trace 'X' event, microseconds)"""
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': os.getpid(), 'tid': self._tid(),
+                 'ts': (start - self._t0) * 1e6, 'dur': (end - start) * 1e6, 'args': args or {}}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat='phase', **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, cat, start, time.perf_counter(), args)
+
+    def mark(self, name):
+        """Record a span from startup to now; returns its length in seconds"""
+        end = time.perf_counter()
+        if self.enabled:
+            self.add(name, 'phase', self._t0, end)
+        return end - self._t0
+
+    def summary(self, top=15):
+        """[(name, count, total_s, max_s)] sorted by total time"""
+        totals = {}
+        for e in self.events:
+            count, total, longest = totals.get(e['name'], (0, 0.0, 0.0))
+            totals[e['name']] = (count + 1, total + e['dur'] / 1e6, max(longest, e['dur'] / 1e6))
+        rows = [(name, *values) for name, values in totals.items()]
+        return sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+
+    def export(self, path):
+        """Write a Chrome trace-event file (load in chrome://tracing or Perfetto)"""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    def print_summary(self, path):
+        out = sys.stderr
+        print(f"\n{Colors.CYAN}{Colors.BOLD}⏱️  PROFILE - top costs (trace: {path}){Colors.END}", file=out)
+        print(f"{'total s':>9} {'count':>6} {'max s':>8}  name", file=out)
+        for name, count, total, longest in self.summary():
+            print(f"{total:9.3f} {count:6d} {longest:8.3f}  {name}", file=out)
+
+tracer = Tracer()
+
+def traced(name, cat='phase'):
+    """Decorator: record each call of the function as a span when profiling"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(name, cat):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def command_name(cmd):
+    """Short span name for an argv: 'sudo mount', 'lsblk'"""
+    words = [os.path.basename(str(c)) for c in cmd[:2]]
+    return ' '.join(words) if words and words[0] == 'sudo' else words[0]
+
+def run_command(cmd, **kwargs):
+    """subprocess.run, recorded with argv, exit status and wall time when profiling"""
+    if not tracer.enabled:
+        return subprocess.run(cmd, **kwargs)
+    start = time.perf_counter()
+    returncode = None
+    try:
+        proc = subprocess.run(cmd, **kwargs)
+        returncode = proc.returncode
+        return proc
+    finally:
+        tracer.add(command_name(cmd), 'command', start, time.perf_counter(),
+                   {'argv': [str(c) for c in cmd], 'returncode': returncode})
+
+def stream_command(cmd, on_output=None):
+    """Run cmd, passing each output update (lines, or \\r/\\b-redrawn progress) to on_output as it arrives;
+    returns (exit status, the last output lines). Traced like run_command."""
+    start = time.perf_counter()
+    returncode = None
+    tail = []
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+        pending = b''
+        while True:
+            chunk = proc.stdout.read1(4096)
+            if not chunk:
+                break
+            *updates, pending = re.split(rb'[\r\n\b]+', pending + chunk)
+            for update in updates:
+                text = update.decode('utf-8', 'replace').strip()
+                if text:
+                    tail = (tail + [text])[-STREAM_TAIL_LINES:]
+                    if on_output:
+                        on_output(text)
+        text = pending.decode('utf-8', 'replace').strip()
+        if text:
+            tail = (tail + [text])[-STREAM_TAIL_LINES:]
+        returncode = proc.wait()
+        return returncode, tail
+    finally:
+        if tracer.enabled:
+            tracer.add(command_name(cmd), 'command', start, time.perf_counter(),
+                       {'argv': [str(c) for c in cmd], 'returncode': returncode})
+
+def check_output_command(cmd, **kwargs):
+    """subprocess.check_output, traced like run_command"""
+    if not tracer.enabled:
+        return subprocess.check_output(cmd, **kwargs)
+    start = time.perf_counter()
+    returncode = 0
+    try:
+        return subprocess.check_output(cmd, **kwargs)
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+        raise
+    finally:
+        tracer.add(command_name(cmd), 'command', start, time.perf_counter(),
+                   {'argv': [str(c) for c in cmd], 'returncode': returncode})
+
+def enable_profile(path):
+    """Start tracing; export the trace and print the summary at exit"""
+    tracer.enabled = True
+
+    def finish():
+        tracer.export(path)
+        tracer.print_summary(path)
+    atexit.register(finish)
+
+def write_file_atomic(path, text, mode=0o600, dir_mode=0o777, sync=False):
+    """Replace path with text in one step (temp file in the same directory, then rename); raises OSError"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=dir_mode, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}-")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def write_json_atomic(path, data, indent=2, mode=0o600, dir_mode=0o777):
+    """write_file_atomic() of data as JSON"""
+    write_file_atomic(path, json.dumps(data, indent=indent), mode, dir_mode)
+
+METRIC_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+METRIC_LABELS = ('op', 'fstype', 'transport', 'driver')
+METRIC_MAX_FAILURES = 50
+
+class Metrics:
+    """Operation counters, latency histograms and recent failures (Prometheus text format)"""
+
+    def __init__(self):
+        self.counts = {}
+        self.histograms = {}
+        # Gauges: {'name{labels}': latest value}
+        self.gauges = {}
+        self.failures = []
+        self.base = {}
+        self.path = None
+        self._lock = threading.Lock()
+
+    def observe(self, op, elapsed, ok, fstype=None, transport=None, driver=None, error=None, device=None):
+        """Count one operation and its latency; keep the error text of failures"""
+        labels = (op, str(fstype or 'unknown').lower(), str(transport or 'unknown').lower(), driver or 'unknown')
+        with self._lock:
+            key = labels + ('ok' if ok else 'failed',)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            buckets, total, count = self.histograms.get(labels, ([0] * len(METRIC_BUCKETS), 0.0, 0))
+            for i, bound in enumerate(METRIC_BUCKETS):
+                if elapsed <= bound:
+                    buckets[i] += 1
+            self.histograms[labels] = (buckets, total + elapsed, count + 1)
+            if not ok:
+                self.failures.append({'time': time.time(), 'op': op, 'device': device,
+                                      **dict(zip(METRIC_LABELS[1:], labels[1:])), 'error': error})
+                del self.failures[:-METRIC_MAX_FAILURES]
+
+    def set_gauge(self, family, value, **labels):
+        """Set one gauge sample; the latest value wins, also over one loaded from a previous file"""
+        name = family + '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe_result(self, op, result, info=None, driver=None):
+        """observe() for a result record; 'already ...' results did no work and are skipped"""
+        if result['status'].startswith('already'):
+            return
+        info = info or {}
+        self.observe(op, result['elapsed'], result['status'] not in ('failed', 'busy'),
+                     fstype=result.get('fstype') or info.get('fstype'), transport=info.get('transport'),
+                     driver=driver or result.get('driver'), error=result.get('error'), device=result.get('device'))
+
+    def samples(self):
+        """{'name{labels}': value} for every sample, including ones loaded from a previous file"""
+        def fmt(values, **extra):
+            pairs = list(zip(METRIC_LABELS, values)) + list(extra.items())
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        out = dict(self.base)
+        with self._lock:
+            for key, n in self.counts.items():
+                name = 'drive_master_operations_total' + fmt(key[:4], result=key[4])
+                out[name] = out.get(name, 0) + n
+            for labels, (buckets, total, count) in self.histograms.items():
+                for bound, n in zip(METRIC_BUCKETS, buckets):
+                    name = 'drive_master_operation_seconds_bucket' + fmt(labels, le=bound)
+                    out[name] = out.get(name, 0) + n
+                for suffix, value in (('bucket', count), ('sum', total), ('count', count)):
+                    name = f'drive_master_operation_seconds_{suffix}' + (fmt(labels, le='+Inf') if suffix == 'bucket' else fmt(labels))
+                    out[name] = out.get(name, 0) + value
+            out.update(self.gauges)
+        return out
+
+    def render(self):
+        """Prometheus text exposition of all samples"""
+        def order(name):
+            head, _, le = name.partition(',le="')
+            return head, float(le.rstrip('"}').replace('+Inf', 'inf') or 0)
+
+        samples = sorted(self.samples().items(), key=lambda item: order(item[0]))
+        lines = []
+        for family, kind, text in (('drive_master_operations_total', 'counter', "Drive operations by op, fstype, transport, driver and result"),
+                                   ('drive_master_operation_seconds', 'histogram', "Drive operation latency in seconds"),
+                                   ('drive_master_first_menu_seconds', 'gauge', "Seconds from startup to the first menu, by source (snapshot or scan)")):
+            lines += [f"# HELP {family} {text}", f"# TYPE {family} {kind}"]
+            lines += [f"{name} {value:g}" for name, value in samples if name.split('{')[0].startswith(family)]
+        return '\n'.join(lines) + '\n'
+
+    def load(self, path):
+        """Start from the samples of a previous textfile so counters keep growing across runs"""
+        try:
+            with open(path) as f:
+                for line in f:
+                    # Files from before the first-menu gauge counted it as an operation
+                    if line.startswith('drive_master_') and 'op="first_menu"' not in line:
+                        name, _, value = line.rstrip('\n').rpartition(' ')
+                        self.base[name] = float(value)
+        except (OSError, ValueError):
+            self.base = {}
+        try:
+            with open(failures_path(path)) as f:
+                self.failures = json.load(f)[-METRIC_MAX_FAILURES:]
+        except (OSError, ValueError):
+            pass
+
+    def write(self, path):
+        """Atomically write the textfile and the failures JSON next to it"""
+        write_file_atomic(path, self.render(), mode=0o644)
+        write_json_atomic(failures_path(path), self.failures, mode=0o644)
+
+metrics = Metrics()
+
+def failures_path(path):
+    """Failures JSON beside a textfile (not *.prom, so the collector ignores it)"""
+    return os.path.splitext(path)[0] + '.failures.json'
+
+def enable_metrics_file(path):
+    """Write metrics as a Prometheus textfile at exit (and after each daemon batch)"""
+    metrics.path = path
+    metrics.load(path)
+    atexit.register(metrics.write, path)
+
+def serve_metrics(port, host='127.0.0.1'):
+    """Serve /metrics (Prometheus text) and /failures (JSON) from a background thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, ctype = metrics.render().encode(), 'text/plain; version=0.0.4'
+            elif self.path == '/failures':
+                body, ctype = json.dumps(metrics.failures, indent=2).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+_terminal_size = None
+
+def get_terminal_size():
+    """Terminal size, queried once and again only after a resize (SIGWINCH)"""
+    global _terminal_size
+    if _terminal_size is None:
+        _terminal_size = shutil.get_terminal_size()
+        if hasattr(signal, 'SIGWINCH') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGWINCH, _reset_terminal_size)
+    return _terminal_size
+
+def _reset_terminal_size(signum, frame):
+    global _terminal_size
+    _terminal_size = None
+
 def get_terminal_width():
-    return shutil.get_terminal_size().columns
+    return get_terminal_size().columns
 
 def print_banner():
     """Print centered animated banner"""
@@ -55,6 +601,7 @@ def print_banner():
 """
     print(banner)
 
+@traced('print_loading (animation)', 'ui')
 def print_loading(text, chars="⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"):
     """Print loading animation"""
     for i in range(8):
@@ -76,7 +623,10 @@ def print_menu_header():
 
 def print_option(number, icon, text, color=Colors.WHITE):
     """Print stylized menu option"""
-    print(f"{Colors.CYAN}[{Colors.YELLOW}{Colors.BOLD}{number}{Colors.CYAN}]{Colors.END} {color}{icon} {text}{Colors.END}")
+    print(format_option(number, icon, text, color))
+
+def format_option(number, icon, text, color=Colors.WHITE):
+    return f"{Colors.CYAN}[{Colors.YELLOW}{Colors.BOLD}{number}{Colors.CYAN}]{Colors.END} {color}{icon} {text}{Colors.END}"
 
 def print_success(text):
     """Print success message with animation"""
@@ -94,485 +644,3308 @@ def print_info(text):
     """Print info message"""
     print(f"{Colors.BLUE}{Colors.BOLD}ℹ️  {text}{Colors.END}")
 
-@click.command()
-@click.argument('drive_name', required=False)
+class Screen:
+    """One screenful of output built in memory and written with a single write()"""
+
+    def __init__(self):
+        size = get_terminal_size()
+        self.width = size.columns
+        self.height = size.lines
+        self.lines = []
+
+    def add(self, text=""):
+        self.lines.extend(text.split("\n"))
+
+    def separator(self):
+        self.lines.append(f"{Colors.CYAN}{'─' * self.width}{Colors.END}")
+
+    def flush(self):
+        """Write the buffered lines and start over"""
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
+        self.lines = []
+
+class DiffRenderer:
+    """Redraws a full-screen view by rewriting only the lines that changed since the last frame"""
+
+    def __init__(self):
+        self.previous = None
+
+    def draw(self, lines):
+        if self.previous is None:
+            out = ["\033[H\033[2J" + "\n".join(lines)]
+        else:
+            out = [f"\033[{row};1H{line}\033[K" for row, line in enumerate(lines, 1)
+                   if row > len(self.previous) or self.previous[row - 1] != line]
+            if len(lines) < len(self.previous):
+                out.append(f"\033[{len(lines) + 1};1H\033[J")
+        out.append(f"\033[{len(lines) + 1};1H")
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
+        self.previous = list(lines)
+
+class ProgressBoard:
+    """One live row per device, redrawn in place with a single write; plain phase lines when not a terminal"""
+
+    def __init__(self, devices, out=None):
+        self.order = list(devices)
+        self.rows = {device: {'phase': 'queued', 'fraction': None, 'note': '', 'started': None} for device in self.order}
+        self.out = out or sys.stdout
+        self.live = self.out.isatty()
+        self._lock = threading.Lock()
+        self._drawn = 0
+        self._last = 0.0
+
+    def update(self, device, phase=None, fraction=None, note=None):
+        with self._lock:
+            row = self.rows[device]
+            changed = phase is not None and phase != row['phase']
+            if changed:
+                row.update(phase=phase, fraction=None, note='')
+                row['started'] = row['started'] or time.monotonic()
+            if fraction is not None:
+                row['fraction'] = fraction
+            if note is not None:
+                row['note'] = note
+            if not self.live:
+                if changed:
+                    self.out.write(f"{device}: {phase}{' - ' + row['note'] if row['note'] else ''}\n")
+                    self.out.flush()
+                return
+            now = time.monotonic()
+            if changed or now - self._last >= PROGRESS_REDRAW:
+                self._last = now
+                self._draw()
+
+    def _render(self, device):
+        row = self.rows[device]
+        width = get_terminal_width()
+        if row['fraction'] is None:
+            bar = ' ' * PROGRESS_BAR
+        else:
+            filled = int(row['fraction'] * PROGRESS_BAR)
+            bar = '█' * filled + '░' * (PROGRESS_BAR - filled)
+        percent = f"{row['fraction'] * 100:3.0f}%" if row['fraction'] is not None else '    '
+        color = {'done': Colors.GREEN, 'failed': Colors.RED, 'queued': Colors.WHITE}.get(row['phase'], Colors.CYAN)
+        elapsed = f"{time.monotonic() - row['started']:5.1f}s" if row['started'] else '      '
+        text = f"{fit(device, 14)} {bar} {percent} {elapsed} {row['phase']:<8} {row['note']}"
+        return f"{color}{fit(text, width - 1).rstrip()}{Colors.END}"
+
+    def _draw(self):
+        lines = [self._render(device) for device in self.order]
+        out = f"\033[{self._drawn}F" if self._drawn else ""
+        self.out.write(out + "".join(line + "\033[K\n" for line in lines))
+        self.out.flush()
+        self._drawn = len(lines)
+
+    def finish(self):
+        with self._lock:
+            if self.live:
+                self._draw()
+
+def fit(text, width):
+    """Pad or cut text to exactly width columns"""
+    text = str(text)
+    return text.ljust(width) if len(text) <= width else text[:max(0, width - 1)] + "…"
+
+class DriveMasterGroup(click.Group):
+    """Command group that treats an unknown first argument as a drive name"""
+
+    def resolve_command(self, ctx, args):
+        if args and args[0] not in self.commands and not args[0].startswith('-'):
+            return '_direct', self.commands['_direct'], args
+        return super().resolve_command(ctx, args)
+
+@click.group(cls=DriveMasterGroup, invoke_without_command=True)
 @click.option('--version', is_flag=True, help="Show version info")
-def main(drive_name, version):
-    """🚀 Drive Master: Auto-mount NTFS drives on Linux with ease."""
-    # Clear screen and show banner
-    os.system('clear' if os.name == 'posix' else 'cls')
-    print_banner()
-    
+@click.option('--helper', is_flag=True, help="Run privileged steps through one long-lived sudo helper")
+@click.option('--profile', 'profile_path', type=click.Path(dir_okay=False),
+              help="Trace commands and phases; write a Chrome trace JSON here and print the top costs on exit")
+@click.option('--mount-profile', type=click.Choice(sorted(MOUNT_PROFILES)),
+              help="Mount option profile (default: removable for USB drives, throughput otherwise)")
+@click.option('--metrics-file', type=click.Path(dir_okay=False), envvar='DRIVE_MASTER_METRICS_FILE',
+              help="Write operation counters and latency histograms to this Prometheus textfile (*.prom)")
+@click.option('--privileged-helper', 'helper_socket', hidden=True)
+@click.option('--helper-client', 'helper_client', type=int, hidden=True)
+@click.pass_context
+def main(ctx, version, helper, profile_path, mount_profile, metrics_file, helper_socket, helper_client):
+    """🚀 Drive Master: Auto-mount NTFS drives on Linux with ease.
+
+    Run without arguments for the interactive menu, pass a drive label to
+    mount it directly, or use a subcommand for scripting.
+    """
+    if helper_socket:
+        run_privileged_helper(helper_socket, helper_client or os.getppid())
+        ctx.exit()
+    if helper:
+        os.environ['DRIVE_MASTER_HELPER'] = '1'
+    if profile_path:
+        enable_profile(profile_path)
+    if metrics_file:
+        enable_metrics_file(metrics_file)
+    if mount_profile:
+        os.environ['DRIVE_MASTER_MOUNT_PROFILE'] = mount_profile
+
     if version:
+        os.system('clear' if os.name == 'posix' else 'cls')
+        print_banner()
         print_info(f"Drive Master v{VERSION}")
-        return
+        ctx.exit()
 
-    print_loading("Scanning for all drives...")
-    drives = get_all_drives()
+    if ctx.invoked_subcommand is None:
+        run_interactive()
 
-    if not drives:
-        print_error("No drives found! Check system permissions.")
+@main.command('_direct', hidden=True)
+@click.argument('drive_name')
+def direct_mount(drive_name):
+    """Mount a drive by label or device path, with the full UI"""
+    run_interactive(drive_name)
+
+def scan_with_progress(inventory):
+    """Full scan, printing each disk as it answers; a hung one is flagged after get_scan_deadline()"""
+    print_info("Scanning for all drives...")
+    for disk_name, entries, error in inventory.stream():
+        if error == 'unresponsive':
+            print_warning(f"/dev/{disk_name}: no answer after {get_scan_deadline():g}s, marked unresponsive")
+        elif error:
+            print_warning(f"/dev/{disk_name}: {error}")
+        else:
+            for path, info in entries.items():
+                print(f"  {Colors.GREEN}✓{Colors.END} {path} {Colors.WHITE}{info['size']} {info['fstype'] or ''}{Colors.END} {info.get('label') or ''}")
+    if inventory.error:
+        print_error(inventory.error)
+    return inventory.get()
+
+def print_changes(changes):
+    """One line per kind of change a background rescan found"""
+    if not changes:
         return
+    for key, icon in (('added', '➕'), ('removed', '➖'), ('changed', '🔁')):
+        if changes[key]:
+            print_info(f"{icon} Drives {key} since the last scan: {', '.join(changes[key])}")
+
+def print_main_menu():
+    print_menu_header()
+    print_option("1", "📋", "List all drives (Detailed Info)", Colors.GREEN)
+    print_option("2", "🔌", "Mount a specific drive", Colors.YELLOW)
+    print_option("3", "🔓", "Unmount a specific drive", Colors.ORANGE)
+    print_option("4", "⚡", "Mount all unmounted drives", Colors.MAGENTA)
+    print_option("5", "🚫", "Unmount all mounted drives", Colors.RED)
+    print_option("6", "🔄", "Update Drive Master", Colors.BLUE)
+    print_option("7", "💾", "Drive Formatter (FAT32/NTFS/EXT4)", Colors.MAGENTA)
+    print_option("8", "🔧", "Fix Hidden/Problematic Drives", Colors.ORANGE)
+    print_option("9", "🔍", "Data Recovery Center", Colors.CYAN)
+    print_option("P", "🔑", "Windows Password Removal", Colors.ORANGE)
+    print_option("A", "🗑️", "Uninstall Drive Master", Colors.RED)
+    print_option("C", "🧹", "Clear Screen", Colors.WHITE)
+    print_option("Q", "🚪", "Quit", Colors.RED)
+    print_separator()
 
-    print_success(f"Found {len(drives)} drive(s)")
+def run_interactive(drive_name=None):
+    """Banner, scan and either direct mount or the interactive menu"""
+    # Clear screen and show banner
+    os.system('clear' if os.name == 'posix' else 'cls')
+    print_banner()
 
     if drive_name:
-        # Direct mount mode
-        drive_name_lower = drive_name.lower()
-        found = False
-        for path, info in drives.items():
-            label = str(info.get('label') or "").lower()
-            if label == drive_name_lower or path.lower() == drive_name_lower:
-                mount_name = info.get('label') or path.split('/')[-1]
-                mount_drive(info['uuid'], mount_name, info['device'])
-                found = True
-                break
-        if not found:
+        # Direct mount mode: probe only the matching device
+        info = lookup_drive(drive_name)
+        if info:
+            mount_name = info.get('label') or info['device'].split('/')[-1]
+            mount_info_result(info, mount_name)
+        else:
             print_warning(f"Drive matching '{drive_name}' not found.")
+        return
+
+    inventory = get_inventory()
+    if inventory.load_snapshot():
+        # Last scan of this boot: show the menu now, rescan behind it
+        drives = inventory.drives
+        source = 'snapshot'
+        inventory.revalidate()
+        print_info(f"{len(drives)} drive(s) from the last scan, refreshing in the background...")
     else:
-        # Interactive menu
-        while True:
-            print_menu_header()
-            print_option("1", "📋", "List all drives (Detailed Info)", Colors.GREEN)
-            print_option("2", "🔌", "Mount a specific drive", Colors.YELLOW)
-            print_option("3", "🔓", "Unmount a specific drive", Colors.ORANGE)
-            print_option("4", "⚡", "Mount all unmounted drives", Colors.MAGENTA)
-            print_option("5", "🚫", "Unmount all mounted drives", Colors.RED)
-            print_option("6", "🔄", "Update Drive Master", Colors.BLUE)
-            print_option("7", "💾", "Drive Formatter (FAT32/NTFS/EXT4)", Colors.MAGENTA)
-            print_option("8", "🔧", "Fix Hidden/Problematic Drives", Colors.ORANGE)
-            print_option("9", "🔍", "Data Recovery Center", Colors.CYAN)
-            print_option("P", "🔑", "Windows Password Removal", Colors.ORANGE)
-            print_option("A", "🗑️", "Uninstall Drive Master", Colors.RED)
-            print_option("C", "🧹", "Clear Screen", Colors.WHITE)
-            print_option("Q", "🚪", "Quit", Colors.RED)
-            print_separator()
+        drives = scan_with_progress(inventory)
+        source = 'scan'
+        if not drives:
+            print_error("No drives found! Check system permissions.")
+            return
+        print_success(f"Found {len(drives)} drive(s)")
+
+    # Interactive menu
+    while True:
+        print_main_menu()
+        if source:
+            metrics.set_gauge('drive_master_first_menu_seconds', tracer.mark('startup: first menu'), source=source)
+            source = None
+
+        choice = click.prompt(f"{Colors.CYAN}➤ Enter your choice{Colors.END}", type=str).strip().upper()
+        # Waits for the background rescan if it is still running
+        drives = inventory.get()
+        print_changes(inventory.take_changes())
+
+        if choice == '1':
+            list_drives(drives)
+            drives = inventory.get()  # Refresh after viewing
+        elif choice == '2':
+            mount_menu(drives)
+            drives = inventory.get()
+        elif choice == '3':
+            unmount_menu(drives)
+            drives = inventory.get()
+        elif choice == '4':
+            mount_all_unmounted(drives)
+            drives = inventory.get()
+        elif choice == '5':
+            unmount_all_mounted(drives)
+            drives = inventory.get()
+        elif choice == '6':
+            update_drive_master()
+        elif choice == '7':
+            format_usb_drive()
+            drives = inventory.get()
+        elif choice == '8':
+            fix_hidden_drives()
+            drives = inventory.get()
+        elif choice == '9':
+            recover_data_menu()
+        elif choice == 'P':
+            windows_password_menu(drives)
+        elif choice == 'A':
+            uninstall_drive_master()
+            return
+        elif choice == 'C':
+            os.system('clear' if os.name == 'posix' else 'cls')
+            print_banner()
+        elif choice == 'Q':
+            print(f"\n{Colors.CYAN}{Colors.BOLD}Thanks for using Drive Master! 👋{Colors.END}")
+            sys.exit(0)
+        else:
+            print_error("Invalid option! Please try again.")
             
-            choice = click.prompt(f"{Colors.CYAN}➤ Enter your choice{Colors.END}", type=str).strip().upper()
-
-            if choice == '1':
-                list_drives(drives)
-                drives = get_all_drives()  # Refresh after viewing
-            elif choice == '2':
-                mount_menu(drives)
-                drives = get_all_drives()
-            elif choice == '3':
-                unmount_menu(drives)
-                drives = get_all_drives()
-            elif choice == '4':
-                mount_all_unmounted(drives)
-                drives = get_all_drives()
-            elif choice == '5':
-                unmount_all_mounted(drives)
-                drives = get_all_drives()
-            elif choice == '6':
-                update_drive_master()
-            elif choice == '7':
-                format_usb_drive()
-                drives = get_all_drives()
-            elif choice == '8':
-                fix_hidden_drives()
-                drives = get_all_drives()
-            elif choice == '9':
-                recover_data_menu()
-            elif choice == 'P':
-                windows_password_menu(drives)
-            elif choice == 'A':
-                uninstall_drive_master()
-                return
-            elif choice == 'C':
-                os.system('clear' if os.name == 'posix' else 'cls')
-                print_banner()
-            elif choice == 'Q':
-                print(f"\n{Colors.CYAN}{Colors.BOLD}Thanks for using Drive Master! 👋{Colors.END}")
-                sys.exit(0)
-            else:
-                print_error("Invalid option! Please try again.")
-                
-            input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.END}")
+        input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.END}")
+
+# fdisk-style names for the partition type codes udev reports
+PARTITION_TYPE_NAMES = {
+    '0x7': 'HPFS/NTFS/exFAT',
+    '0xb': 'W95 FAT32',
+    '0xc': 'W95 FAT32 (LBA)',
+    '0xe': 'W95 FAT16 (LBA)',
+    '0xef': 'EFI (FAT-12/16/32)',
+    '0x27': 'Hidden NTFS WinRE',
+    '0x82': 'Linux swap / Solaris',
+    '0x83': 'Linux',
+    '0x8e': 'Linux LVM',
+    'ebd0a0a2-b9e5-4433-87c0-68b6b72699c7': 'Microsoft basic data',
+    'e3c9e316-0b5c-4db8-817d-f92df00215ae': 'Microsoft reserved',
+    'de94bba4-06d1-4d40-a16a-bfd50179d6ac': 'Windows recovery environment',
+    'c12a7328-f81f-11d2-ba4b-00a0c93ec93b': 'EFI System',
+    '0fc63daf-8483-4772-8e79-3d69d8477de4': 'Linux filesystem',
+    '0657fd6d-a4ab-43c4-84e5-0933c84b4f4f': 'Linux swap',
+    'e6d6d379-f507-44c2-a23c-238f2a3df928': 'Linux LVM',
+    '21686148-6449-6e6f-744e-656564454649': 'BIOS boot',
+}
 
-def get_fdisk_info():
-    """Parse fdisk -l output to get more details about drives"""
-    fdisk_data = {}
-    current_disk = None
+class Drive:
+    """Compact drive record; also readable like the old drive dicts (info['device'], info.get(...))"""
+
+    __slots__ = ('device', 'parent', 'size', 'fstype', 'fdisk_ptype', 'label', 'mountpoint',
+                 'uuid', 'type', 'model', 'transport', 'status')
+
+    def __init__(self, **fields):
+        for key in self.__slots__:
+            setattr(self, key, fields.get(key))
+
+    @property
+    def name(self):
+        """Label, or the device name when unlabeled"""
+        return self.label or self.device.split('/')[-1]
+
+    def keys(self):
+        return self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"Drive({self.device!r}, label={self.label!r}, fstype={self.fstype!r}, mountpoint={self.mountpoint!r})"
+
+def read_sysfs(path, default=None):
+    """Read a single sysfs attribute, stripped"""
     try:
-        output = subprocess.check_output(['sudo', 'fdisk', '-l'], stderr=subprocess.DEVNULL).decode('utf-8')
-        lines = output.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line: continue
-            
-            if line.startswith('Disk /dev/'):
-                disk_path = line.split(':')[0].replace('Disk ', '').strip()
-                current_disk = disk_path
-                fdisk_data[current_disk] = {
-                    'model': 'Unknown',
-                    'partitions': []
-                }
-            
-            elif line.startswith('Disk model:') and current_disk:
-                fdisk_data[current_disk]['model'] = line.split('Disk model:')[1].strip()
-                
-            elif line.startswith('/dev/') and current_disk:
-                parts = line.split()
-                if len(parts) >= 6:
-                    dev_path = parts[0]
-                    # Handle optional '*' in second column
-                    idx = 4 if parts[1] == '*' else 4
-                    if len(parts) > 5 and parts[4].endswith(tuple('KMGTP')):
-                         size = parts[4]
-                         ptype = ' '.join(parts[5:])
-                    else:
-                         # Fallback or complex parsing
-                         size = parts[4]
-                         ptype = ' '.join(parts[5:])
-                    
-                    fdisk_data[current_disk]['partitions'].append({
-                        'device': dev_path,
-                        'size': size,
-                        'type': ptype
-                    })
-    except Exception:
-        pass
-    return fdisk_data
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
 
-def get_all_drives():
-    """Get all drives using fdisk -l as primary source, enriched by lsblk"""
-    drives = {}
-    fdisk_info = get_fdisk_info()
-    
+def format_size(num_bytes):
+    """Format a byte count the way lsblk does (e.g. 14.9G)"""
+    size = float(num_bytes)
+    for unit in ['B', 'K', 'M', 'G', 'T', 'P']:
+        if size < 1024 or unit == 'P':
+            break
+        size /= 1024
+    if unit == 'B':
+        return f"{int(size)}B"
+    text = f"{size:.1f}".rstrip('0').rstrip('.')
+    return f"{text}{unit}"
+
+def unescape_mount_path(path):
+    """Decode the octal escapes (\\040 etc.) used in mountinfo"""
+    if '\\' not in path:
+        return path
+    out = []
+    i = 0
+    while i < len(path):
+        if path[i] == '\\' and path[i + 1:i + 4].isdigit():
+            out.append(chr(int(path[i + 1:i + 4], 8)))
+            i += 4
+        else:
+            out.append(path[i])
+            i += 1
+    return ''.join(out)
+
+@traced('parse: mountinfo')
+def parse_mountinfo(path=MOUNTINFO):
+    """Parse mountinfo into a list of mount entries"""
+    mounts = []
     try:
-        lsblk_output = subprocess.check_output(['lsblk', '-J', '-o', 'NAME,SIZE,TYPE,TRAN,RM,MODEL,FSTYPE,LABEL,MOUNTPOINT,UUID'], stderr=subprocess.DEVNULL).decode('utf-8')
-        import json
-        lsblk_data = json.loads(lsblk_output)
-        
-        lsblk_lookup = {}
-        def flatten_lsblk(devices):
-            for dev in devices:
-                path = f"/dev/{dev['name']}"
-                lsblk_lookup[path] = dev
-                if 'children' in dev:
-                    flatten_lsblk(dev['children'])
-        
-        flatten_lsblk(lsblk_data['blockdevices'])
-        
-        for disk_path, disk_details in fdisk_info.items():
-            lsblk_disk = lsblk_lookup.get(disk_path, {})
-            
-            transport = lsblk_disk.get('tran', 'Unknown')
-            removable = lsblk_disk.get('rm', '1') == '1' # Default to removable if unknown
-            model = disk_details['model']
-            if model == 'Unknown':
-                model = lsblk_disk.get('model', 'Unknown')
-            
-            if transport == 'usb' or removable:
-                drive_type = 'USB'
-            elif transport in ['sata', 'nvme', 'ata']:
-                drive_type = 'Internal'
-            else:
-                drive_type = 'Other'
-            
-            if disk_details['partitions']:
-                for fpart in disk_details['partitions']:
-                    part_path = fpart['device']
-                    lsblk_part = lsblk_lookup.get(part_path, {})
-                    
-                    fstype = lsblk_part.get('fstype', 'Unknown')
-                    label = lsblk_part.get('label')
-                    mountpoint = lsblk_part.get('mountpoint')
-                    uuid = lsblk_part.get('uuid', '')
-                    size = lsblk_part.get('size', fpart['size'])
-                    
-                    drives[part_path] = {
-                        'device': part_path,
-                        'parent': disk_path,
-                        'size': size,
-                        'fstype': fstype,
-                        'fdisk_ptype': fpart['type'],
-                        'label': label,
-                        'mountpoint': mountpoint,
-                        'uuid': uuid,
-                        'type': drive_type,
-                        'model': model,
-                        'transport': transport
-                    }
-            else:
-                # Disk without partitions
-                drives[disk_path] = {
-                    'device': disk_path,
-                    'parent': disk_path,
-                    'size': lsblk_disk.get('size', 'Unknown'),
-                    'fstype': lsblk_disk.get('fstype', 'Unknown'),
-                    'fdisk_ptype': 'Disk',
-                    'label': lsblk_disk.get('label'),
-                    'mountpoint': lsblk_disk.get('mountpoint'),
-                    'uuid': lsblk_disk.get('uuid', ''),
-                    'type': drive_type,
-                    'model': model,
-                    'transport': transport
-                }
-                    
-    except Exception as e:
-        print_error(f"Failed to scan drives: {str(e)}")
-    
-    return drives
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return mounts
 
-def list_drives(drives):
-    """List all drives with detailed information."""
-    print_separator()
-    print(f"{Colors.BLUE}{Colors.BOLD}📋 ALL DRIVES DETECTED (Detailed Info){Colors.END}")
-    print_separator()
-    
-    usb_drives = {k: v for k, v in drives.items() if v['type'] == 'USB'}
-    internal_drives = {k: v for k, v in drives.items() if v['type'] == 'Internal'}
-    other_drives = {k: v for k, v in drives.items() if v['type'] == 'Other'}
-    
-    if usb_drives:
-        print(f"{Colors.MAGENTA}{Colors.BOLD}💾 USB DRIVES{Colors.END}")
-        for i, (path, info) in enumerate(usb_drives.items(), 1):
-            name = info.get('label') or path.split('/')[-1]
-            display_drive_info(name, info, i, "USB")
-    
-    if internal_drives:
-        print(f"{Colors.BLUE}{Colors.BOLD}💽 INTERNAL DRIVES{Colors.END}")
-        for i, (path, info) in enumerate(internal_drives.items(), 1):
-            name = info.get('label') or path.split('/')[-1]
-            display_drive_info(name, info, i, "Internal")
-    
-    if other_drives:
-        print(f"{Colors.YELLOW}{Colors.BOLD}📀 OTHER DRIVES{Colors.END}")
-        for i, (path, info) in enumerate(other_drives.items(), 1):
-            name = info.get('label') or path.split('/')[-1]
-            display_drive_info(name, info, i, "Other")
-    
-    print_option("0", "⬅️", "Back to Main Menu", Colors.WHITE)
-    choice = click.prompt(f"{Colors.CYAN}Enter choice{Colors.END}", type=str, default="0").strip()
+    for line in lines:
+        pre, sep, post = line.partition(' - ')
+        if not sep:
+            continue
+        fields = pre.split()
+        tail = post.split()
+        if len(fields) < 5 or len(tail) < 2:
+            continue
+        mounts.append({
+            'id': fields[0],
+            'parent_id': fields[1],
+            'devnum': fields[2],
+            'mountpoint': unescape_mount_path(fields[4]),
+            'fstype': tail[0],
+            'source': unescape_mount_path(tail[1]),
+        })
+    return mounts
 
-def display_drive_info(name, info, index, drive_type):
-    """Display detailed drive information"""
-    user = os.getlogin()
-    mount_point = f"/media/{user}/{name}"
-    
-    if info['mountpoint']:
-        mounted = True
-        mount_path = info['mountpoint']
-    else:
-        mounted = subprocess.run(['mountpoint', '-q', mount_point], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
-        mount_path = mount_point if mounted else "Not mounted"
-    
-    status_icon = "🟢" if mounted else "🔴"
-    status_text = f"{Colors.GREEN}MOUNTED{Colors.END}" if mounted else f"{Colors.RED}NOT MOUNTED{Colors.END}"
-    
-    print(f"{Colors.CYAN}╭─ {drive_type} Drive #{index}{Colors.END}")
-    print(f"{Colors.CYAN}├─{Colors.END} {Colors.YELLOW}{Colors.BOLD}📁 Name:{Colors.END} {name}")
-    print(f"{Colors.CYAN}├─{Colors.END} {Colors.BLUE}📏 Size:{Colors.END} {info['size']}")
-    print(f"{Colors.CYAN}├─{Colors.END} {Colors.MAGENTA}💾 Device:{Colors.END} {info['device']}")
-    print(f"{Colors.CYAN}├─{Colors.END} {Colors.WHITE}💻 Model:{Colors.END} {info['model']}")
-    print(f"{Colors.CYAN}├─{Colors.END} {Colors.ORANGE}📀 Format:{Colors.END} {info['fstype']} ({info.get('fdisk_ptype', 'Unknown')})")
-    if mounted:
-        print(f"{Colors.CYAN}├─{Colors.END} {Colors.GREEN}📂 Path:{Colors.END} {mount_path}")
-    print(f"{Colors.CYAN}╰─{Colors.END} {Colors.WHITE}📊 Status:{Colors.END} {status_icon} {status_text}")
-    print()
+class MountTable:
+    """In-memory index of mountinfo, rebuilt only when the kernel reports a change"""
 
-def is_drive_mounted(info):
-    """Check if drive is mounted by info or path"""
-    if info['mountpoint']:
-        return True
-    user = os.getlogin()
-    name = info.get('label') or info['device'].split('/')[-1]
-    mount_point = f"/media/{user}/{name}"
-    return subprocess.run(['mountpoint', '-q', mount_point], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    def __init__(self, path=MOUNTINFO):
+        self.path = path
+        self.by_device = {}
+        self.by_devnum = {}
+        self.by_path = {}
+        self.builds = 0
+        self._poller = None
+        self._fd = None
+        self._stale = True
+        self._lock = threading.Lock()
 
-def is_mounted(name):
-    """Check if drive name is mounted in /media/user/name"""
-    user = os.getlogin()
-    mount_point = f"/media/{user}/{name}"
-    return subprocess.run(['mountpoint', '-q', mount_point], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    def _watch(self):
+        """Open mountinfo for polling; the kernel flags POLLPRI after any mount change"""
+        if self._poller is not None or not hasattr(select, 'poll'):
+            return
+        try:
+            self._fd = os.open(self.path, os.O_RDONLY)
+            self._poller = select.poll()
+            self._poller.register(self._fd, select.POLLPRI | select.POLLERR)
+            self._poller.poll(0)
+        except OSError:
+            self._poller = None
 
-def mount_drive(uuid, name, dev):
-    """Standard mount function"""
-    user = os.getlogin()
-    mount_point = f"/media/{user}/{name}"
-    
-    if is_mounted(name):
-        return True
+    def changed(self):
+        """Cheap check whether the mount table needs rebuilding"""
+        if self._stale or self._poller is None:
+            return True
+        return bool(self._poller.poll(0))
 
-    if not os.path.exists(mount_point):
-        subprocess.run(['sudo', 'mkdir', '-p', mount_point])
-        subprocess.run(['sudo', 'chown', f'{user}:{user}', mount_point])
+    def invalidate(self):
+        self._stale = True
 
-    # Try UUID if available, else device
-    if uuid:
-        cmd = ['sudo', 'mount', '-t', 'ntfs-3g', '-o', f'uid={os.getuid()},gid={os.getgid()}', f'UUID={uuid}', mount_point]
-    else:
-        cmd = ['sudo', 'mount', '-t', 'ntfs-3g', '-o', f'uid={os.getuid()},gid={os.getgid()}', dev, mount_point]
-    
-    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return result.returncode == 0
+    def refresh(self, force=False):
+        """Rebuild the index if mounts changed since the last build"""
+        with self._lock:
+            self._watch()
+            if not force and not self.changed():
+                return self
+            self._rebuild()
+        return self
 
-def mount_drive_enhanced(info, name):
-    """Enhanced mount function with UI and repair suggestion"""
-    user = os.getlogin()
-    mount_point = f"/media/{user}/{name}"
-    
-    print_separator()
-    print(f"{Colors.YELLOW}{Colors.BOLD}🔌 MOUNTING: {name}{Colors.END}")
-    print_separator()
-    
-    if is_drive_mounted(info):
-        print_info(f"{name} is already mounted")
-        return True
-    
-    if not os.path.exists(mount_point):
-        print_loading("Creating mount point...")
-        subprocess.run(['sudo', 'mkdir', '-p', mount_point])
-        subprocess.run(['sudo', 'chown', f'{user}:{user}', mount_point])
-    
-    print_loading(f"Mounting {name}...")
-    
-    # Check filesystem type
-    fstype = str(info.get('fstype') or "").lower()
-    fdisk_ptype = str(info.get('fdisk_ptype') or "").lower()
+    @traced('mount-state: rebuild index')
+    def _rebuild(self):
+        by_device, by_devnum, by_path = {}, {}, {}
+        for entry in parse_mountinfo(self.path):
+            by_path[entry['mountpoint']] = entry
+            by_devnum.setdefault(entry['devnum'], entry['mountpoint'])
+            source = entry['source']
+            if source.startswith('/dev/'):
+                by_device.setdefault(source, entry['mountpoint'])
+                real = os.path.realpath(source)
+                if real != source:
+                    by_device.setdefault(real, entry['mountpoint'])
+        self.by_device, self.by_devnum, self.by_path = by_device, by_devnum, by_path
+        self.builds += 1
+        self._stale = False
 
-    if fstype == 'ntfs' or 'microsoft' in fdisk_ptype:
-        cmd = ['sudo', 'mount', '-t', 'ntfs-3g', '-o', f'uid={os.getuid()},gid={os.getgid()}', info['device'], mount_point]
-    elif fstype in ['vfat', 'fat32', 'msdos']:
-        cmd = ['sudo', 'mount', '-t', 'vfat', '-o', f'uid={os.getuid()},gid={os.getgid()}', info['device'], mount_point]
-    elif fstype in ['ext4', 'ext3', 'ext2']:
-        cmd = ['sudo', 'mount', '-t', fstype, info['device'], mount_point]
-    else:
-        cmd = ['sudo', 'mount', info['device'], mount_point]
-        
-    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-    if result.returncode == 0:
-        print_success(f"Successfully mounted {name} at {mount_point}")
-        return True
-    else:
-        print_error(f"Mount failed for {name}")
-        if 'ntfs' in fstype or 'microsoft' in fdisk_ptype:
-            print_warning(f"💡 Suggestion: Run 'sudo ntfsfix {info['device']}' to fix filesystem errors")
+    def mountpoint_of(self, device):
+        """Return where a /dev path is mounted, or None"""
+        return self.by_device.get(device)
+
+    def is_mounted(self, device=None, path=None):
+        """True if the device is mounted anywhere, or if path is a mount point"""
+        if device and device in self.by_device:
+            return True
+        if path and path.rstrip('/') in self.by_path:
+            return True
         return False
 
-def unmount_drive(name):
-    """Unmount a drive by name"""
-    user = os.getlogin()
-    mount_point = f"/media/{user}/{name}"
-    
-    if not is_mounted(name):
-        return True
-    
-    print_loading(f"Unmounting {name}...")
-    result = subprocess.run(['sudo', 'umount', mount_point], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-    if result.returncode == 0:
+_mount_table = MountTable()
+
+def get_mount_table():
+    """Shared mount table, refreshed only when mounts changed"""
+    return _mount_table.refresh()
+
+def read_udev_properties(devnum):
+    """Read the E: properties udev recorded for a block device (major:minor)"""
+    props = {}
+    try:
+        with open(os.path.join(UDEV_DATA, f"b{devnum}")) as f:
+            for line in f:
+                if line.startswith('E:') and '=' in line:
+                    key, _, value = line[2:].rstrip('\n').partition('=')
+                    props[key] = value
+    except OSError:
+        pass
+    return props
+
+def decode_udev_string(value):
+    """Decode the \\xNN escapes udev uses in *_ENC properties"""
+    if not value or '\\x' not in value:
+        return value
+    try:
+        return value.encode('latin-1').decode('unicode_escape').encode('latin-1').decode('utf-8')
+    except (UnicodeError, ValueError):
+        return value
+
+def get_sysfs_transport(name, sys_path, props):
+    """Work out the transport (usb/sata/nvme/...) of a disk from sysfs"""
+    real = os.path.realpath(sys_path)
+    if name.startswith('nvme'):
+        return 'nvme'
+    if '/usb' in real:
+        return 'usb'
+    if name.startswith('mmcblk'):
+        return 'mmc'
+    if '/ata' in real:
+        return 'sata'
+    bus = props.get('ID_BUS')
+    if bus == 'ata':
+        return 'sata'
+    return bus
+
+def read_device_ranges(device, ranges):
+    """Read [(offset, length)] from a device as one batch: directly when readable, else in one request to a
+    privileged helper that is already running; empty reads otherwise (probe_disks() then re-runs the whole
+    probe of unreadable disks in a single sudo call). Never prompts, so it is safe on scanner threads."""
+    path = os.path.join(DEV_DIR, device.split('/')[-1])
+    if os.access(path, os.R_OK):
+        data = []
+        fd = os.open(path, os.O_RDONLY)
         try:
-            os.rmdir(mount_point)
-        except:
-            pass
-        print_success(f"Successfully unmounted {name}")
-        return True
-    else:
-        print_error(f"Failed to unmount {name}")
-        return False
+            for offset, length in ranges:
+                try:
+                    data.append(os.pread(fd, length, offset))
+                except OSError:
+                    data.append(b'')
+        finally:
+            os.close(fd)
+        return data
+    if not _helper.running():
+        return [b''] * len(ranges)
+    try:
+        results = _helper.call([{'op': 'probe', 'device': path, 'offset': offset, 'length': length}
+                                for offset, length in ranges])
+    except (OSError, ValueError):
+        return [b''] * len(ranges)
+    return [base64.b64decode(r['data']) if r['ok'] else b'' for r in results]
+
+def format_guid(raw):
+    """Mixed-endian on-disk GUID -> canonical lowercase string"""
+    a, b, c = struct.unpack('<IHH', raw[:8])
+    return f"{a:08x}-{b:04x}-{c:04x}-{raw[8:10].hex()}-{raw[10:16].hex()}"
+
+def format_uuid(raw):
+    """Big-endian 16-byte UUID (ext, swap) -> canonical string"""
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+def decode_label(raw, encoding='ascii'):
+    label = raw.decode(encoding, 'replace').split('\0')[0].strip()
+    return label or None
+
+def parse_gpt_header(data):
+    """GPT header fields if the signature and header CRC check out"""
+    if len(data) < 92 or data[:8] != GPT_SIGNATURE:
+        return None
+    header_size = struct.unpack_from('<I', data, 12)[0]
+    if not 92 <= header_size <= len(data):
+        return None
+    header = bytearray(data[:header_size])
+    header[16:20] = b'\0\0\0\0'
+    if zlib.crc32(header) != struct.unpack_from('<I', data, 16)[0]:
+        return None
+    entries_lba, count, entry_size, entries_crc = struct.unpack_from('<QIII', data, 72)
+    if entry_size < 128 or count > 1024:
+        return None
+    return {'entries_lba': entries_lba, 'count': count, 'entry_size': entry_size, 'entries_crc': entries_crc}
+
+def parse_gpt_entries(data, header, sector):
+    """Non-empty GPT partition entries"""
+    parts = []
+    for i in range(header['count']):
+        entry = data[i * header['entry_size']:(i + 1) * header['entry_size']]
+        if len(entry) < 128 or entry[:16] == bytes(16):
+            continue
+        first, last = struct.unpack_from('<QQ', entry, 32)
+        parts.append({'number': i + 1, 'ptype': format_guid(entry[:16]), 'partuuid': format_guid(entry[16:32]),
+                      'partlabel': decode_label(entry[56:128], 'utf-16-le'),
+                      'start': first * sector, 'size': (last - first + 1) * sector, 'bootable': False})
+    return parts
+
+def parse_mbr_entries(sector0):
+    """(type, start LBA, sectors, bootable) of the four MBR/EBR slots that are in use"""
+    entries = []
+    for i in range(4):
+        boot, ptype, start, sectors = struct.unpack_from('<B3xB3xII', sector0, 446 + i * 16)
+        if ptype and sectors:
+            entries.append((ptype, start, sectors, boot == 0x80))
+    return entries
+
+def partition_device(disk, number):
+    """/dev/sdb + 1 -> /dev/sdb1, /dev/nvme0n1 + 1 -> /dev/nvme0n1p1"""
+    return f"{disk}p{number}" if disk[-1].isdigit() else f"{disk}{number}"
+
+def read_partition_table(disk, head, backup, sector):
+    """('gpt'|'dos'|None, partitions) from the disk head, falling back to the backup GPT header"""
+    if len(head) < 512 or head[510:512] != b'\x55\xaa':
+        return None, []
+    # A boot sector at LBA 0 means a superfloppy (no partition table): its boot code is not an MBR
+    fs = parse_fs_signature(head)
+    if fs and fs['type'] in SUPERFLOPPY_TYPES:
+        return None, []
+    mbr = parse_mbr_entries(head)
+    if any(ptype == 0xee for ptype, *_ in mbr):
+        for header_data in (head[sector:sector + 512], backup):
+            header = parse_gpt_header(header_data)
+            if not header:
+                continue
+            offset, length = header['entries_lba'] * sector, header['count'] * header['entry_size']
+            if offset + length <= len(head):
+                entries = head[offset:offset + length]
+            else:
+                entries = read_device_ranges(disk, [(offset, length)])[0]
+            if zlib.crc32(entries) == header['entries_crc']:
+                return 'gpt', parse_gpt_entries(entries, header, sector)
+        return 'gpt', []
+
+    parts = []
+    for number, (ptype, start, sectors, boot) in enumerate(mbr, 1):
+        if ptype in MBR_EXTENDED_TYPES:
+            # Walk the EBR chain: each EBR holds one logical partition and a link to the next
+            ebr, logical = start, 5
+            for _ in range(MBR_MAX_LOGICAL):
+                data = read_device_ranges(disk, [(ebr * sector, 512)])[0]
+                if len(data) < 512 or data[510:512] != b'\x55\xaa':
+                    break
+                slots = parse_mbr_entries(data)
+                if slots and slots[0][0] not in MBR_EXTENDED_TYPES:
+                    ltype, lstart, lsectors, lboot = slots[0]
+                    parts.append({'number': logical, 'ptype': f"{ltype:#x}", 'start': (ebr + lstart) * sector,
+                                  'size': lsectors * sector, 'bootable': lboot})
+                    logical += 1
+                links = [s for s in slots[1:] if s[0] in MBR_EXTENDED_TYPES]
+                if not links:
+                    break
+                ebr = start + links[0][1]
+            continue
+        parts.append({'number': number, 'ptype': f"{ptype:#x}", 'start': start * sector,
+                      'size': sectors * sector, 'bootable': boot})
+    return 'dos', parts
+
+def parse_fs_signature(data):
+    """Filesystem type, label, UUID and size from the first blocks of a volume"""
+    if len(data) < 512:
+        return None
+    if data[:6] == b'LUKS\xba\xbe':
+        return {'type': 'crypto_LUKS', 'label': None, 'uuid': decode_label(data[168:208]), 'size': None}
+    bps = struct.unpack_from('<H', data, 11)[0]
+    if data[3:11] == b'NTFS    ':
+        spc = data[13] if data[13] <= 0x80 else 1 << (256 - data[13])
+        total, mft_lcn = struct.unpack_from('<QQ', data, 0x28)
+        per_record = struct.unpack_from('<b', data, 0x40)[0]
+        record = 1 << -per_record if per_record < 0 else per_record * spc * bps
+        serial = struct.unpack_from('<Q', data, 0x48)[0]
+        # The label is the $VOLUME_NAME attribute of MFT record 3 ($Volume)
+        return {'type': 'ntfs', 'label': None, 'uuid': f"{serial:016X}", 'size': total * bps,
+                'label_at': (mft_lcn * spc * bps + 3 * record, record), 'label_kind': 'ntfs', 'sector': bps}
+    if data[3:11] == b'EXFAT   ':
+        shift, cluster_shift = data[0x6C], data[0x6D]
+        length, = struct.unpack_from('<Q', data, 0x48)
+        heap, root, serial = struct.unpack_from('<III', data, 0x58)
+        cluster = 1 << (shift + cluster_shift)
+        return {'type': 'exfat', 'label': None, 'uuid': f"{serial >> 16:04X}-{serial & 0xffff:04X}",
+                'size': length << shift, 'label_at': ((heap << shift) + (root - 2) * cluster, min(cluster, 32 << 10)),
+                'label_kind': 'exfat'}
+    if len(data) >= 2048 and struct.unpack_from('<H', data, 1024 + 0x38)[0] == EXT_MAGIC:
+        sb = data[1024:2048]
+        blocks_lo, = struct.unpack_from('<I', sb, 0x04)
+        log_block, = struct.unpack_from('<I', sb, 0x18)
+        compat, incompat, ro_compat = struct.unpack_from('<III', sb, 0x5C)
+        blocks_hi = struct.unpack_from('<I', sb, 0x150)[0] if incompat & 0x80 else 0
+        if incompat & EXT4_INCOMPAT or ro_compat & EXT4_RO_COMPAT:
+            fstype = 'ext4'
+        elif compat & 0x4:
+            fstype = 'ext3'
+        else:
+            fstype = 'ext2'
+        return {'type': fstype, 'label': decode_label(sb[0x78:0x88], 'utf-8'), 'uuid': format_uuid(sb[0x68:0x78]),
+                'size': (blocks_hi << 32 | blocks_lo) * (1024 << log_block)}
+    if data[510:512] == b'\x55\xaa' and bps in (512, 1024, 2048, 4096):
+        total = struct.unpack_from('<H', data, 0x13)[0] or struct.unpack_from('<I', data, 0x20)[0]
+        if data[0x52:0x5A] == b'FAT32   ':
+            serial, label = struct.unpack_from('<I', data, 0x43)[0], data[0x47:0x52]
+        elif data[0x36:0x3A] == b'FAT1':
+            serial, label = struct.unpack_from('<I', data, 0x27)[0], data[0x2B:0x36]
+        else:
+            serial = None
+        if serial is not None:
+            label = decode_label(label, 'cp437')
+            return {'type': 'vfat', 'label': None if label == 'NO NAME' else label,
+                    'uuid': f"{serial >> 16:04X}-{serial & 0xffff:04X}", 'size': total * bps}
+    if len(data) >= 4096 and data[4086:4096] == b'SWAPSPACE2':
+        return {'type': 'swap', 'label': decode_label(data[1052:1068]), 'uuid': format_uuid(data[1036:1052]), 'size': None}
+    return None
+
+def parse_fs_label(fs, data):
+    """Label from the second read of an NTFS ($Volume MFT record) or exFAT (root directory) volume"""
+    if fs['label_kind'] == 'ntfs':
+        if data[:4] != b'FILE':
+            return None
+        record = bytearray(data)
+        usa_offset, usa_count = struct.unpack_from('<HH', record, 4)
+        step = fs['sector']
+        for i in range(1, usa_count):
+            # Undo the update-sequence fixup at the end of each sector
+            end = i * step
+            if end > len(record) or usa_offset + 2 * i + 2 > len(record):
+                break
+            record[end - 2:end] = record[usa_offset + 2 * i:usa_offset + 2 * i + 2]
+        pos = struct.unpack_from('<H', record, 0x14)[0]
+        while pos + 24 <= len(record):
+            kind, length = struct.unpack_from('<II', record, pos)
+            if kind == 0xFFFFFFFF or length == 0:
+                break
+            if kind == 0x60 and record[pos + 8] == 0:
+                size, offset = struct.unpack_from('<IH', record, pos + 0x10)
+                return decode_label(bytes(record[pos + offset:pos + offset + size]), 'utf-16-le')
+            pos += length
+        return None
+    for pos in range(0, len(data) - 31, 32):
+        kind = data[pos]
+        if kind == 0x00:
+            break
+        if kind == 0x83:
+            return decode_label(data[pos + 2:pos + 2 + 2 * min(data[pos + 1], 11)], 'utf-16-le')
+    return None
+
+@traced('probe: partition table')
+def probe_disk(disk):
+    """Partition table and filesystem signatures of one disk, read in a few small batches (no fdisk/blkid)"""
+    name = disk.split('/')[-1]
+    sector = int(read_sysfs(os.path.join(SYS_BLOCK, name, 'queue', 'logical_block_size'), '512') or 512)
+    size = int(read_sysfs(os.path.join(SYS_BLOCK, name, 'size'), '0') or 0) * 512
+    result = {'device': disk, 'table': None, 'partitions': [], 'fs': None, 'error': None}
+
+    ranges = [(0, PROBE_HEAD_BYTES)] + ([(size - sector, sector)] if size > PROBE_HEAD_BYTES else [])
+    head, *rest = read_device_ranges(disk, ranges)
+    if len(head) < 512:
+        result['error'] = 'unreadable'
+        return result
+    result['table'], parts = read_partition_table(disk, head, rest[0] if rest else b'', sector)
+
+    # Filesystem signatures: one batch for every partition's first blocks
+    if parts:
+        heads = read_device_ranges(disk, [(p['start'], PROBE_FS_BYTES) for p in parts])
+        volumes = []
+        for part, data in zip(parts, heads):
+            part['device'] = partition_device(disk, part['number'])
+            part['type_name'] = PARTITION_TYPE_NAMES.get(part['ptype'], part['ptype'])
+            part['fs'] = parse_fs_signature(data)
+            volumes.append((part['start'], part['fs']))
+        result['partitions'] = parts
+    else:
+        result['fs'] = parse_fs_signature(head)
+        volumes = [(0, result['fs'])]
+
+    # Labels that live outside the boot sector: one more batch
+    pending = [(base, fs) for base, fs in volumes if fs and fs.get('label_at')]
+    if pending:
+        labels = read_device_ranges(disk, [(base + fs['label_at'][0], fs['label_at'][1]) for base, fs in pending])
+        for (base, fs), data in zip(pending, labels):
+            fs['label'] = parse_fs_label(fs, data)
+    for _, fs in volumes:
+        if fs:
+            for key in ('label_at', 'label_kind', 'sector'):
+                fs.pop(key, None)
+    return result
+
+def probe_disks(disks, workers=None, deadline=None):
+    """probe_disk() across disks concurrently; {disk: result}, with error 'unresponsive' past the deadline.
+    Disks we cannot read are probed first, in one privileged call outside the deadline-bounded threads."""
+    disks = [d for d in disks if not d.split('/')[-1].startswith(PROBE_SKIP_PREFIXES)]
+    results = {}
+    locked = [d for d in disks if not os.access(os.path.join(DEV_DIR, d.split('/')[-1]), os.R_OK)]
+    if locked and os.geteuid() != 0 and not (os.environ.get('DRIVE_MASTER_HELPER') == '1' and _helper.start()):
+        for probe in run_on_devices('probe', locked, probe_disk, {'table': None, 'partitions': [], 'fs': None},
+                                    access=os.R_OK):
+            results[probe['device']] = probe
+        disks = [d for d in disks if d not in results]
+    for disk, probe, error in DeviceScanner(probe_disk, get_worker_count(workers)).scan(disks, deadline):
+        results[disk] = probe or {'device': disk, 'table': None, 'partitions': [], 'fs': None, 'error': error}
+    return results
+
+def get_probed_volumes(probe):
+    """{device: (partition entry or None, filesystem info or None)} for a probe_disk() result"""
+    if probe['partitions']:
+        return {p['device']: (p, p['fs']) for p in probe['partitions']}
+    return {probe['device']: (None, probe['fs'])}
+
+def get_sysfs_disk(disk_name, only=None):
+    """Probe one disk (and its partitions, or just partition `only`) from sysfs, udev data and mountinfo"""
+    drives = {}
+    if disk_name.startswith('ram'):
+        return drives
+    sys_path = os.path.join(SYS_BLOCK, disk_name)
+    sectors = int(read_sysfs(os.path.join(sys_path, 'size'), '0') or 0)
+    if sectors == 0 or read_sysfs(os.path.join(sys_path, 'hidden')) == '1':
+        return drives
+
+    table = get_mount_table()
+    disk_path = f"/dev/{disk_name}"
+    disk_devnum = read_sysfs(os.path.join(sys_path, 'dev'), '')
+    disk_props = read_udev_properties(disk_devnum)
+
+    transport = get_sysfs_transport(disk_name, sys_path, disk_props)
+    removable = read_sysfs(os.path.join(sys_path, 'removable')) == '1'
+    model = read_sysfs(os.path.join(sys_path, 'device', 'model')) or disk_props.get('ID_MODEL') or 'Unknown'
+
+    if transport == 'usb' or removable:
+        drive_type = 'USB'
+    elif transport in ['sata', 'nvme', 'ata']:
+        drive_type = 'Internal'
+    else:
+        drive_type = 'Other'
+
+    partitions = []
+    if only and only != disk_name:
+        partitions.append((0, only))
+    else:
+        for part_name in os.listdir(sys_path):
+            number = read_sysfs(os.path.join(sys_path, part_name, 'partition'))
+            if number:
+                partitions.append((int(number), part_name))
+
+    entries = [(disk_name, sys_path, disk_devnum, disk_props)]
+    if partitions:
+        entries = []
+        for _, part_name in sorted(partitions):
+            part_sys = os.path.join(sys_path, part_name)
+            part_devnum = read_sysfs(os.path.join(part_sys, 'dev'), '')
+            entries.append((part_name, part_sys, part_devnum, read_udev_properties(part_devnum)))
+
+    # No udev database entry (containers, udev not running yet): read the signatures ourselves when we can
+    volumes = {}
+    if (any(not props for *_, props in entries)
+            and not disk_name.startswith(PROBE_SKIP_PREFIXES)
+            and os.access(os.path.join(DEV_DIR, disk_name), os.R_OK)):
+        probe = probe_disk(disk_path)
+        if not probe['error']:
+            volumes = get_probed_volumes(probe)
+
+    for name, path, devnum, props in entries:
+        dev_path = f"/dev/{name}"
+        size = int(read_sysfs(os.path.join(path, 'size'), '0') or 0) * 512
+        part, fs = volumes.get(dev_path, (None, None))
+        fs = fs or {}
+        if partitions:
+            ptype = props.get('ID_PART_ENTRY_TYPE', '').lower() or (part['ptype'] if part else '')
+            fdisk_ptype = PARTITION_TYPE_NAMES.get(ptype, ptype or 'Unknown')
+        else:
+            fdisk_ptype = 'Disk'
+        drives[dev_path] = Drive(
+            device=dev_path,
+            parent=disk_path,
+            size=format_size(size),
+            fstype=props.get('ID_FS_TYPE') or fs.get('type'),
+            fdisk_ptype=fdisk_ptype,
+            label=decode_udev_string(props.get('ID_FS_LABEL_ENC')) or props.get('ID_FS_LABEL') or fs.get('label'),
+            # FUSE mounts (ntfs-3g) report an anonymous devnum, so also match on the source path
+            mountpoint=table.by_devnum.get(devnum) or table.mountpoint_of(dev_path),
+            uuid=props.get('ID_FS_UUID') or fs.get('uuid') or '',
+            type=drive_type,
+            model=model,
+            transport=transport
+        )
+    return drives
+
+@traced('enumerate: sysfs')
+def get_sysfs_drives():
+    """Get all drives straight from sysfs, udev data and mountinfo (no subprocesses)"""
+    drives = {}
+    if not os.path.isdir(SYS_BLOCK):
+        return drives
+    for disk_name in sorted(os.listdir(SYS_BLOCK)):
+        drives.update(get_sysfs_disk(disk_name))
+    return drives
+
+def get_all_drives():
+    """Get all drives from sysfs, falling back to lsblk + the native prober"""
+    start = time.monotonic()
+    try:
+        drives = get_sysfs_drives()
+    except Exception:
+        drives = {}
+    if drives:
+        metrics.observe('enumerate', time.monotonic() - start, True, driver='sysfs')
+        return drives
+    start = time.monotonic()
+    try:
+        drives = get_probe_lsblk_drives()
+    except Exception as e:
+        metrics.observe('enumerate', time.monotonic() - start, False, driver='probe+lsblk', error=str(e))
+        raise
+    metrics.observe('enumerate', time.monotonic() - start, True, driver='probe+lsblk')
+    return drives
+
+@traced('enumerate: probe+lsblk')
+def get_probe_lsblk_drives():
+    """Get all drives from the lsblk device tree, with types, labels and UUIDs from the native prober; raises
+    (OSError, subprocess.SubprocessError, ValueError) when lsblk fails, for the caller to report"""
+    drives = {}
+    lsblk_output = check_output_command(['lsblk', '-J', '-o', 'NAME,SIZE,TYPE,TRAN,RM,MODEL,FSTYPE,LABEL,MOUNTPOINT,UUID'], stderr=subprocess.DEVNULL,
+                                       timeout=get_scan_deadline() * 3).decode('utf-8')
+    with tracer.span('parse: lsblk json'):
+        disks = [dev for dev in json.loads(lsblk_output)['blockdevices'] if dev.get('type') == 'disk']
+    probes = probe_disks([f"/dev/{disk['name']}" for disk in disks])
+
+    for disk in disks:
+        disk_path = f"/dev/{disk['name']}"
+        probe = probes.get(disk_path)
+        volumes = get_probed_volumes(probe) if probe and not probe['error'] else {}
+        status = 'unresponsive' if probe and probe['error'] == 'unresponsive' else None
+
+        transport = disk.get('tran') or 'Unknown'
+        removable = disk.get('rm') in (True, '1', 1)
+        model = (disk.get('model') or 'Unknown').strip()
+        if transport == 'usb' or removable:
+            drive_type = 'USB'
+        elif transport in ['sata', 'nvme', 'ata']:
+            drive_type = 'Internal'
+        else:
+            drive_type = 'Other'
+
+        children = [c for c in disk.get('children', []) if c.get('type') == 'part'] or [disk]
+        for dev in children:
+            dev_path = f"/dev/{dev['name']}"
+            part, fs = volumes.get(dev_path, (None, None))
+            if dev is disk:
+                fdisk_ptype = 'Disk'
+            elif part:
+                fdisk_ptype = part['type_name']
+            else:
+                fdisk_ptype = 'Unknown'
+            fs = fs or {}
+            drives[dev_path] = Drive(
+                device=dev_path,
+                parent=disk_path,
+                size=format_size(part['size']) if part else dev.get('size', 'Unknown'),
+                fstype=fs.get('type') or dev.get('fstype'),
+                fdisk_ptype=fdisk_ptype,
+                label=fs.get('label') or dev.get('label'),
+                mountpoint=dev.get('mountpoint') or get_mount_table().mountpoint_of(dev_path),
+                uuid=fs.get('uuid') or dev.get('uuid') or '',
+                type=drive_type,
+                model=model,
+                transport=transport,
+                status=status
+            )
+
+    return drives
+
+def get_parent_disk_name(dev_name):
+    """Return the disk a partition belongs to (or the name itself for a disk)"""
+    sys_path = os.path.realpath(os.path.join(SYS_CLASS_BLOCK, dev_name))
+    if os.path.exists(os.path.join(sys_path, 'partition')):
+        return os.path.basename(os.path.dirname(sys_path))
+    return dev_name
+
+def parse_uevent(data):
+    """Parse a kernel or udev netlink uevent into a dict of properties"""
+    if data.startswith(b'libudev\0'):
+        # udev header: prefix[8], magic, header_size, properties_off, properties_len, ...
+        if len(data) < 24:
+            return {}
+        props_off, props_len = struct.unpack_from('=II', data, 16)
+        payload = data[props_off:props_off + props_len]
+    else:
+        # Kernel message: "action@devpath\0KEY=VALUE\0..."
+        payload = data.partition(b'\0')[2]
+    event = {}
+    for item in payload.split(b'\0'):
+        key, sep, value = item.partition(b'=')
+        if sep:
+            event[key.decode(errors='replace')] = value.decode(errors='replace')
+    return event
+
+def open_uevent_socket():
+    """Subscribe to kernel and udev block uevents; returns a non-blocking socket or None"""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    except (OSError, AttributeError):
+        return None
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        sock.bind((0, UEVENT_KERNEL_GROUP | UEVENT_UDEV_GROUP))
+        sock.setblocking(False)
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+def open_inotify(path, mask):
+    """Start an inotify watch on path; returns a non-blocking fd or None"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, path.encode(), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def read_inotify_names(fd):
+    """Drain pending inotify events and return the file names they refer to"""
+    names = []
+    while True:
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            break
+        offset = 0
+        while offset + 16 <= len(data):
+            _, _, _, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0').decode(errors='replace')
+            names.append(name)
+            offset += 16 + length
+    return names
+
+def resolve_device(ident):
+    """Resolve a device name/path, label, UUID or partition label via /dev/disk links, without scanning"""
+    if ident.startswith('/dev/'):
+        return os.path.realpath(ident) if os.path.exists(ident) else None
+    if '/' not in ident and os.path.exists(os.path.join(SYS_CLASS_BLOCK, ident)):
+        return f"/dev/{ident}"
+    ident_lower = ident.lower()
+    for links in (DISK_BY_LABEL, DISK_BY_UUID, DISK_BY_PARTLABEL):
+        if '/' not in ident and os.path.exists(os.path.join(links, ident)):
+            return os.path.realpath(os.path.join(links, ident))
+        try:
+            names = os.listdir(links)
+        except OSError:
+            continue
+        for name in names:
+            # udev escapes spaces and other specials (\x20) in link names
+            if decode_udev_string(name).lower() == ident_lower:
+                return os.path.realpath(os.path.join(links, name))
+    return None
+
+@traced('enumerate: single device')
+def probe_device(dev_path):
+    """Probe a single device from sysfs into a drive dict"""
+    name = dev_path.split('/')[-1]
+    disk_name = get_parent_disk_name(name)
+    if not os.path.isdir(os.path.join(SYS_BLOCK, disk_name)):
+        return None
+    return get_sysfs_disk(disk_name, only=name).get(dev_path)
+
+def lookup_drive(ident):
+    """Find one drive by device, label or UUID, probing only that device when possible"""
+    dev_path = resolve_device(ident)
+    if dev_path:
+        info = probe_device(dev_path)
+        if info:
+            return info
+    return get_inventory().find(ident)
+
+def get_runtime_dir():
+    """Per-user runtime directory (tmpfs, cleared at logout/reboot), else the cache directory"""
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    return os.path.join(runtime, 'drive-master') if runtime else get_cache_dir()
+
+def read_boot_id():
+    return read_sysfs(BOOT_ID_PATH, '')
+
+def get_disk_identity(disk_name):
+    """What must match for a snapshot of a disk to still describe it: devnum, size and media sequence number"""
+    sys_path = os.path.join(SYS_BLOCK, disk_name)
+    return [read_sysfs(os.path.join(sys_path, key), '') for key in ('dev', 'size', 'diskseq')]
+
+class DeviceScanner:
+    """Runs a per-disk probe on daemon threads; a probe past its deadline is reported unresponsive, not waited on"""
+
+    def __init__(self, probe, workers=SCAN_WORKERS, on_late=None):
+        self.probe = probe
+        self.workers = workers
+        self.on_late = on_late
+        self.pending = {}
+        self._queue = queue.SimpleQueue()
+        self._threads = 0
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def submit(self, name):
+        """Future for a probe of name; joins the probe already in flight for it"""
+        with self._lock:
+            future = self.pending.get(name)
+            if future:
+                return future
+            future = Future()
+            future.started = None
+            future.reported = False
+            self.pending[name] = future
+            self._queue.put((name, future))
+            # Disks stuck past their deadline do not count against the worker limit
+            deadline = get_scan_deadline()
+            overdue = sum(1 for f in self.pending.values() if f.started and time.monotonic() - f.started > deadline)
+            if self._queue.qsize() > self._idle and self._threads < self.workers + overdue:
+                self._threads += 1
+                threading.Thread(target=self._work, name='drive-scan', daemon=True).start()
+            return future
+
+    def _work(self):
+        while True:
+            with self._lock:
+                self._idle += 1
+            try:
+                name, future = self._queue.get(timeout=SCAN_IDLE_EXIT)
+            except queue.Empty:
+                with self._lock:
+                    self._idle -= 1
+                    if self._queue.empty():
+                        self._threads -= 1
+                        return
+                continue
+            with self._lock:
+                self._idle -= 1
+            future.started = time.monotonic()
+            try:
+                result = self.probe(name)
+            except Exception as e:
+                with self._lock:
+                    self.pending.pop(name, None)
+                future.set_exception(e)
+                continue
+            with self._lock:
+                self.pending.pop(name, None)
+                future.set_result(result)
+                late = future.reported
+            if late and self.on_late:
+                self.on_late(name, result)
+
+    def scan(self, names, deadline=None):
+        """Yield (name, result, error) as probes finish; error is 'unresponsive' for probes past the deadline"""
+        deadline = get_scan_deadline() if deadline is None else deadline
+        futures = {self.submit(name): name for name in names}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            starts = [f.started for f in pending if f.started]
+            timeout = max(0.0, min(starts) + deadline - now) if starts else deadline
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, str(e) or type(e).__name__
+            now = time.monotonic()
+            overdue = {f for f in pending if f.started and now - f.started >= deadline}
+            if not done and not overdue and not any(f.started for f in pending):
+                # Nothing has even started within a whole deadline: every worker is wedged
+                overdue = set(pending)
+            with self._lock:
+                # A probe finishing right now is still a result, not a late one
+                overdue = {f for f in overdue if not f.done()}
+                for future in overdue:
+                    future.reported = True
+            for future in overdue:
+                yield futures[future], None, 'unresponsive'
+            pending -= overdue
+
+def get_unresponsive_disk(disk_name):
+    """Placeholder record for a disk whose probe missed its deadline (sysfs size only, nothing read from it)"""
+    disk_path = f"/dev/{disk_name}"
+    sectors = int(read_sysfs(os.path.join(SYS_BLOCK, disk_name, 'size'), '0') or 0)
+    return {disk_path: Drive(device=disk_path, parent=disk_path, size=format_size(sectors * 512), fstype=None,
+                             fdisk_ptype='Disk', label=None, mountpoint=get_mount_table().mountpoint_of(disk_path),
+                             uuid='', type='Other', model='Unknown', transport=None, status='unresponsive')}
+
+class DriveInventory:
+    """Drive list cached until the kernel reports a block device change"""
+
+    def __init__(self):
+        self.drives = {}
+        self.scans = 0
+        self.reprobes = 0
+        self.events = 0
+        self.source = None
+        self.native = False
+        # Why the last full scan found nothing (lsblk fallback failed), for the caller to report
+        self.error = None
+        self._sock = None
+        self._inotify = None
+        self._disks = {}
+        self._dirty = set()
+        self._full_rescan = True
+        self._mount_builds = None
+        self._index = {}
+        self._by_uuid = {}
+        self._by_label = {}
+        self._by_parent = {}
+        self._index_for = None
+        self._late = {}
+        self._late_lock = threading.Lock()
+        self._scanner = DeviceScanner(self._probe, on_late=self._on_late)
+        self._lock = threading.RLock()
+        self._saved_for = None
+        self.changes = None
+
+    def _watch(self):
+        """Start listening for uevents (netlink, else inotify on /dev/disk/by-uuid)"""
+        if self.source:
+            return
+        self._sock = open_uevent_socket()
+        if self._sock:
+            self.source = 'netlink'
+            return
+        self._inotify = open_inotify(DISK_BY_UUID, IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO)
+        if self._inotify is not None:
+            self.source = 'inotify'
+
+    def _drain(self):
+        """Collect the disks touched by pending events"""
+        if self._sock:
+            while True:
+                try:
+                    data = self._sock.recv(65536)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    # ENOBUFS: events were dropped, so nothing can be trusted
+                    self._full_rescan = True
+                    break
+                event = parse_uevent(data)
+                if event.get('SUBSYSTEM') != 'block':
+                    continue
+                self.events += 1
+                parts = event.get('DEVPATH', '').split('/')
+                if 'block' in parts and parts.index('block') + 1 < len(parts):
+                    self._dirty.add(parts[parts.index('block') + 1])
+                else:
+                    self._full_rescan = True
+        elif self._inotify is not None:
+            for name in read_inotify_names(self._inotify):
+                self.events += 1
+                link = os.path.join(DISK_BY_UUID, name)
+                if os.path.exists(link):
+                    self._dirty.add(get_parent_disk_name(os.path.basename(os.path.realpath(link))))
+                    continue
+                gone = [info['parent'] for info in self.drives.values() if info.get('uuid') == name]
+                if gone:
+                    self._dirty.add(gone[0].split('/')[-1])
+                else:
+                    self._full_rescan = True
+
+    def _probe(self, disk_name):
+        return get_sysfs_disk(disk_name) if os.path.isdir(os.path.join(SYS_BLOCK, disk_name)) else {}
+
+    def _on_late(self, disk_name, entries):
+        """A disk flagged unresponsive finally answered: keep it for the next get()"""
+        with self._late_lock:
+            self._late[disk_name] = entries
+
+    def _collect(self, names):
+        """Probe disks through the scanner, yielding (disk, entries, error) as each one answers"""
+        for disk_name, entries, error in self._scanner.scan(names):
+            if error == 'unresponsive':
+                entries = get_unresponsive_disk(disk_name)
+            elif error:
+                entries = self._disks.get(disk_name, {})
+            if entries:
+                self._disks[disk_name] = entries
+            else:
+                self._disks.pop(disk_name, None)
+            yield disk_name, entries, error
+
+    def _scan(self):
+        """Full enumeration of every block device, streamed per disk"""
+        self.scans += 1
+        self._dirty.clear()
+        self._full_rescan = False
+        self._disks = {}
+        names = sorted(os.listdir(SYS_BLOCK)) if os.path.isdir(SYS_BLOCK) else []
+        try:
+            with tracer.span('enumerate: sysfs'):
+                for item in self._collect(names):
+                    if item[1]:
+                        yield item
+        finally:
+            self._rebuild()
+        self.native = bool(self.drives)
+        self.error = None
+        if not self.native:
+            try:
+                self.drives = get_probe_lsblk_drives()
+            except Exception as e:
+                self.error = f"drive scan failed: {e}"
+                self.drives = {}
+            self._disks = {}
+            for path, info in self.drives.items():
+                self._disks.setdefault(info['parent'].split('/')[-1], {})[path] = info
+            for disk_name in sorted(self._disks):
+                yield disk_name, self._disks[disk_name], None
+
+    def _reprobe(self):
+        """Re-probe only the disks named by events"""
+        if not self.native:
+            yield from self._scan()
+            return
+        names = sorted(self._dirty)
+        self._dirty.clear()
+        self.reprobes += len(names)
+        try:
+            with tracer.span('enumerate: reprobe changed disks'):
+                yield from self._collect(names)
+        finally:
+            self._rebuild()
+
+    def _rebuild(self):
+        self.drives = {path: info for name in sorted(self._disks) for path, info in self._disks[name].items()}
+
+    def _take_late(self):
+        """Fold in disks that answered after being reported unresponsive"""
+        with self._late_lock:
+            late, self._late = self._late, {}
+        for disk_name, entries in late.items():
+            if disk_name in self._dirty or self._full_rescan:
+                continue
+            if entries:
+                self._disks[disk_name] = entries
+            else:
+                self._disks.pop(disk_name, None)
+        if late:
+            self._rebuild()
+        return list(late)
+
+    def _sync_mounts(self):
+        """Refresh mount points from the mount table when mounts changed"""
+        table = get_mount_table()
+        if table.builds == self._mount_builds:
+            return
+        self._mount_builds = table.builds
+        for info in self.drives.values():
+            if not info.get('mountpoint') or not table.is_mounted(path=info['mountpoint']):
+                info['mountpoint'] = table.mountpoint_of(info['device'])
+
+    def invalidate(self, device=None):
+        """Force a re-probe of one device, or of everything"""
+        if device:
+            self._dirty.add(get_parent_disk_name(device.split('/')[-1]))
+        else:
+            self._full_rescan = True
+
+    def stream(self):
+        """Rescan what changed, yielding (disk, entries, error) per disk as it answers; error is 'unresponsive'
+        for a disk past the scan deadline, which is listed with a placeholder and filled in by a later call"""
+        self._watch()
+        if self.source is None:
+            self._full_rescan = True
+        else:
+            self._drain()
+        for disk_name in self._take_late():
+            yield disk_name, self._disks.get(disk_name, {}), None
+        if self._full_rescan:
+            yield from self._scan()
+        elif self._dirty:
+            yield from self._reprobe()
+        self._sync_mounts()
+
+    def get(self):
+        """Current drives, rescanning only what changed"""
+        with self._lock:
+            for _ in self.stream():
+                pass
+            self.save_snapshot()
+            return self.drives
+
+    def save_snapshot(self):
+        """Persist the drive list for the next startup (unresponsive placeholders left out)"""
+        if self._saved_for is self.drives:
+            return
+        self._saved_for = self.drives
+        disks = {}
+        for disk_name, entries in self._disks.items():
+            if any(info.get('status') for info in entries.values()):
+                continue
+            disks[disk_name] = {'identity': get_disk_identity(disk_name),
+                                'drives': [info.to_dict() for info in entries.values()]}
+        try:
+            write_json_atomic(os.path.join(get_runtime_dir(), SNAPSHOT_FILE),
+                              {'version': VERSION, 'boot_id': read_boot_id(), 'native': self.native, 'disks': disks},
+                              indent=None, dir_mode=0o700)
+        except OSError:
+            pass
+
+    def load_snapshot(self):
+        """Seed the drive list from the last scan of this boot, marked 'stale'; True if anything was loaded.
+        Disks whose devnum, size or media sequence changed since are left for the rescan."""
+        try:
+            with open(os.path.join(get_runtime_dir(), SNAPSHOT_FILE)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if snapshot.get('version') != VERSION or not snapshot.get('boot_id') or snapshot['boot_id'] != read_boot_id():
+            return False
+        disks = {}
+        for disk_name, disk in snapshot.get('disks', {}).items():
+            if disk.get('identity') != get_disk_identity(disk_name):
+                continue
+            entries = {}
+            for record in disk.get('drives', []):
+                info = Drive(**record)
+                info['status'] = 'stale'
+                entries[info['device']] = info
+            disks[disk_name] = entries
+        if not disks:
+            return False
+        with self._lock:
+            self._disks = disks
+            self.native = snapshot.get('native', True)
+            self._rebuild()
+            self._saved_for = self.drives
+            self._full_rescan = True
+            self._sync_mounts()
+        return True
+
+    def revalidate(self):
+        """Rescan in the background; the next get() waits for it, and self.changes says what moved"""
+        def run():
+            before = {path: info.to_dict() for path, info in self.drives.items()}
+            with self._lock:
+                drives = self.get()
+                self.changes = diff_drives(before, drives)
+        thread = threading.Thread(target=run, name='drive-revalidate', daemon=True)
+        thread.start()
+        return thread
+
+    def take_changes(self):
+        """Changes found by the last background rescan, once"""
+        with self._lock:
+            changes, self.changes = self.changes, None
+            return changes
+
+    def unresponsive(self):
+        """Disks currently listed with an unresponsive placeholder"""
+        return sorted({info['parent'] for info in self.drives.values() if info.get('status') == 'unresponsive'})
+
+    def _indexes(self):
+        """Build the lookup indexes once per drive list"""
+        drives = self.get()
+        if self._index_for is not drives:
+            index, by_uuid, by_label, by_parent = {}, {}, {}, {}
+            for path, info in drives.items():
+                if info.get('uuid'):
+                    by_uuid[info['uuid'].lower()] = info
+                if info.get('label'):
+                    by_label.setdefault(info['label'].lower(), info)
+                by_parent.setdefault(info['parent'], []).append(info)
+                for key in (info.get('uuid'), info.get('label'), path.split('/')[-1], path):
+                    if key:
+                        index.setdefault(str(key).lower(), info)
+            self._index, self._by_uuid, self._by_label, self._by_parent = index, by_uuid, by_label, by_parent
+            self._index_for = drives
+        return drives
+
+    def find(self, ident):
+        """Look a drive up by lowercased device path/name, label or UUID"""
+        self._indexes()
+        return self._index.get(ident.lower())
+
+    def by_uuid(self, uuid):
+        self._indexes()
+        return self._by_uuid.get(uuid.lower())
+
+    def by_label(self, label):
+        self._indexes()
+        return self._by_label.get(label.lower())
+
+    def on_disk(self, parent):
+        """All drives on one parent disk (/dev/sdb)"""
+        self._indexes()
+        return list(self._by_parent.get(parent, []))
+
+    def stats(self):
+        """Counters showing how much scanning the cache saved"""
+        return {'scans': self.scans, 'reprobes': self.reprobes, 'events': self.events, 'source': self.source}
+
+def diff_drives(before, after):
+    """{'added': [...], 'removed': [...], 'changed': [...]} device paths between two drive lists"""
+    fields = [key for key in Drive.__slots__ if key != 'status']
+    return {
+        'added': [path for path in after if path not in before],
+        'removed': [path for path in before if path not in after],
+        'changed': [path for path, info in after.items()
+                    if path in before and any(before[path].get(key) != info.get(key) for key in fields)],
+    }
+
+_inventory = DriveInventory()
+
+def get_inventory():
+    """Shared drive inventory"""
+    return _inventory
+
+def list_drives(drives):
+    """List all drives with detailed information, a page at a time."""
+    view = ListView()
+    while True:
+        screen = Screen()
+        pages = render_drive_list(screen, drives, view, load_speed_cache())
+        if pages > 1:
+            screen.add(format_option("N", "➡️", "Next page", Colors.CYAN))
+            screen.add(format_option("B", "⬅️", "Previous page", Colors.CYAN))
+        screen.add(format_option("F", "🔎", "Filter (type, filesystem, mounted state)", Colors.YELLOW))
+        screen.add(format_option("T", "📑", "Detailed cards" if view.compact else "Compact table", Colors.BLUE))
+        screen.add(format_option("S", "🚀", "Speed test mounted drives", Colors.GREEN))
+        screen.add(format_option("0", "⬅️", "Back to Main Menu", Colors.WHITE))
+        screen.flush()
+        choice = click.prompt(f"{Colors.CYAN}Enter choice{Colors.END}", type=str, default="0").strip().upper()
+        if choice == 'N':
+            view.page = min(view.page + 1, pages - 1)
+        elif choice == 'B':
+            view.page = max(view.page - 1, 0)
+        elif choice == 'T':
+            view.compact = not view.compact
+            view.page = 0
+        elif choice == 'F':
+            view.set_filter(click.prompt(f"{Colors.CYAN}Filter, e.g. 'usb ntfs unmounted' (blank clears){Colors.END}",
+                                         type=str, default="", show_default=False))
+        elif choice == 'S':
+            speed_test_mounted(drives)
+        else:
+            return
+
+def speed_test_mounted(drives):
+    mounted = {path: info for path, info in drives.items() if is_drive_mounted(info)}
+    if not mounted:
+        print_warning("No mounted drives to test.")
+        return
+    print_loading(f"Speed testing {len(mounted)} drive(s)...")
+    for record in probe_speeds(mounted):
+        if record['error']:
+            print_error(f"{record['device']}: {record['error']}")
+        else:
+            print_success(f"{record['device']}: {format_speed(record)}")
+
+class ListView:
+    """Filters, page and layout of the drive listing"""
+
+    def __init__(self, drive_type=None, fstype=None, mounted=None, compact=False, page_size=None):
+        self.drive_type = drive_type
+        self.fstype = fstype
+        self.mounted = mounted
+        self.compact = compact
+        self.page_size = page_size
+        self.page = 0
+
+    def set_filter(self, text):
+        """Parse 'usb ntfs unmounted'-style words; anything that isn't a type or state is a filesystem"""
+        self.drive_type = self.fstype = self.mounted = None
+        self.page = 0
+        for word in text.lower().split():
+            if word in ('usb', 'internal', 'other'):
+                self.drive_type = word
+            elif word in ('mounted', 'unmounted'):
+                self.mounted = word == 'mounted'
+            else:
+                self.fstype = word
+
+    def describe(self):
+        words = [self.drive_type, self.fstype, {True: 'mounted', False: 'unmounted'}.get(self.mounted)]
+        return ' '.join(w for w in words if w)
+
+    def per_page(self, screen):
+        """Drives per page: page_size if set (0 = all), else what fits the terminal"""
+        if self.page_size is not None:
+            return self.page_size or None
+        return max(1, screen.height - 10) if self.compact else max(3, (screen.height - 10) // CARD_LINES)
+
+def filter_drives(drives, drive_type=None, fstype=None, mounted=None):
+    """Drives matching a type (usb/internal/other), filesystem and mounted state; None matches anything"""
+    return {path: info for path, info in drives.items()
+            if (not drive_type or info['type'].lower() == drive_type.lower())
+            and (not fstype or (info['fstype'] or '').lower() == fstype.lower())
+            and (mounted is None or bool(info['mountpoint']) == mounted)}
+
+def get_drive_mount_path(info, name, table, user):
+    """Where a drive is mounted (also found by its /media/<user>/<name> path), or None"""
+    mount_path = info['mountpoint'] or table.mountpoint_of(info['device'])
+    if not mount_path and table.is_mounted(path=f"/media/{user}/{name}"):
+        mount_path = f"/media/{user}/{name}"
+    return mount_path
+
+# Drive listing group headings, in display order
+DRIVE_GROUPS = (('USB', f"{Colors.MAGENTA}{Colors.BOLD}💾 USB DRIVES{Colors.END}"),
+                ('Internal', f"{Colors.BLUE}{Colors.BOLD}💽 INTERNAL DRIVES{Colors.END}"),
+                ('Other', f"{Colors.YELLOW}{Colors.BOLD}📀 OTHER DRIVES{Colors.END}"))
+
+def render_drive_list(screen, drives, view, speeds=None):
+    """Header, one page of filtered drives (cards grouped by type, or table rows) and a page footer; returns the page count"""
+    speeds = {} if speeds is None else speeds
+    shown = filter_drives(drives, view.drive_type, view.fstype, view.mounted)
+    items = list(shown.items())
+    if not view.compact:
+        # Cards are grouped by type, so pages have to follow the group order
+        order = {drive_type: i for i, (drive_type, _) in enumerate(DRIVE_GROUPS)}
+        items.sort(key=lambda item: order.get(item[1]['type'], len(order)))
+    per_page = view.per_page(screen) or max(1, len(items))
+    pages = max(1, -(-len(items) // per_page))
+    view.page = min(view.page, pages - 1)
+    page = dict(items[view.page * per_page:(view.page + 1) * per_page])
+
+    screen.separator()
+    title = "Compact" if view.compact else "Detailed Info"
+    screen.add(f"{Colors.BLUE}{Colors.BOLD}📋 ALL DRIVES DETECTED ({title}){Colors.END}"
+               + (f" {Colors.YELLOW}[{view.describe()}]{Colors.END}" if view.describe() else ""))
+    screen.separator()
+
+    table, user = get_mount_table(), get_user()
+    if view.compact:
+        render_drive_table(screen, page, speeds, table, user)
+    else:
+        for drive_type, heading in DRIVE_GROUPS:
+            # Card numbers count within the type across all pages
+            numbers = {path: i for i, path in enumerate((p for p, v in items if v['type'] == drive_type), 1)}
+            group = [(path, info) for path, info in page.items() if info['type'] == drive_type]
+            if group:
+                screen.add(heading)
+            for path, info in group:
+                name = info.get('label') or path.split('/')[-1]
+                render_drive_card(screen, name, info, numbers[path], drive_type, get_cached_speed(info, speeds),
+                                  get_drive_mount_path(info, name, table, user))
+    if not shown:
+        screen.add(f"{Colors.YELLOW}No drives match the filter.{Colors.END}")
+    if pages > 1 or len(shown) != len(drives):
+        screen.add(f"{Colors.CYAN}Page {view.page + 1}/{pages} · {len(shown)} of {len(drives)} drive(s){Colors.END}")
+    return pages
+
+def render_drive_table(screen, drives, speeds, table=None, user=None):
+    """One row per drive, cut to the terminal width"""
+    table, user = table or get_mount_table(), user or get_user()
+    rows = []
+    for path, info in drives.items():
+        name = info.get('label') or path.split('/')[-1]
+        speed = get_cached_speed(info, speeds)
+        if info.get('status') == 'unresponsive':
+            dot, where = Colors.YELLOW, 'unresponsive'
+        else:
+            where = get_drive_mount_path(info, name, table, user)
+            dot = Colors.GREEN if where else Colors.RED
+        rows.append((dot, [path, info['size'], info['type'], info['fstype'] or '-', info.get('label') or '-',
+                           where or '-', format_speed(speed) if speed else '']))
+    widths = [14, 9, 8, 10, 16]
+    rest = max(10, screen.width - sum(widths) - len(widths) - 3)
+    header = ['DEVICE', 'SIZE', 'TYPE', 'FS', 'LABEL', 'MOUNT / SPEED']
+    screen.add(f"{Colors.BOLD}  " + " ".join(fit(h, w) for h, w in zip(header, widths + [rest])).rstrip() + Colors.END)
+    for dot, cells in rows:
+        tail = cells[5] + (f"  {cells[6]}" if cells[6] else '')
+        screen.add(f"{dot}●{Colors.END} " + " ".join(fit(c, w) for c, w in zip(cells[:5], widths)) + " " + fit(tail, rest).rstrip())
+
+def show_drive_list(drives, view=None):
+    """Print the drive listing (first page unless a view says otherwise) in one write"""
+    screen = Screen()
+    render_drive_list(screen, drives, view or ListView(), load_speed_cache())
+    screen.flush()
+
+def watch_drive_list(view, interval=1.0):
+    """Full-screen table that redraws only changed rows as drives come, go, mount or unmount"""
+    inventory = get_inventory()
+    renderer = DiffRenderer()
+    width = None
+    try:
+        while True:
+            screen = Screen()
+            if screen.width != width:
+                renderer.previous, width = None, screen.width
+            render_drive_list(screen, inventory.get(), view, load_speed_cache())
+            screen.add(f"{Colors.WHITE}Updated {datetime.now():%H:%M:%S} · Ctrl+C to stop{Colors.END}")
+            renderer.draw(screen.lines)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+
+def display_drive_info(name, info, index, drive_type, speed=None):
+    """Display detailed drive information"""
+    screen = Screen()
+    render_drive_card(screen, name, info, index, drive_type, speed,
+                      get_drive_mount_path(info, name, get_mount_table(), get_user()))
+    screen.flush()
+
+def render_drive_card(screen, name, info, index, drive_type, speed, mount_path):
+    """Detailed drive card"""
+    mounted = bool(mount_path)
+    status_icon = "🟢" if mounted else "🔴"
+    status_text = f"{Colors.GREEN}MOUNTED{Colors.END}" if mounted else f"{Colors.RED}NOT MOUNTED{Colors.END}"
+    if info.get('status') == 'unresponsive':
+        status_icon = "⚠️"
+        status_text = f"{Colors.YELLOW}UNRESPONSIVE{Colors.END} (did not answer the scan)"
+
+    screen.add(f"{Colors.CYAN}╭─ {drive_type} Drive #{index}{Colors.END}")
+    screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.YELLOW}{Colors.BOLD}📁 Name:{Colors.END} {name}")
+    screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.BLUE}📏 Size:{Colors.END} {info['size']}")
+    screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.MAGENTA}💾 Device:{Colors.END} {info['device']}")
+    screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.WHITE}💻 Model:{Colors.END} {info['model']}")
+    screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.ORANGE}📀 Format:{Colors.END} {info['fstype']} ({info.get('fdisk_ptype', 'Unknown')})")
+    if mounted:
+        screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.GREEN}📂 Path:{Colors.END} {mount_path}")
+    if speed:
+        screen.add(f"{Colors.CYAN}├─{Colors.END} {Colors.BLUE}🚀 Speed:{Colors.END} {format_speed(speed)}")
+    screen.add(f"{Colors.CYAN}╰─{Colors.END} {Colors.WHITE}📊 Status:{Colors.END} {status_icon} {status_text}")
+    screen.add()
+
+def get_cache_dir():
+    """Per-user cache directory for drive-master state"""
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'drive-master')
+
+_speed_lock = threading.Lock()
+
+def load_speed_cache():
+    """{uuid or device: speed record} from the cache file"""
+    try:
+        with open(os.path.join(get_cache_dir(), SPEED_CACHE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_speed_record(key, record):
+    """Merge one speed record into the cache file (atomic replace)"""
+    with _speed_lock:
+        cache = load_speed_cache()
+        cache[key] = record
+        write_json_atomic(os.path.join(get_cache_dir(), SPEED_CACHE_FILE), cache)
+
+def get_cached_speed(info, cache=None):
+    """Last speed probe of a drive (keyed by UUID, else device), or None"""
+    cache = load_speed_cache() if cache is None else cache
+    return cache.get(info.get('uuid') or info['device'])
+
+def format_age(timestamp):
+    seconds = max(0, time.time() - timestamp)
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit} ago"
+    return "just now"
+
+def format_speed(record):
+    """One-line summary of a speed record"""
+    if record.get('error'):
+        return f"{record['error']} ({format_age(record['time'])})"
+    iops = f"{record['iops_4k']:.0f} IOPS" + ("" if record['direct'] else " (cached)")
+    return (f"read {record['read_mbps']:.1f} MB/s, write {record['write_mbps']:.1f} MB/s, "
+            f"4K random {iops} ({format_age(record['time'])})")
+
+def open_direct(path):
+    """Open for O_DIRECT reads; (fd, True), or a page-cache-dropped buffered fd and False where unsupported"""
+    if hasattr(os, 'O_DIRECT'):
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        except OSError:
+            pass
+        else:
+            try:
+                # Some filesystems (FUSE, tmpfs) accept the flag but fail the read
+                with mmap.mmap(-1, SPEED_ALIGN) as probe:
+                    os.preadv(fd, [probe], 0)
+                return fd, True
+            except OSError:
+                os.close(fd)
+    fd = os.open(path, os.O_RDONLY)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    return fd, False
+
+@traced('speed probe')
+def probe_speed(info, size=SPEED_TEST_BYTES):
+    """Sequential write/read of a temp file on the mounted filesystem plus 4K random reads; caches the result"""
+    mount_point = info.get('mountpoint') or get_mount_table().mountpoint_of(info['device'])
+    record = {'device': info['device'], 'time': time.time(), 'error': None}
+    if not mount_point:
+        record['error'] = 'not mounted'
+        return record
+    try:
+        free = shutil.disk_usage(mount_point).free
+    except OSError as e:
+        # Mount point gone since the listing (stick pulled)
+        record['error'] = e.strerror or str(e)
+        return record
+    size = min(size, free // 2) // SPEED_BLOCK * SPEED_BLOCK
+    if size < SPEED_BLOCK:
+        record['error'] = 'no free space'
+        return record
+
+    chunk = os.urandom(SPEED_BLOCK)
+    buf = mmap.mmap(-1, SPEED_BLOCK)  # page-aligned, as O_DIRECT requires
+    small = mmap.mmap(-1, SPEED_ALIGN)
+    path = None
+    try:
+        fd, path = tempfile.mkstemp(dir=mount_point, prefix='.drive-master-speed-')
+        try:
+            start = time.perf_counter()
+            for _ in range(size // SPEED_BLOCK):
+                os.write(fd, chunk)
+            os.fsync(fd)
+            record['write_mbps'] = size / (time.perf_counter() - start) / 1e6
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+        fd, direct = open_direct(path)
+        try:
+            start = time.perf_counter()
+            while os.readv(fd, [buf]):
+                pass
+            record['read_mbps'] = size / (time.perf_counter() - start) / 1e6
+
+            blocks = size // SPEED_ALIGN
+            ops = 0
+            start = time.perf_counter()
+            deadline = start + SPEED_RANDOM_SECONDS
+            while ops < SPEED_RANDOM_OPS and time.perf_counter() < deadline:
+                os.preadv(fd, [small], int.from_bytes(os.urandom(4), 'little') % blocks * SPEED_ALIGN)
+                ops += 1
+            record['iops_4k'] = ops / (time.perf_counter() - start)
+            record['direct'] = direct
+        finally:
+            os.close(fd)
+        record['bytes'] = size
+    except OSError as e:
+        record['error'] = e.strerror or str(e)
+    finally:
+        if path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        buf.close()
+        small.close()
+    try:
+        save_speed_record(info.get('uuid') or info['device'], record)
+    except OSError:
+        pass
+    return record
+
+def probe_speeds(drives, workers=None):
+    """Speed-probe mounted drives: different disks concurrently (bounded), partitions of one disk in turn"""
+    by_disk = {}
+    for path, info in drives.items():
+        by_disk.setdefault(info.get('parent') or path, []).append(info)
+    results = {}
+    workers = min(get_worker_count(workers), SPEED_MAX_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for records in pool.map(lambda infos: [probe_speed(info) for info in infos], by_disk.values()):
+            for record in records:
+                results[record['device']] = record
+    return [results[info['device']] for info in drives.values()]
+
+def get_user():
+    """Login name for /media/<user>; works without a controlling terminal (cron, scripts)"""
+    try:
+        return os.getlogin()
+    except OSError:
+        return os.environ.get('SUDO_USER') or pwd.getpwuid(os.getuid()).pw_name
+
+def check_media_path(path):
+    """Reject any helper path that does not resolve under /media/"""
+    real = os.path.realpath(path)
+    if not real.startswith(MEDIA_ROOT) or real.rstrip('/') == MEDIA_ROOT.rstrip('/'):
+        raise ValueError(f"path outside {MEDIA_ROOT}: {path}")
+    return real
+
+def check_block_device(path):
+    """Reject anything that is not a block device node"""
+    if not path.startswith('/dev/') or not stat.S_ISBLK(os.stat(path).st_mode):
+        raise ValueError(f"not a block device: {path}")
+    return path
+
+def check_mount_options(options, caller):
+    """Allow-listed mount options plus nosuid,nodev; uid=/gid= may only name the caller"""
+    checked = []
+    for option in (options.split(',') if options else []):
+        name, eq, value = option.partition('=')
+        if eq:
+            if name not in HELPER_MOUNT_VALUE_OPTIONS or not re.fullmatch(r'[A-Za-z0-9_.-]+', value):
+                raise ValueError(f"mount option not allowed: {option}")
+            if name in ('uid', 'gid') and int(value) != caller[0 if name == 'uid' else 1]:
+                raise ValueError(f"mount option not allowed for this user: {option}")
+        elif option not in HELPER_MOUNT_OPTIONS:
+            raise ValueError(f"mount option not allowed: {option}")
+        if option not in checked:
+            checked.append(option)
+    return ','.join(checked + [o for o in HELPER_FORCED_OPTIONS if o not in checked])
+
+def check_probe_device(path):
+    """A block device the prober may read: never a disk holding system filesystems"""
+    check_block_device(path)
+    disk = f"/dev/{get_parent_disk_name(os.path.basename(os.path.realpath(path)))}"
+    if disk in get_system_disks():
+        raise ValueError(f"system disk: {path}")
+    return path
+
+def helper_op_command(op, caller):
+    """Validate a typed privileged operation for a caller (uid, gid) and build its argv (without sudo)"""
+    kind = op.get('op')
+    if kind not in HELPER_OPS:
+        raise ValueError(f"operation not allowed: {kind}")
+    if kind == 'mkdir':
+        return ['mkdir', '-p', check_media_path(op['path'])]
+    if kind == 'rmdir':
+        return ['rmdir', check_media_path(op['path'])]
+    if kind == 'chown':
+        if (int(op['uid']), int(op['gid'])) != tuple(caller):
+            raise ValueError(f"chown only to the caller ({caller[0]}:{caller[1]})")
+        return ['chown', f"{int(op['uid'])}:{int(op['gid'])}", check_media_path(op['path'])]
+    if kind == 'mount':
+        cmd = ['mount']
+        if op.get('fstype'):
+            if op['fstype'] not in HELPER_FSTYPES:
+                raise ValueError(f"filesystem not allowed: {op['fstype']}")
+            cmd += ['-t', op['fstype']]
+        cmd += ['-o', check_mount_options(op.get('options'), caller)]
+        source = op['source']
+        if source.startswith('UUID='):
+            if not re.fullmatch(r'UUID=[A-Za-z0-9-]+', source):
+                raise ValueError(f"invalid UUID: {source}")
+        else:
+            check_block_device(source)
+        return cmd + [source, check_media_path(op['target'])]
+    if kind == 'umount':
+        return ['umount'] + (['-l'] if op.get('lazy') else []) + [check_media_path(op['target'])]
+    # probe: raw read of a block device
+    length = int(op.get('length', 4096))
+    offset = int(op.get('offset', 0))
+    if not 0 < length <= HELPER_MAX_PROBE or offset < 0:
+        raise ValueError("invalid probe range")
+    return ['dd', f"if={check_probe_device(op['device'])}", 'bs=65536', f'skip={offset}', f'count={length}',
+            'iflag=skip_bytes,count_bytes', 'status=none']
+
+def run_helper_op(op, caller):
+    """Run one allow-listed operation inside the privileged helper for a caller (uid, gid)"""
+    try:
+        cmd = helper_op_command(op, caller)
+        kind = op['op']
+        if kind == 'mkdir':
+            os.makedirs(cmd[-1], exist_ok=True)
+        elif kind == 'rmdir':
+            os.rmdir(cmd[-1])
+        elif kind == 'chown':
+            os.chown(cmd[-1], int(op['uid']), int(op['gid']))
+        elif kind == 'probe':
+            fd = os.open(op['device'], os.O_RDONLY)
+            try:
+                data = os.pread(fd, int(op.get('length', 4096)), int(op.get('offset', 0)))
+            finally:
+                os.close(fd)
+            return {'ok': True, 'returncode': 0, 'error': None, 'data': base64.b64encode(data).decode()}
+        else:
+            proc = run_command(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            return {'ok': proc.returncode == 0, 'returncode': proc.returncode,
+                    'error': proc.stderr.decode('utf-8', 'replace').strip() or None}
+        return {'ok': True, 'returncode': 0, 'error': None}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return {'ok': False, 'returncode': 1, 'error': str(e)}
+
+def run_op_batch(ops, runner):
+    """Run ops in order, skipping the rest of the batch after the first failure"""
+    results = []
+    for op in ops:
+        if results and not results[-1]['ok']:
+            results.append({'ok': False, 'returncode': 1, 'error': 'skipped after earlier failure'})
+        else:
+            results.append(runner(op))
+    return results
+
+def run_sudo_op(op):
+    """Fallback: run one operation through its own sudo process"""
+    try:
+        cmd = ['sudo'] + helper_op_command(op, (os.getuid(), os.getgid()))
+    except (ValueError, KeyError, TypeError, OSError) as e:
+        return {'ok': False, 'returncode': 1, 'error': str(e)}
+    proc = run_command(cmd, stdout=subprocess.PIPE if op['op'] == 'probe' else subprocess.DEVNULL, stderr=subprocess.PIPE)
+    result = {'ok': proc.returncode == 0, 'returncode': proc.returncode,
+              'error': proc.stderr.decode('utf-8', 'replace').strip() or None}
+    if op['op'] == 'probe':
+        result['data'] = base64.b64encode(proc.stdout or b'').decode()
+    return result
+
+def serve_helper_connection(conn, owner):
+    """Answer JSON-line batches from one client connection"""
+    with conn:
+        pid, uid, gid = struct.unpack('3i', conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))
+        if uid not in (owner, 0):
+            return
+        with conn.makefile('rwb') as f:
+            for line in f:
+                try:
+                    request = json.loads(line)
+                    results = run_op_batch(request.get('ops', []), lambda op: run_helper_op(op, (uid, gid)))
+                except (ValueError, AttributeError) as e:
+                    results = [{'ok': False, 'returncode': 1, 'error': f"bad request: {e}"}]
+                f.write(json.dumps({'results': results}).encode() + b'\n')
+                f.flush()
+
+def run_privileged_helper(socket_path, client_pid):
+    """Privileged helper main loop; exits when the client process goes away"""
+    owner = int(os.environ.get('SUDO_UID', os.getuid()))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chown(socket_path, owner, -1)
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    server.settimeout(1.0)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                try:
+                    os.kill(client_pid, 0)
+                except ProcessLookupError:
+                    break
+                except PermissionError:
+                    pass
+                continue
+            conn.settimeout(None)
+            threading.Thread(target=serve_helper_connection, args=(conn, owner), daemon=True).start()
+    finally:
+        server.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+def get_helper_command():
+    """argv that re-runs this program (script or frozen binary)"""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable]
+    return [sys.executable, os.path.abspath(__file__)]
+
+class PrivilegedHelper:
+    """Client for a long-lived root helper started once through sudo"""
+
+    def __init__(self):
+        self.proc = None
+        self.socket_path = None
+        self.failed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @traced('helper start')
+    def start(self, timeout=60):
+        """Start the helper via sudo; returns False if it could not be started"""
+        with self._lock:
+            if self.proc and self.proc.poll() is None:
+                return True
+            if self.failed:
+                return False
+            tmpdir = tempfile.mkdtemp(prefix='drive-master-')
+            self.socket_path = os.path.join(tmpdir, 'helper.sock')
+            cmd = ['sudo'] + get_helper_command() + ['--privileged-helper', self.socket_path, '--helper-client', str(os.getpid())]
+            try:
+                self.proc = subprocess.Popen(cmd)
+            except OSError:
+                self.failed = True
+                return False
+            deadline = time.monotonic() + timeout
+            while not os.path.exists(self.socket_path):
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    self.failed = True
+                    return False
+                time.sleep(0.02)
+            atexit.register(self.close)
+            return True
+
+    def _conn(self):
+        f = getattr(self._local, 'file', None)
+        if f is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            f = self._local.file = sock.makefile('rwb')
+        return f
+
+    def running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def call(self, ops):
+        """Send one batch and wait for its results"""
+        f = self._conn()
+        f.write(json.dumps({'ops': ops}).encode() + b'\n')
+        f.flush()
+        line = f.readline()
+        if not line:
+            raise OSError("privileged helper closed the connection")
+        return json.loads(line)['results']
+
+    def close(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+        if self.socket_path:
+            shutil.rmtree(os.path.dirname(self.socket_path), ignore_errors=True)
+
+_helper = PrivilegedHelper()
+
+def run_privileged(ops):
+    """Run a batch of typed privileged ops via the helper if enabled, else via sudo per op"""
+    if os.environ.get('DRIVE_MASTER_HELPER') == '1' and _helper.start():
+        try:
+            with tracer.span('helper batch', 'command', ops=[op.get('op') for op in ops]):
+                return _helper.call(ops)
+        except (OSError, ValueError):
+            pass
+    return run_op_batch(ops, run_sudo_op)
+
+def prime_sudo(jobs=2):
+    """Before a bulk operation starts jobs workers that each run sudo: ask for the password once here (sudo -v),
+    so concurrent sudo prompts never share the terminal. True if privileged ops can run (root, the helper is up,
+    or sudo accepted); always True for a single job"""
+    if jobs <= 1 or os.geteuid() == 0 or _helper.running():
+        return True
+    if os.environ.get('DRIVE_MASTER_HELPER') == '1' and _helper.start():
+        return True
+    try:
+        return run_command(['sudo', '-v']).returncode == 0
+    except OSError:
+        return False
+
+def get_mount_point_ops(mount_point):
+    """mkdir + chown ops for a missing mount point"""
+    if os.path.exists(mount_point):
+        return []
+    return [{'op': 'mkdir', 'path': mount_point},
+            {'op': 'chown', 'path': mount_point, 'uid': os.getuid(), 'gid': os.getgid()}]
+
+@traced('mount-state check')
+def is_drive_mounted(info):
+    """Check if drive is mounted by info or path"""
+    if info['mountpoint']:
+        return True
+    table = get_mount_table()
+    if table.is_mounted(device=info['device']):
+        return True
+    user = get_user()
+    name = info.get('label') or info['device'].split('/')[-1]
+    return table.is_mounted(path=f"/media/{user}/{name}")
+
+@traced('mount-state check')
+def is_mounted(name):
+    """Check if drive name is mounted in /media/user/name"""
+    user = get_user()
+    return get_mount_table().is_mounted(path=f"/media/{user}/{name}")
+
+def get_worker_count(workers=None):
+    """Worker count for bulk operations"""
+    if workers:
+        return max(1, int(workers))
+    try:
+        return max(1, int(os.environ.get('DRIVE_MASTER_WORKERS', DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+def get_scan_deadline():
+    """Seconds before a disk probe is reported unresponsive; SCAN_DEADLINE unless the environment sets a valid one"""
+    try:
+        deadline = float(os.environ.get('DRIVE_MASTER_SCAN_DEADLINE', SCAN_DEADLINE))
+    except ValueError:
+        return SCAN_DEADLINE
+    return deadline if 0 < deadline < float('inf') else SCAN_DEADLINE
+
+def mount_drive(uuid, name, dev):
+    """Standard mount function"""
+    info = lookup_drive(dev) or (lookup_drive(uuid) if uuid else None)
+    return bool(info) and mount_info_result(info, name)['status'] != 'failed'
+
+def mount_all_parallel(drives, workers=None):
+    """Mount drives concurrently: different disks in parallel, partitions of one disk in order"""
+    by_disk = {}
+    for path, info in drives.items():
+        by_disk.setdefault(info.get('parent') or path, []).append((path, info))
+    if not prime_sudo(min(len(by_disk), get_worker_count(workers))):
+        return [{'device': info['device'], 'name': info.get('label') or path.split('/')[-1],
+                 'mount_point': f"/media/{get_user()}/{info.get('label') or path.split('/')[-1]}", 'status': 'failed',
+                 'error': SUDO_FAILED, 'fstype': info.get('fstype'), 'elapsed': 0.0} for path, info in drives.items()]
+
+    def mount_disk(entries):
+        results = []
+        for path, info in entries:
+            name = info.get('label') or path.split('/')[-1]
+            results.append(mount_info_result(info, name))
+        return results
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=get_worker_count(workers)) as pool:
+        for disk_results in pool.map(mount_disk, by_disk.values()):
+            for r in disk_results:
+                results[r['device']] = r
+    return [results[info['device']] for info in drives.values()]
+
+def print_bulk_report(title, results):
+    """Print the per-device report of a bulk mount/unmount"""
+    print_separator()
+    print(f"{Colors.MAGENTA}{Colors.BOLD}{title}{Colors.END}")
+    print_separator()
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+        if r['status'] in ('failed', 'busy', 'skipped'):
+            icon, color = "❌", Colors.RED
+        elif r['status'].startswith('already'):
+            icon, color = "ℹ️ ", Colors.BLUE
+        else:
+            icon, color = "✅", Colors.GREEN
+        via = f" via {r['driver']}" if r.get('driver') and r['status'] == 'mounted' else ""
+        print(f"{icon} {Colors.WHITE}{r['name']}{Colors.END} [{r['device']}] {color}{r['status']}{Colors.END}{via} → {r['mount_point']} ({r['elapsed']:.2f}s)")
+        if r['error']:
+            print(f"   {Colors.RED}{r['error']}{Colors.END}")
+        if r.get('holders'):
+            print(f"   {Colors.YELLOW}In use by: {format_holders(r['holders'])}{Colors.END}")
+    summary = ", ".join(f"{n} {status}" for status, n in counts.items())
+    print_info(f"{len(results)} drive(s): {summary}")
+
+@functools.lru_cache(maxsize=None)
+def get_available_drivers():
+    """Mount drivers usable here: kernel filesystems (registered, built in or loadable) and FUSE ntfs-3g"""
+    drivers = set()
+    try:
+        with open(PROC_FILESYSTEMS) as f:
+            drivers.update(line.split()[-1] for line in f if line.strip())
+    except OSError:
+        pass
+    for index in ('modules.builtin', 'modules.dep'):
+        try:
+            with open(os.path.join('/lib/modules', os.uname().release, index)) as f:
+                for line in f:
+                    path = line.split(':', 1)[0]
+                    if '/fs/' in path:
+                        drivers.add(os.path.basename(path).split('.ko')[0])
+        except OSError:
+            pass
+    fuse = 'fuse' in drivers or os.path.exists('/dev/fuse')
+    if fuse and any(shutil.which(tool) or os.path.exists(f"/sbin/{tool}")
+                    for tool in ('ntfs-3g', 'mount.ntfs-3g')):
+        drivers.add('ntfs-3g')
+    return frozenset(drivers)
+
+def get_disk_queue(info):
+    """(rotational, supports discard) of the disk holding a drive"""
+    disk = (info.get('parent') or info['device']).split('/')[-1]
+    queue = os.path.join(SYS_BLOCK, get_parent_disk_name(disk), 'queue')
+    rotational = read_sysfs(os.path.join(queue, 'rotational'), '1') != '0'
+    discard = int(read_sysfs(os.path.join(queue, 'discard_max_bytes'), '0') or 0) > 0
+    return rotational, discard
+
+def get_mount_profile(info):
+    """Option profile: DRIVE_MASTER_MOUNT_PROFILE, else 'removable' for USB drives and 'throughput' otherwise"""
+    profile = os.environ.get('DRIVE_MASTER_MOUNT_PROFILE')
+    if profile in MOUNT_PROFILES:
+        return profile
+    return 'removable' if str(info.get('transport') or '').lower() == 'usb' else 'throughput'
+
+def get_mount_candidates(info, mount_point, source=None):
+    """Mount ops for a drive, fastest available driver first, with its profile options"""
+    fstype = str(info.get('fstype') or "").lower()
+    fdisk_ptype = str(info.get('fdisk_ptype') or "").lower()
+    if fstype in ('fat32', 'msdos'):
+        fstype = 'vfat'
+    elif not fstype and 'microsoft' in fdisk_ptype:
+        fstype = 'ntfs'
+    source = source or info['device']
+    if fstype not in MOUNT_DRIVERS:
+        return [{'op': 'mount', 'source': source, 'target': mount_point}]
+
+    available = get_available_drivers()
+    drivers = [d for d in MOUNT_DRIVERS[fstype] if d in available] or list(MOUNT_DRIVERS[fstype])
+    profile = get_mount_profile(info)
+    rotational, discard = get_disk_queue(info)
+    ops = []
+    for driver in drivers:
+        options = list(MOUNT_PROFILES[profile].get(driver, ()))
+        if driver in OWNER_DRIVERS:
+            options += [f'uid={os.getuid()}', f'gid={os.getgid()}']
+        if profile != 'compat' and not rotational and discard and driver in DISCARD_DRIVERS:
+            options.append('discard')
+        op = {'op': 'mount', 'fstype': driver, 'source': source, 'target': mount_point}
+        if options:
+            op['options'] = ','.join(options)
+        ops.append(op)
+    return ops
+
+def mount_with_fallback(info, mount_point, source=None):
+    """Try each candidate driver until one mounts; returns (mount op used, error, failed attempts)"""
+    prep = get_mount_point_ops(mount_point)
+    attempts = []
+    error = None
+    for mount_op in get_mount_candidates(info, mount_point, source):
+        start = time.monotonic()
+        results = run_privileged(prep + [mount_op])
+        failed = [r for r in results if not r['ok']]
+        if not failed:
+            error = None
+            break
+        error = failed[0]['error'] or f"mount exited with code {failed[0]['returncode']}"
+        attempts.append({'driver': mount_op.get('fstype', 'auto'), 'options': mount_op.get('options'),
+                         'error': error, 'elapsed': time.monotonic() - start})
+        if failed[0] is not results[-1]:
+            # mount point setup failed; another driver will not help
+            break
+        prep = []
+    # Attempts a later driver replaced are counted here; the caller counts the final outcome
+    for attempt in (attempts if error is None else attempts[:-1]):
+        metrics.observe('mount', attempt['elapsed'], False, fstype=info.get('fstype'), transport=info.get('transport'),
+                        driver=attempt['driver'], error=attempt['error'], device=info['device'])
+    return mount_op, error, attempts
+
+@traced('mount')
+def mount_info_result(info, name):
+    """Mount a drive with the options for its filesystem; returns a result record"""
+    start = time.monotonic()
+    mount_point = f"/media/{get_user()}/{name}"
+    result = {'device': info['device'], 'name': name, 'mount_point': mount_point, 'status': 'mounted', 'error': None,
+              'fstype': info.get('fstype')}
+
+    if is_drive_mounted(info):
+        result['status'] = 'already mounted'
+        result['mount_point'] = info['mountpoint'] or get_mount_table().mountpoint_of(info['device']) or mount_point
+    else:
+        mount_op, error, attempts = mount_with_fallback(info, mount_point)
+        result.update(driver=mount_op.get('fstype', 'auto'), options=mount_op.get('options'), attempts=attempts)
+        if error:
+            result.update(status='failed', error=error)
+
+    result['elapsed'] = time.monotonic() - start
+    metrics.observe_result('mount', result, info)
+    return result
+
+def mount_drive_enhanced(info, name):
+    """Enhanced mount function with UI and repair suggestion"""
+    mount_point = f"/media/{get_user()}/{name}"
+    
+    print_separator()
+    print(f"{Colors.YELLOW}{Colors.BOLD}🔌 MOUNTING: {name}{Colors.END}")
+    print_separator()
+    
+    if is_drive_mounted(info):
+        print_info(f"{name} is already mounted")
+        return True
+    
+    if not os.path.exists(mount_point):
+        print_loading("Creating mount point...")
+    
+    print_loading(f"Mounting {name}...")
+    result = mount_info_result(info, name)
+    
+    for attempt in result.get('attempts', []):
+        print_warning(f"{attempt['driver']} could not mount {name}: {attempt['error']}")
+    if result['status'] == 'already mounted':
+        # Mounted by someone else (daemon, another worker) since the check above
+        print_info(f"{name} is already mounted at {result['mount_point']}")
+        return True
+    if result['status'] != 'failed':
+        print_success(f"Successfully mounted {name} at {result['mount_point']} (driver: {result.get('driver') or 'auto'})")
+        return True
+    else:
+        print_error(f"Mount failed for {name}")
+        fstype = str(info.get('fstype') or "").lower()
+        fdisk_ptype = str(info.get('fdisk_ptype') or "").lower()
+        if 'ntfs' in fstype or 'microsoft' in fdisk_ptype:
+            print_warning(f"💡 Suggestion: Run 'sudo ntfsfix {info['device']}' to fix filesystem errors")
+        return False
+
+def find_mount_holders(mount_point):
+    """List (pid, command) of processes with files, cwd or root under a mount point"""
+    holders = []
+    prefix = mount_point.rstrip('/') + '/'
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        proc_dir = os.path.join('/proc', pid)
+        links = [os.path.join(proc_dir, 'cwd'), os.path.join(proc_dir, 'root'), os.path.join(proc_dir, 'exe')]
+        try:
+            links += [os.path.join(proc_dir, 'fd', fd) for fd in os.listdir(os.path.join(proc_dir, 'fd'))]
+        except OSError:
+            pass
+        for link in links:
+            try:
+                target = os.readlink(link)
+            except OSError:
+                continue
+            if target == mount_point or target.startswith(prefix):
+                holders.append((int(pid), read_sysfs(os.path.join(proc_dir, 'comm'), '?')))
+                break
+    return holders
+
+@traced('unmount')
+def unmount_path_result(name, device, mount_point, lazy=False):
+    """Unmount one mount point and return a result record"""
+    start = time.monotonic()
+    result = {'device': device, 'name': name, 'mount_point': mount_point, 'status': 'unmounted', 'error': None, 'holders': []}
+    entry = get_mount_table().by_path.get(mount_point)
+    driver = entry['fstype'] if entry else None
+    proc = run_privileged([{'op': 'umount', 'target': mount_point, 'lazy': lazy}])[0]
+    if proc['ok']:
+        if lazy:
+            result['status'] = 'lazily unmounted'
+        try:
+            os.rmdir(mount_point)
+        except OSError:
+            pass
+    else:
+        error = proc['error'] or f"umount exited with code {proc['returncode']}"
+        result['error'] = error
+        if 'busy' in error:
+            result['status'] = 'busy'
+            result['holders'] = find_mount_holders(mount_point)
+        else:
+            result['status'] = 'failed'
+    result['elapsed'] = time.monotonic() - start
+    metrics.observe_result('unmount', result, driver=driver)
+    return result
+
+def format_holders(holders):
+    return ", ".join(f"{comm} (pid {pid})" for pid, comm in holders)
+
+def unmount_drive(name):
+    """Unmount a drive by name"""
+    user = get_user()
+    mount_point = f"/media/{user}/{name}"
+    
+    if not is_mounted(name):
+        return True
+    
+    print_loading(f"Unmounting {name}...")
+    result = unmount_path_result(name, None, mount_point)
+    
+    if result['status'] == 'unmounted':
+        print_success(f"Successfully unmounted {name}")
+        return True
+    else:
+        print_error(f"Failed to unmount {name}: {result['error']}")
+        if result['holders']:
+            print_warning(f"In use by: {format_holders(result['holders'])}")
+        return False
 
 def mount_menu(drives):
     """Interactive Select-to-Mount menu"""
-    mountable = {path: info for path, info in drives.items() if not is_drive_mounted(info)}
+    mountable = {path: info for path, info in drives.items()
+                 if not is_drive_mounted(info) and info.get('status') != 'unresponsive'}
     
     if not mountable:
         print_info("No unmounted drives available.")
         return
 
     print_separator()
-    print(f"{Colors.YELLOW}{Colors.BOLD}🔌 SELECT DRIVE TO MOUNT{Colors.END}")
+    print(f"{Colors.YELLOW}{Colors.BOLD}🔌 SELECT DRIVE TO MOUNT{Colors.END}")
+    print_separator()
+    
+    for i, (path, info) in enumerate(mountable.items(), 1):
+        name = info.get('label') or path.split('/')[-1]
+        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.WHITE}{name}{Colors.END} ({info['size']}) - {info['fstype']} [{path}]")
+    
+    print_option("0", "⬅️", "Back", Colors.WHITE)
+    try:
+        choice = click.prompt(f"{Colors.YELLOW}Enter number{Colors.END}", type=str).strip()
+        if choice == '0': return
+        idx = int(choice) - 1
+        if 0 <= idx < len(mountable):
+            path = list(mountable.keys())[idx]
+            info = mountable[path]
+            name = info.get('label') or path.split('/')[-1]
+            mount_drive_enhanced(info, name)
+    except:
+        pass
+
+def unmount_menu(drives):
+    """Interactive Select-to-Unmount menu"""
+    mounted = {}
+    for path, info in drives.items():
+        name = info.get('label') or path.split('/')[-1]
+        if is_mounted(name):
+            mounted[path] = info
+            
+    if not mounted:
+        print_info("No drives are currently mounted.")
+        return
+
+    print_separator()
+    print(f"{Colors.ORANGE}{Colors.BOLD}🔓 SELECT DRIVE TO UNMOUNT{Colors.END}")
+    print_separator()
+    
+    for i, (path, info) in enumerate(mounted.items(), 1):
+        name = info.get('label') or path.split('/')[-1]
+        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.WHITE}{name}{Colors.END} [{path}]")
+
+    print_option("0", "⬅️", "Back", Colors.WHITE)
+    try:
+        choice = click.prompt(f"{Colors.ORANGE}Enter number{Colors.END}", type=str).strip()
+        if choice == '0': return
+        idx = int(choice) - 1
+        if 0 <= idx < len(mounted):
+            path = list(mounted.keys())[idx]
+            name = mounted[path].get('label') or path.split('/')[-1]
+            unmount_drive(name)
+    except:
+        pass
+
+def mount_all_unmounted(drives, workers=None):
+    """Mount everything that isn't mounted, in parallel, and report per-device results"""
+    unmounted = {path: info for path, info in drives.items()
+                 if not is_drive_mounted(info) and info.get('status') != 'unresponsive'}
+    if not unmounted:
+        print_info("All drives already mounted.")
+        return
+    print_info(f"Mounting {len(unmounted)} drives...")
+    start = time.monotonic()
+    results = mount_all_parallel(unmounted, workers)
+    print_bulk_report("⚡ MOUNT REPORT", results)
+    print_info(f"Finished in {time.monotonic() - start:.2f}s")
+    return results
+
+def get_writeback_stats():
+    """Dirty and Writeback totals from /proc/meminfo, in bytes"""
+    stats = {'Dirty': 0, 'Writeback': 0}
+    try:
+        with open(MEMINFO) as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in stats:
+                    stats[key] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return stats
+
+@traced('syncfs')
+def syncfs_path(path):
+    """Flush a single filesystem with syncfs(2)"""
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syncfs(fd) == 0
+    except (OSError, AttributeError):
+        os.sync()
+        return True
+    finally:
+        os.close(fd)
+
+def sync_with_progress(mount_points, workers=None, progress=True):
+    """syncfs every filesystem concurrently while showing live writeback progress"""
+    with ThreadPoolExecutor(max_workers=get_worker_count(workers)) as pool:
+        pending = {pool.submit(syncfs_path, mp) for mp in mount_points}
+        while pending:
+            _, pending = wait(pending, timeout=0.2)
+            if not progress:
+                continue
+            stats = get_writeback_stats()
+            done = len(mount_points) - len(pending)
+            print(f"\r{Colors.CYAN}⏳{Colors.END} Flushing {done}/{len(mount_points)} filesystem(s) - "
+                  f"dirty {format_size(stats['Dirty'])}, writeback {format_size(stats['Writeback'])}   ", end="", flush=True)
+    if progress:
+        print(f"\r{Colors.GREEN}✓{Colors.END} Flushed {len(mount_points)} filesystem(s){' ' * 40}")
+
+def unmount_in_order(targets, workers=None):
+    """Unmount {mount_point: (name, device)} in parallel, nested mounts before their parents"""
+    if not prime_sudo(min(len(targets), get_worker_count(workers))):
+        return [{'device': device, 'name': name, 'mount_point': mp, 'status': 'failed', 'error': SUDO_FAILED,
+                 'holders': [], 'elapsed': 0.0} for mp, (name, device) in targets.items()]
+    remaining = dict(targets)
+    failed = set()
+    results = {}
+    with ThreadPoolExecutor(max_workers=get_worker_count(workers)) as pool:
+        while remaining:
+            ready = [mp for mp in remaining
+                     if not any(other.startswith(mp.rstrip('/') + '/') for other in remaining)]
+            blocked = [mp for mp in ready
+                       if any(f.startswith(mp.rstrip('/') + '/') for f in failed)]
+            for mp in blocked:
+                name, device = remaining[mp]
+                results[mp] = {'device': device, 'name': name, 'mount_point': mp, 'status': 'skipped',
+                               'error': 'a nested mount is still mounted', 'holders': [], 'elapsed': 0.0}
+            run = [mp for mp in ready if mp not in blocked]
+            for r in pool.map(lambda mp: unmount_path_result(*remaining[mp], mp), run):
+                results[r['mount_point']] = r
+                if r['status'] != 'unmounted':
+                    failed.add(r['mount_point'])
+            failed.update(blocked)
+            for mp in ready:
+                remaining.pop(mp)
+    return [results[mp] for mp in targets]
+
+def get_unmount_targets(drives):
+    """{mount_point: (name, device)} for drives mounted in /media/user/"""
+    table = get_mount_table()
+    user = get_user()
+    targets = {}
+    for path, info in drives.items():
+        name = info.get('label') or path.split('/')[-1]
+        mount_point = f"/media/{user}/{name}"
+        if table.is_mounted(path=mount_point):
+            targets[mount_point] = (name, info['device'])
+    return targets
+
+def add_nested_targets(targets):
+    """Anything mounted inside one of our drives has to go first"""
+    for mount_point, entry in get_mount_table().by_path.items():
+        if any(mount_point.startswith(t + '/') for t in list(targets)):
+            targets.setdefault(mount_point, (os.path.basename(mount_point), entry['source']))
+    return targets
+
+def unmount_all_mounted(drives, workers=None):
+    """Unmount everything that is mounted in /media/user/, in parallel"""
+    targets = get_unmount_targets(drives)
+    
+    if not targets:
+        print_info("No drives to unmount.")
+        return
+        
+    if not click.confirm(f"{Colors.RED}Unmount all {len(targets)} drives?{Colors.END}"):
+        return
+
+    add_nested_targets(targets)
+    start = time.monotonic()
+    sync_with_progress(list(targets), workers)
+    results = unmount_in_order(targets, workers)
+
+    stuck = [r for r in results if r['status'] in ('busy', 'skipped')]
+    if stuck:
+        for r in stuck:
+            if r['holders']:
+                print_warning(f"{r['name']} is in use by: {format_holders(r['holders'])}")
+        if click.confirm(f"{Colors.YELLOW}Lazy-unmount {len(stuck)} busy drive(s)? They detach now and finish once no longer in use{Colors.END}"):
+            for i in sorted(range(len(results)), key=lambda i: -len(results[i]['mount_point'])):
+                r = results[i]
+                if r['status'] in ('busy', 'skipped'):
+                    results[i] = unmount_path_result(r['name'], r['device'], r['mount_point'], lazy=True)
+
+    print_bulk_report("🚫 UNMOUNT REPORT", results)
+    print_info(f"Finished in {time.monotonic() - start:.2f}s")
+    return results
+
+def get_usb_drives():
+    """Helper to get only USB drives"""
+    all_drives = get_inventory().get()
+    return {path: info for path, info in all_drives.items() if info['type'] == 'USB'}
+
+def no_progress(device, phase=None, fraction=None, note=None):
+    """Progress callback that ignores updates"""
+
+def device_result(device, status, error, fields):
+    """Result record for a device an operation never ran on (fields: the operation's other keys and defaults)"""
+    return {'device': device, 'name': device.split('/')[-1], 'status': status, 'error': error, **fields, 'elapsed': 0.0}
+
+def run_on_devices(command, devices, run_one, fields, workers=None, access=os.R_OK | os.W_OK, options=(), args=None):
+    """run_one(device) for each device on a worker pool (in this thread for a single device, so Ctrl-C stops it)
+    when this process can open them all; otherwise re-run `drive-master <command> --json <options> <args or devices>`
+    through sudo (its progress shows on stderr) and return its records, or a failed record per device if it
+    produced none"""
+    if os.geteuid() == 0 or all(os.access(device, access) for device in devices):
+        if len(devices) == 1:
+            return [run_one(devices[0])]
+        with ThreadPoolExecutor(max_workers=get_worker_count(workers)) as pool:
+            return list(pool.map(run_one, devices))
+    cmd = ['sudo'] + get_helper_command() + [command, '--json'] + list(options)
+    if workers:
+        cmd += ['--workers', str(workers)]
+    proc = run_command(cmd + list(devices if args is None else args), stdout=subprocess.PIPE, text=True)
+    try:
+        return json.loads(proc.stdout)
+    except ValueError:
+        return [device_result(device, 'failed', f"{command} exited with code {proc.returncode}", fields)
+                for device in devices]
+
+class CapacityProbe:
+    """Sparse write/read-back test of a raw device's real capacity (f3probe-style, restores what it overwrites)"""
+
+    def __init__(self, device):
+        self.device = device
+        self.nonce = os.urandom(16)
+        self.tests = 0
+        self.failure = None
+        self.fd = None
+        self.buf = None
+        self.saved = None
+
+    def tag(self, offset):
+        """Block content unique to this run and offset"""
+        head = CAPACITY_MAGIC + self.nonce + offset.to_bytes(8, 'little')
+        return (head * (CAPACITY_BLOCK // len(head) + 1))[:CAPACITY_BLOCK]
+
+    def read(self, offset):
+        os.preadv(self.fd, [self.buf], offset)
+        return bytes(self.buf)
+
+    def test(self, offset):
+        """True if a block written at offset reads back intact and did not land on a lower address"""
+        self.tests += 1
+        tag = self.tag(offset)
+        saved = False
+        try:
+            # Only a complete copy of the block may be written back; anything else would be another block's data
+            saved = os.preadv(self.fd, [self.saved], offset) == CAPACITY_BLOCK
+            if not saved:
+                self.failure = self.failure or 'I/O errors'
+                return False
+            self.buf[:] = tag
+            os.pwritev(self.fd, [self.buf], offset)
+            if self.read(offset) != tag:
+                self.failure = self.failure or 'dropped writes'
+                return False
+            # Fake controllers usually ignore the high address bits: check each power-of-two alias
+            size = CAPACITY_MIN_ALIAS
+            while size <= offset:
+                if self.read(offset % size) == tag:
+                    self.failure = self.failure or 'wraparound'
+                    return False
+                size <<= 1
+            return True
+        except OSError:
+            self.failure = self.failure or 'I/O errors'
+            return False
+        finally:
+            if saved:
+                try:
+                    os.pwritev(self.fd, [self.saved], offset)
+                except OSError:
+                    pass
+
+    def run(self, samples=CAPACITY_SAMPLES):
+        """(claimed bytes, verified bytes): sample the device, then bisect to the first bad offset"""
+        try:
+            self.buf = mmap.mmap(-1, CAPACITY_BLOCK)
+            self.saved = mmap.mmap(-1, CAPACITY_BLOCK)
+            self.fd = os.open(self.device, os.O_RDWR | os.O_DIRECT | os.O_SYNC | os.O_EXCL)
+            claimed = os.lseek(self.fd, 0, os.SEEK_END)
+            blocks = claimed // CAPACITY_BLOCK
+            low = CAPACITY_MIN_ALIAS // CAPACITY_BLOCK
+            if blocks <= low:
+                return claimed, claimed
+            rng = random.Random(self.nonce)
+            offsets = {rng.randrange(low, blocks) * CAPACITY_BLOCK for _ in range(samples)}
+            power = CAPACITY_MIN_ALIAS
+            while power < claimed:
+                offsets.update((power - CAPACITY_BLOCK, power))
+                power <<= 1
+            offsets.add((blocks - 1) * CAPACITY_BLOCK)
+
+            good, bad = CAPACITY_MIN_ALIAS - CAPACITY_BLOCK, None
+            for offset in sorted(o for o in offsets if o < claimed):
+                if not self.test(offset):
+                    bad = offset
+                    break
+                good = offset
+            if bad is None:
+                return claimed, claimed
+            while bad - good > CAPACITY_RESOLUTION:
+                mid = (good + bad) // 2 // CAPACITY_BLOCK * CAPACITY_BLOCK
+                if self.test(mid):
+                    good = mid
+                else:
+                    bad = mid
+            return claimed, good + CAPACITY_BLOCK
+        finally:
+            if self.fd is not None:
+                os.close(self.fd)
+            for buf in (self.buf, self.saved):
+                if buf is not None:
+                    buf.close()
+
+@traced('capacity check')
+def check_capacity(device, samples=CAPACITY_SAMPLES):
+    """Verify a whole disk's advertised capacity; returns a result record (status ok, fake, busy or failed)"""
+    start = time.monotonic()
+    result = {'device': device, 'name': device.split('/')[-1], 'status': 'ok', 'error': None,
+              'claimed_bytes': None, 'verified_bytes': None, 'failure': None, 'tests': 0}
+    probe = CapacityProbe(device)
+    try:
+        claimed, verified = probe.run(samples)
+        result.update(claimed_bytes=claimed, verified_bytes=verified, failure=probe.failure, tests=probe.tests)
+        if verified < claimed:
+            result['status'] = 'fake'
+            result['error'] = (f"only {format_size(verified)} of {format_size(claimed)} is real "
+                               f"({probe.failure} past that point)")
+    except OSError as e:
+        result['status'] = 'busy' if e.errno == errno.EBUSY else 'failed'
+        result['error'] = 'disk is in use (mounted partitions?)' if e.errno == errno.EBUSY else (e.strerror or str(e))
+    result['elapsed'] = time.monotonic() - start
+    return result
+
+def check_capacity_all(devices, workers=None):
+    """Capacity-check whole disks concurrently; re-runs itself through sudo when the disks are not writable"""
+    return run_on_devices('check-capacity', devices, check_capacity,
+                          {'claimed_bytes': None, 'verified_bytes': None, 'failure': None, 'tests': 0}, workers)
+
+class DeviceWipe:
+    """Erase a whole block device: discard/zero-out ioctls where the device offloads them, else parallel O_DIRECT
+    overwrites with large aligned buffers; finishes with a sampled read-back of what should now be there"""
+
+    def __init__(self, device, method='auto', threads=WIPE_THREADS, progress=None):
+        self.device = device
+        self.method = method
+        self.threads = threads
+        self.report = progress or no_progress
+        self.size = 0
+        self.pattern = None
+        self.written = 0
+        self.mismatches = 0
+        self.samples = 0
+        self.verified = False
+
+    def capabilities(self):
+        """(discard, write-zeroes offload, discarded blocks read back as zeroes) from the disk's queue limits"""
+        name = get_parent_disk_name(self.device.split('/')[-1])
+        queue_dir = os.path.join(SYS_BLOCK, name, 'queue')
+        discard = int(read_sysfs(os.path.join(queue_dir, 'discard_max_bytes'), '0') or 0) > 0
+        zeroes = int(read_sysfs(os.path.join(queue_dir, 'write_zeroes_max_bytes'), '0') or 0) > 0
+        return discard, zeroes, read_sysfs(os.path.join(queue_dir, 'discard_zeroes_data')) == '1'
+
+    def ioctl_range(self, fd, request, phase):
+        """Issue a range ioctl over the device in chunks (so progress can be shown)"""
+        self.report(self.device, phase)
+        start = time.monotonic()
+        offset = 0
+        while offset < self.size:
+            length = min(WIPE_IOCTL_CHUNK, self.size - offset)
+            fcntl.ioctl(fd, request, struct.pack('QQ', offset, length))
+            offset += length
+            self.written = offset
+            self.report(self.device, fraction=offset / self.size, note=format_rate(offset, time.monotonic() - start))
+
+    def overwrite(self, pattern):
+        """Fill the device from WIPE_THREADS threads, each with its own O_DIRECT fd and aligned buffer"""
+        self.report(self.device, 'write', note=pattern)
+        if pattern == 'random':
+            self.pattern = os.urandom(WIPE_BLOCK)
+        lock = threading.Lock()
+        cursor = [0]
+        done = [0]
+        start = time.monotonic()
+
+        def writer():
+            try:
+                fd = os.open(self.device, os.O_WRONLY | os.O_DIRECT)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                fd = os.open(self.device, os.O_WRONLY)
+            buf = mmap.mmap(-1, WIPE_BLOCK)
+            try:
+                if self.pattern:
+                    buf[:] = self.pattern
+                view = memoryview(buf)
+                try:
+                    while True:
+                        with lock:
+                            offset = cursor[0]
+                            if offset >= self.size:
+                                return
+                            cursor[0] += WIPE_BLOCK
+                        length = min(WIPE_BLOCK, self.size - offset)
+                        while length:
+                            written = os.pwrite(fd, view[:length], offset)
+                            offset += written
+                            length -= written
+                            with lock:
+                                done[0] += written
+                finally:
+                    view.release()
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+                buf.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            futures = [pool.submit(writer) for _ in range(self.threads)]
+            while True:
+                finished, _ = wait(futures, timeout=PROGRESS_REDRAW * 5)
+                self.report(self.device, fraction=done[0] / self.size, note=format_rate(done[0], time.monotonic() - start))
+                if len(finished) == len(futures):
+                    break
+            for future in futures:
+                future.result()
+        self.written = done[0]
+
+    def expected(self, offset, length):
+        if self.pattern is None:
+            return bytes(length)
+        start = offset % WIPE_BLOCK
+        return (self.pattern[start:] + self.pattern)[:length]
+
+    def verify(self):
+        """Read back random aligned samples (plus the first and last block); counts mismatches"""
+        self.report(self.device, 'verify')
+        blocks = self.size // WIPE_VERIFY_BLOCK
+        if blocks == 0:
+            # Smaller than one sample block: read back all of it
+            offsets = {0} if self.size else set()
+        else:
+            rng = random.Random()
+            offsets = {0, (blocks - 1) * WIPE_VERIFY_BLOCK} | {rng.randrange(blocks) * WIPE_VERIFY_BLOCK
+                                                                 for _ in range(min(WIPE_VERIFY_SAMPLES, blocks))}
+        fd, _ = open_direct(self.device)
+        buf = mmap.mmap(-1, WIPE_VERIFY_BLOCK)
+        try:
+            for i, offset in enumerate(sorted(offsets), 1):
+                length = os.preadv(fd, [buf], offset)
+                if buf[:length] != self.expected(offset, length):
+                    self.mismatches += 1
+                self.report(self.device, fraction=i / len(offsets))
+        finally:
+            os.close(fd)
+            buf.close()
+        self.samples = len(offsets)
+        self.verified = self.mismatches == 0
+        return self.verified
+
+    def run(self):
+        """Method that erased the device; raises OSError (EBUSY when it is in use) or ValueError if nothing worked"""
+        # O_EXCL on a block device fails with EBUSY while anything has it mounted
+        fd = os.open(self.device, os.O_RDWR | os.O_EXCL)
+        try:
+            self.size = os.lseek(fd, 0, os.SEEK_END)
+            discard, zeroes, discard_zeroes = self.capabilities()
+            if self.method == 'auto':
+                # A secure discard is only tried where its result can be checked (it reads back as zeroes)
+                steps = ((['secdiscard'] if discard and discard_zeroes else []) + (['zeroout'] if zeroes else [])
+                         + ['zeros'])
+            else:
+                steps = [self.method]
+            for step in steps:
+                self.pattern = None
+                self.mismatches = 0
+                try:
+                    if step in WIPE_IOCTLS:
+                        self.ioctl_range(fd, WIPE_IOCTLS[step], step)
+                    else:
+                        self.overwrite(step)
+                except OSError as e:
+                    # The device turned the offload down: try the next method
+                    if self.method == 'auto' and e.errno in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY):
+                        continue
+                    raise
+                if step == 'secdiscard' and not discard_zeroes:
+                    # Asked for explicitly: what the device returns for discarded blocks is unspecified
+                    self.report(self.device, note="not verified: discarded blocks need not read back as zeroes")
+                    return step
+                if self.verify():
+                    return step
+                if self.method != 'auto':
+                    break
+            raise ValueError(f"{self.mismatches} of {self.samples} sampled blocks still hold old data after {steps[-1]}")
+        finally:
+            os.close(fd)
+
+def format_rate(nbytes, seconds):
+    return f"{nbytes / seconds / 1e6:.0f} MB/s" if seconds > 0 else ''
+
+@traced('wipe')
+def wipe_device(device, method='auto', threads=WIPE_THREADS, progress=None):
+    """Securely erase one device; returns a result record (status wiped, busy or failed) with throughput"""
+    start = time.monotonic()
+    result = {'device': device, 'name': device.split('/')[-1], 'status': 'wiped', 'error': None, 'method': None,
+              'bytes': 0, 'mb_per_s': None, 'samples': 0, 'mismatches': 0, 'verified': False}
+    wipe = DeviceWipe(device, method, threads, progress)
+    try:
+        result['method'] = wipe.run()
+    except OSError as e:
+        result['status'] = 'busy' if e.errno == errno.EBUSY else 'failed'
+        result['error'] = 'device is in use (mounted?)' if e.errno == errno.EBUSY else (e.strerror or str(e))
+    except ValueError as e:
+        result.update(status='failed', error=str(e))
+    result['elapsed'] = time.monotonic() - start
+    result.update(bytes=wipe.size, samples=wipe.samples, mismatches=wipe.mismatches, verified=wipe.verified,
+                  mb_per_s=wipe.size / result['elapsed'] / 1e6 if result['status'] == 'wiped' and result['elapsed'] else None)
+    wipe.report(device, 'done' if result['status'] == 'wiped' else 'failed',
+                note=f"{result['method']} {format_rate(wipe.size, result['elapsed'])}" if result['status'] == 'wiped' else result['error'])
+    get_inventory().invalidate(device)
+    return result
+
+def wipe_all(devices, method='auto', workers=None, threads=WIPE_THREADS, progress=None):
+    """Wipe devices concurrently; system disks are skipped. Re-runs itself through sudo when the devices are not
+    writable (progress then comes from that process on stderr)."""
+    fields = {'method': None, 'bytes': 0, 'mb_per_s': None, 'samples': 0, 'mismatches': 0, 'verified': False}
+    system = get_system_disks()
+    skipped = {d for d in devices if f"/dev/{get_parent_disk_name(d.split('/')[-1])}" in system}
+    results = {d: device_result(d, 'skipped', 'on a system disk', fields) for d in skipped}
+    todo = [d for d in devices if d not in skipped]
+    for r in run_on_devices('wipe', todo, lambda d: wipe_device(d, method, threads, progress), fields, workers,
+                            options=('--yes', '--method', method, '--threads', str(threads))):
+        results[r['device']] = r
+    return [results.get(d) or device_result(d, 'failed', "no result from wipe", fields) for d in devices]
+
+def print_wipe_report(results):
+    print_separator()
+    print(f"{Colors.RED}{Colors.BOLD}🧨 WIPE REPORT{Colors.END}")
+    print_separator()
+    for r in results:
+        if r['status'] == 'wiped':
+            print(f"✅ {Colors.WHITE}{r['device']}{Colors.END} {Colors.GREEN}wiped{Colors.END} via {r['method']} - "
+                  f"{format_size(r['bytes'])} in {r['elapsed']:.1f}s ({r['mb_per_s']:.0f} MB/s), "
+                  + (f"{r['samples']} samples verified" if r.get('verified')
+                     else f"{Colors.YELLOW}not verified (the device does not promise zeroes after a discard){Colors.END}"))
+        else:
+            print(f"❌ {Colors.WHITE}{r['device']}{Colors.END} {Colors.RED}{r['status']}{Colors.END}: {r['error']}")
+
+def wipe_menu():
+    """Pick drives (whole disks by default) and erase them in parallel"""
+    system = get_system_disks()
+    drives = {path: info for path, info in get_inventory().get().items()
+              if get_disk_device(info) not in system and info.get('status') != 'unresponsive'}
+    if not drives:
+        print_info("No drives available for wiping.")
+        return
+    paths = list(drives)
+    print_separator()
+    print(f"{Colors.RED}{Colors.BOLD}🧨 SECURE WIPE{Colors.END}")
+    print_separator()
+    for i, (path, info) in enumerate(drives.items(), 1):
+        name = info.get('label') or path.split('/')[-1]
+        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.YELLOW}{name}{Colors.END} {path} [{info['type']}] "
+              f"{info['model']} ({info['size']})")
+    try:
+        chosen = [drives[paths[i]] for i in parse_selection(click.prompt("Drives to wipe (e.g. 1,3,5-9 or all)", type=str), len(paths))]
+    except ValueError as e:
+        print_error(f"Invalid selection: {e}")
+        return
+    if not chosen:
+        return
+    whole = click.confirm("Wipe the whole disks (every partition and the partition table)?", default=True)
+    devices = sorted({get_disk_device(info) if whole else info['device'] for info in chosen})
+    print("Method:\n[1] auto (secure discard / zero-out offload when supported, else zeros)\n[2] zeros\n[3] random pattern")
+    method = {1: 'auto', 2: 'zeros', 3: 'random'}.get(click.prompt("Choice", type=int, default=1), 'auto')
+
+    print_warning(f"ALL DATA ON {', '.join(devices)} WILL BE DESTROYED AND CANNOT BE RECOVERED!")
+    if not click.confirm("Are you sure?"):
+        return
+    for device in devices:
+        for info in get_inventory().get().values():
+            mount_point = info.get('mountpoint')
+            if mount_point and (info['device'] == device or get_disk_device(info) == device):
+                unmount_path_result(info.get('label') or info['device'].split('/')[-1], info['device'], mount_point)
+    board = ProgressBoard(devices)
+    results = wipe_all(devices, method, progress=board.update)
+    board.finish()
+    print_wipe_report(results)
+
+def get_logical_sector(device):
+    """Smallest readable unit of a device (its disk's logical block size; 512 for image files)"""
+    if not device.startswith('/dev/'):
+        return SURFACE_SECTOR
+    name = get_parent_disk_name(device.split('/')[-1])
+    return int(read_sysfs(os.path.join(SYS_BLOCK, name, 'queue', 'logical_block_size'), str(SURFACE_SECTOR)) or SURFACE_SECTOR)
+
+class SurfaceScan:
+    """Read a whole device in large sequential O_DIRECT blocks (optionally writing a test pattern and restoring
+    each block); a failing block is bisected down to the logical sector to map the bad ranges exactly"""
+
+    def __init__(self, device, write_test=False, progress=None):
+        self.device = device
+        self.write_test = write_test
+        self.report = progress or no_progress
+        self.sector = get_logical_sector(device)
+        self.size = 0
+        self.scanned = 0
+        self.bad = []
+        self.fd = None
+        self.buf = mmap.mmap(-1, SURFACE_BLOCK)
+        self.saved = mmap.mmap(-1, SURFACE_BLOCK) if write_test else None
+        self.pattern = mmap.mmap(-1, SURFACE_BLOCK) if write_test else None
+        if write_test:
+            self.pattern[:] = os.urandom(SURFACE_BLOCK)
+
+    def open(self):
+        if not self.write_test:
+            return open_direct(self.device)[0]
+        try:
+            return os.open(self.device, os.O_RDWR | os.O_DIRECT | os.O_DSYNC | os.O_EXCL)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            return os.open(self.device, os.O_RDWR | os.O_DSYNC | os.O_EXCL)
+
+    def check(self, offset, length):
+        """True if length bytes at offset read (and, for the write test, take a pattern and read it back) cleanly"""
+        view = memoryview(self.buf)[:length]
+        try:
+            os.preadv(self.fd, [view], offset)
+        except OSError:
+            return False
+        if not self.write_test:
+            return True
+        saved = memoryview(self.saved)[:length]
+        saved[:] = view
+        try:
+            os.pwritev(self.fd, [memoryview(self.pattern)[:length]], offset)
+            os.preadv(self.fd, [view], offset)
+            return view == memoryview(self.pattern)[:length]
+        except OSError:
+            return False
+        finally:
+            try:
+                os.pwritev(self.fd, [saved], offset)
+            except OSError:
+                pass
+
+    def mark_bad(self, offset, length):
+        if self.bad and self.bad[-1][0] + self.bad[-1][1] == offset:
+            self.bad[-1][1] += length
+        else:
+            self.bad.append([offset, length])
+
+    def locate(self, offset, length):
+        """Bisect a failed range down to single sectors, recording the ones that still fail"""
+        if length <= self.sector:
+            self.mark_bad(offset, length)
+            return
+        half = max(self.sector, length // 2 // self.sector * self.sector)
+        for start, size in ((offset, half), (offset + half, length - half)):
+            if size and not self.check(start, size):
+                self.locate(start, size)
+
+    def run(self):
+        """[[offset, length], ...] of bad ranges; raises OSError if the device cannot be opened"""
+        self.fd = self.open()
+        try:
+            self.size = os.lseek(self.fd, 0, os.SEEK_END)
+            phase = 'write test' if self.write_test else 'read'
+            self.report(self.device, phase)
+            start = time.monotonic()
+            for offset in range(0, self.size, SURFACE_BLOCK):
+                length = min(SURFACE_BLOCK, self.size - offset)
+                if not self.check(offset, length):
+                    self.locate(offset, length)
+                self.scanned = offset + length
+                bad = f", {len(self.bad)} bad range(s)" if self.bad else ""
+                self.report(self.device, fraction=self.scanned / self.size,
+                            note=format_rate(self.scanned, time.monotonic() - start) + bad)
+            return self.bad
+        finally:
+            os.close(self.fd)
+            for buf in (self.buf, self.saved, self.pattern):
+                if buf is not None:
+                    buf.close()
+
+def get_bad_block_key(device):
+    """Cache key of a disk's bad-block map: udev serial (or device name) plus size, so it follows the disk"""
+    if not device.startswith('/dev/'):
+        return os.path.realpath(device)
+    name = get_parent_disk_name(device.split('/')[-1])
+    sys_path = os.path.join(SYS_BLOCK, name)
+    props = read_udev_properties(read_sysfs(os.path.join(sys_path, 'dev'), ''))
+    serial = props.get('ID_SERIAL') or read_sysfs(os.path.join(sys_path, 'device', 'serial')) or name
+    return f"{serial}:{read_sysfs(os.path.join(sys_path, 'size'), '0')}"
+
+_badblocks_lock = threading.Lock()
+
+def load_bad_blocks():
+    """{disk key: bad-block map record} from the cache file"""
+    try:
+        with open(os.path.join(get_cache_dir(), BADBLOCKS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_bad_blocks(key, record):
+    """Merge one disk's bad-block map into the cache file (atomic replace)"""
+    with _badblocks_lock:
+        maps = load_bad_blocks()
+        maps[key] = record
+        write_json_atomic(os.path.join(get_cache_dir(), BADBLOCKS_FILE), maps)
+
+def get_bad_ranges(device):
+    """Known bad [offset, length] ranges inside a disk or partition, relative to its start"""
+    record = load_bad_blocks().get(get_bad_block_key(device))
+    if not record or not record['ranges']:
+        return []
+    start, end = 0, None
+    name = device.split('/')[-1]
+    if device.startswith('/dev/') and get_parent_disk_name(name) != name:
+        part_path = os.path.join(SYS_CLASS_BLOCK, name)
+        start = int(read_sysfs(os.path.join(part_path, 'start'), '0') or 0) * 512
+        end = start + int(read_sysfs(os.path.join(part_path, 'size'), '0') or 0) * 512
+    ranges = []
+    for offset, length in record['ranges']:
+        low, high = max(offset, start), min(offset + length, end if end is not None else offset + length)
+        if low < high:
+            ranges.append([low - start, high - low])
+    return ranges
+
+def write_bad_block_list(ranges, unit):
+    """Temp file listing every unit-sized block touched by a bad range (mke2fs/mkfs.fat -l format)"""
+    fd, path = tempfile.mkstemp(prefix='drive-master-', suffix='.badblocks')
+    with os.fdopen(fd, 'w') as f:
+        for offset, length in ranges:
+            f.writelines(f"{block}\n" for block in range(offset // unit, (offset + length - 1) // unit + 1))
+    return path
+
+@traced('surface scan')
+def surface_scan(device, write_test=False, progress=None):
+    """Scan one device for bad blocks and save the map; returns a result record (status ok, bad blocks, busy or failed)"""
+    start = time.monotonic()
+    result = {'device': device, 'name': device.split('/')[-1], 'status': 'ok', 'error': None, 'write_test': write_test,
+              'bytes': 0, 'bad_ranges': [], 'bad_bytes': 0, 'mb_per_s': None}
+    scan = SurfaceScan(device, write_test, progress)
+    try:
+        bad = scan.run()
+        result.update(bad_ranges=bad, bad_bytes=sum(length for _, length in bad))
+        if bad:
+            result['status'] = 'bad blocks'
+            result['error'] = f"{len(bad)} bad range(s), {format_size(result['bad_bytes'])}"
+        try:
+            save_bad_blocks(get_bad_block_key(device), {'device': device, 'size': scan.size, 'sector': scan.sector,
+                                                        'ranges': bad, 'write_test': write_test, 'time': time.time()})
+        except OSError:
+            pass
+    except OSError as e:
+        result['status'] = 'busy' if e.errno == errno.EBUSY else 'failed'
+        result['error'] = 'device is in use (mounted?)' if e.errno == errno.EBUSY else (e.strerror or str(e))
+    result['elapsed'] = time.monotonic() - start
+    result.update(bytes=scan.scanned, mb_per_s=scan.scanned / result['elapsed'] / 1e6 if scan.scanned and result['elapsed'] else None)
+    scan.report(device, 'done' if result['status'] == 'ok' else 'failed',
+                note=format_rate(scan.scanned, result['elapsed']) if result['status'] == 'ok' else result['error'])
+    return result
+
+def surface_scan_all(devices, write_test=False, workers=None, progress=None):
+    """Surface-scan devices concurrently; re-runs itself through sudo when the devices are not readable (writable
+    for the write test)"""
+    scanned = set()
+
+    def scan(device):
+        scanned.add(device)
+        return surface_scan(device, write_test, progress)
+    results = run_on_devices('surface-scan', devices, scan,
+                             {'write_test': write_test, 'bytes': 0, 'bad_ranges': [], 'bad_bytes': 0, 'mb_per_s': None},
+                             workers, os.R_OK | (os.W_OK if write_test else 0), ['--write'] if write_test else [])
+    # A sudo re-run saved its maps in root's cache: keep a copy in ours for the formatter
+    for r in results:
+        if r['device'] not in scanned and r['status'] in ('ok', 'bad blocks'):
+            try:
+                save_bad_blocks(get_bad_block_key(r['device']), {'device': r['device'], 'size': r['bytes'],
+                                                                 'sector': SURFACE_SECTOR, 'ranges': r['bad_ranges'],
+                                                                 'write_test': write_test, 'time': time.time()})
+            except OSError:
+                pass
+    return results
+
+def print_surface_report(results):
+    print_separator()
+    print(f"{Colors.CYAN}{Colors.BOLD}🩺 SURFACE SCAN REPORT{Colors.END}")
     print_separator()
-    
-    for i, (path, info) in enumerate(mountable.items(), 1):
-        name = info.get('label') or path.split('/')[-1]
-        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.WHITE}{name}{Colors.END} ({info['size']}) - {info['fstype']} [{path}]")
-    
-    print_option("0", "⬅️", "Back", Colors.WHITE)
-    try:
-        choice = click.prompt(f"{Colors.YELLOW}Enter number{Colors.END}", type=str).strip()
-        if choice == '0': return
-        idx = int(choice) - 1
-        if 0 <= idx < len(mountable):
-            path = list(mountable.keys())[idx]
-            info = mountable[path]
-            name = info.get('label') or path.split('/')[-1]
-            mount_drive_enhanced(info, name)
-    except:
-        pass
+    for r in results:
+        rate = f" at {r['mb_per_s']:.0f} MB/s" if r['mb_per_s'] else ""
+        if r['status'] == 'ok':
+            print(f"✅ {Colors.WHITE}{r['device']}{Colors.END} {Colors.GREEN}no bad blocks{Colors.END} - "
+                  f"{format_size(r['bytes'])} in {r['elapsed']:.1f}s{rate}")
+        elif r['status'] == 'bad blocks':
+            print(f"⚠️  {Colors.WHITE}{r['device']}{Colors.END} {Colors.RED}{r['error']}{Colors.END} - "
+                  f"{format_size(r['bytes'])} in {r['elapsed']:.1f}s{rate}")
+            for offset, length in r['bad_ranges'][:10]:
+                print(f"   {Colors.YELLOW}sectors {offset // SURFACE_SECTOR}-{(offset + length) // SURFACE_SECTOR - 1}"
+                      f" ({format_size(length)}){Colors.END}")
+            if len(r['bad_ranges']) > 10:
+                print(f"   ... and {len(r['bad_ranges']) - 10} more")
+        else:
+            print(f"❌ {Colors.WHITE}{r['device']}{Colors.END} {Colors.RED}{r['status']}{Colors.END}: {r['error']}")
+    if any(r['bad_ranges'] for r in results):
+        print_info("The bad-block map is saved; formatting ext4 or FAT32 on these disks will avoid those ranges.")
 
-def unmount_menu(drives):
-    """Interactive Select-to-Unmount menu"""
-    mounted = {}
-    for path, info in drives.items():
-        name = info.get('label') or path.split('/')[-1]
-        if is_mounted(name):
-            mounted[path] = info
-            
-    if not mounted:
-        print_info("No drives are currently mounted.")
+def surface_scan_menu():
+    """Pick disks and scan their surfaces in parallel"""
+    disks = {}
+    for info in get_inventory().get().values():
+        if info.get('status') != 'unresponsive':
+            disks.setdefault(get_disk_device(info), info)
+    if not disks:
+        print_info("No drives available for scanning.")
         return
-
+    paths = sorted(disks)
     print_separator()
-    print(f"{Colors.ORANGE}{Colors.BOLD}🔓 SELECT DRIVE TO UNMOUNT{Colors.END}")
+    print(f"{Colors.CYAN}{Colors.BOLD}🩺 SURFACE SCAN{Colors.END}")
     print_separator()
-    
-    for i, (path, info) in enumerate(mounted.items(), 1):
-        name = info.get('label') or path.split('/')[-1]
-        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.WHITE}{name}{Colors.END} [{path}]")
-
-    print_option("0", "⬅️", "Back", Colors.WHITE)
+    for i, path in enumerate(paths, 1):
+        info = disks[path]
+        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.YELLOW}{path}{Colors.END} [{info['type']}] {info['model']}")
     try:
-        choice = click.prompt(f"{Colors.ORANGE}Enter number{Colors.END}", type=str).strip()
-        if choice == '0': return
-        idx = int(choice) - 1
-        if 0 <= idx < len(mounted):
-            path = list(mounted.keys())[idx]
-            name = mounted[path].get('label') or path.split('/')[-1]
-            unmount_drive(name)
-    except:
-        pass
-
-def mount_all_unmounted(drives):
-    """Mount everything that isn't mounted"""
-    unmounted = {path: info for path, info in drives.items() if not is_drive_mounted(info)}
-    if not unmounted:
-        print_info("All drives already mounted.")
+        devices = [paths[i] for i in parse_selection(click.prompt("Disks to scan (e.g. 1,3,5-9 or all)", type=str), len(paths))]
+    except ValueError as e:
+        print_error(f"Invalid selection: {e}")
         return
-    print_loading(f"Mounting {len(unmounted)} drives...")
-    for path, info in unmounted.items():
-        name = info.get('label') or path.split('/')[-1]
-        mount_drive(info['uuid'], name, info['device'])
-
-def unmount_all_mounted(drives):
-    """Unmount everything that is mounted in /media/user/"""
-    mounted = []
-    for path, info in drives.items():
-        name = info.get('label') or path.split('/')[-1]
-        if is_mounted(name):
-            mounted.append(name)
-    
-    if not mounted:
-        print_info("No drives to unmount.")
+    if not devices:
         return
-        
-    if click.confirm(f"{Colors.RED}Unmount all {len(mounted)} drives?{Colors.END}"):
-        for name in mounted:
-            unmount_drive(name)
+    write_test = click.confirm("Also run the non-destructive write test (slower, disks must be unmounted)?", default=False)
+    board = ProgressBoard(devices)
+    results = surface_scan_all(devices, write_test, progress=board.update)
+    board.finish()
+    print_surface_report(results)
 
-def get_usb_drives():
-    """Helper to get only USB drives"""
-    all_drives = get_all_drives()
-    return {path: info for path, info in all_drives.items() if info['type'] == 'USB'}
+def get_disk_device(info):
+    """Whole-disk device node for a drive or partition"""
+    return info.get('parent') or f"/dev/{get_parent_disk_name(info['device'].split('/')[-1])}"
 
 def format_usb_drive():
     """Integrated drive formatter"""
-    drives = get_all_drives()
+    drives = get_inventory().get()
     if not drives: return
     
     print_separator()
@@ -583,10 +3956,18 @@ def format_usb_drive():
         name = info.get('label') or path.split('/')[-1]
         print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.YELLOW}{name}{Colors.END} [{info['type']}] ({info['size']})")
         
+    print_option("B", "🏭", "Batch format several drives at once", Colors.MAGENTA)
+    print_option("W", "🧨", "Secure wipe (erase so data cannot be recovered)", Colors.RED)
     print_option("0", "⬅️", "Back", Colors.WHITE)
     try:
         choice = click.prompt(f"Select drive", type=str).strip()
         if choice == '0': return
+        if choice.upper() == 'B':
+            batch_format_menu()
+            return
+        if choice.upper() == 'W':
+            wipe_menu()
+            return
         idx = int(choice) - 1
         if 0 <= idx < len(drives):
             path = list(drives.keys())[idx]
@@ -596,6 +3977,389 @@ def format_usb_drive():
     except:
         pass
 
+def parse_selection(text, count):
+    """Indexes (0-based) from '1,3,5-9' or 'all'; ValueError on anything out of range"""
+    text = text.strip().lower()
+    if text == 'all':
+        return list(range(count))
+    chosen = []
+    for item in text.replace(' ', '').split(','):
+        first, _, last = item.partition('-')
+        for number in range(int(first), int(last or first) + 1):
+            if not 1 <= number <= count:
+                raise ValueError(f"{number} is not in 1-{count}")
+            if number - 1 not in chosen:
+                chosen.append(number - 1)
+    return chosen
+
+def batch_format_menu():
+    """Pick many drives (by number, or every stick of one model and size), then format them in parallel"""
+    system = get_system_disks()
+    drives = {path: info for path, info in get_inventory().get().items()
+              if (info.get('parent') or path) not in system and info.get('status') != 'unresponsive'}
+    if not drives:
+        print_info("No drives available for batch formatting.")
+        return
+    paths = list(drives)
+    print_separator()
+    print(f"{Colors.MAGENTA}{Colors.BOLD}🏭 BATCH FORMAT{Colors.END}")
+    print_separator()
+    for i, (path, info) in enumerate(drives.items(), 1):
+        name = info.get('label') or path.split('/')[-1]
+        print(f"{Colors.CYAN}[{i}]{Colors.END} {Colors.YELLOW}{name}{Colors.END} {path} [{info['type']}] "
+              f"{info['model']} ({info['size']})")
+    groups = {}
+    for path, info in drives.items():
+        if info['type'] == 'USB':
+            groups.setdefault(((info.get('model') or '').strip(), info['size']), []).append(path)
+    group_keys = list(groups)
+    for i, (model, size) in enumerate(group_keys, 1):
+        print(f"{Colors.CYAN}[M{i}]{Colors.END} every USB {model or 'drive'} ({size}): {len(groups[(model, size)])} drive(s)")
+
+    text = click.prompt("Drives to format (e.g. 1,3,5-9, all or M1)", type=str).strip()
+    try:
+        if text.upper().startswith('M'):
+            selected = groups[group_keys[int(text[1:]) - 1]]
+        else:
+            selected = [paths[i] for i in parse_selection(text, len(paths))]
+    except (ValueError, IndexError) as e:
+        print_error(f"Invalid selection: {e}")
+        return
+    targets = {path: drives[path] for path in selected}
+    if not targets:
+        return
+
+    print(f"Select Filesystem:\n[1] FAT32\n[2] NTFS\n[3] EXT4")
+    fstype = {1: 'vfat', 2: 'ntfs', 3: 'ext4'}.get(click.prompt("Choice", type=int))
+    if not fstype:
+        print_error("Invalid filesystem choice.")
+        return
+    profile = format_profile_menu(max(targets.values(), key=lambda info: get_volume_bytes(info['device'])))
+    template = click.prompt("Label template ({n} counts from 1, {n:02d} pads, {model}, {size})",
+                            type=str, default=FORMAT_LABEL_TEMPLATE)
+    try:
+        preview = [expand_label(template, i, info) for i, info in enumerate(targets.values(), 1)]
+        for label in preview:
+            check_format_label(fstype, label)
+    except ValueError as e:
+        print_error(str(e))
+        return
+    print_info(f"Labels: {', '.join(preview[:3])}{', ...' if len(preview) > 3 else ''}")
+    workers = click.prompt("Drives formatted at once", type=int, default=get_worker_count())
+
+    print_warning(f"WARNING: ALL DATA ON {len(targets)} DRIVE(S) WILL BE ERASED!")
+    if not click.confirm("Are you sure?"):
+        return
+    start = time.monotonic()
+    board = ProgressBoard([info['device'] for info in targets.values()])
+    results = format_all_parallel(targets, fstype, template, workers, board.update, profile)
+    board.finish()
+    print_format_report(results, time.monotonic() - start)
+
+def get_format_profile():
+    """Format profile: DRIVE_MASTER_FORMAT_PROFILE, else 'compat'"""
+    profile = os.environ.get('DRIVE_MASTER_FORMAT_PROFILE')
+    return profile if profile in FORMAT_PROFILES else 'compat'
+
+def get_volume_bytes(device):
+    return int(read_sysfs(os.path.join(SYS_CLASS_BLOCK, device.split('/')[-1], 'size'), '0') or 0) * 512
+
+def check_format_label(fstype, label):
+    """Raise ValueError for a label the filesystem would truncate"""
+    limit = FORMAT_LABEL_BYTES.get(fstype)
+    if limit and len(label.encode('utf-8')) > limit:
+        raise ValueError(f"{fstype} labels are at most {limit} bytes, {label!r} is {len(label.encode('utf-8'))}")
+
+def get_format_command(fstype, label, target, profile='compat', size=0, sector=512, badblocks=None):
+    """mkfs argv for a filesystem choice ('vfat', 'ntfs' or 'ext4') and format profile; badblocks is a -l list file
+    in BADBLOCK_LIST_UNITS blocks"""
+    if fstype not in FORMAT_PROFILES['compat']:
+        raise ValueError(f"unsupported filesystem: {fstype}")
+    flags = list(FORMAT_PROFILES[profile][fstype])
+    if badblocks and fstype in BADBLOCK_LIST_UNITS:
+        flags += (['-b', str(BADBLOCK_LIST_UNITS['ext4'])] if fstype == 'ext4' else []) + ['-l', badblocks]
+    if fstype == 'vfat' and profile == 'throughput':
+        # Largest cluster that still leaves FAT32 enough clusters for this volume
+        cluster = next((c for minimum, c in FAT_THROUGHPUT_CLUSTERS if size >= minimum), None)
+        if cluster:
+            flags += ['-s', str(max(1, cluster // sector))]
+    if fstype == 'vfat':
+        return ['sudo', 'mkfs.vfat'] + flags + ['-n', label[:11], target]
+    if fstype == 'ntfs':
+        return ['sudo', 'mkfs.ntfs'] + flags + ['-L', label, target]
+    return ['sudo', 'mkfs.ext4', '-F'] + flags + ['-L', label, target]
+
+_format_times_lock = threading.Lock()
+
+def load_format_times():
+    """{'fstype/profile/transport': [[bytes, seconds], ...]} of past formats"""
+    try:
+        with open(os.path.join(get_cache_dir(), FORMAT_TIMES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def format_time_key(fstype, profile, info):
+    return f"{fstype}/{profile}/{str(info.get('transport') or 'unknown').lower()}"
+
+def record_format_time(key, size, seconds):
+    """Keep the last FORMAT_TIME_SAMPLES (size, seconds) of a filesystem/profile/transport (atomic replace)"""
+    with _format_times_lock:
+        times = load_format_times()
+        times[key] = (times.get(key, []) + [[size, round(seconds, 3)]])[-FORMAT_TIME_SAMPLES:]
+        write_json_atomic(os.path.join(get_cache_dir(), FORMAT_TIMES_FILE), times)
+
+def estimate_format_time(key, size, times=None):
+    """Expected seconds to format size bytes, fitted to past formats (fixed cost + per-byte cost); None if never measured"""
+    samples = (load_format_times() if times is None else times).get(key)
+    if not samples:
+        return None
+    sizes = [s for s, _ in samples]
+    seconds = [t for _, t in samples]
+    mean_size, mean_time = sum(sizes) / len(sizes), sum(seconds) / len(seconds)
+    spread = sum((s - mean_size) ** 2 for s in sizes)
+    if min(sizes) and max(sizes) > 1.5 * min(sizes) and spread:
+        per_byte = max(0.0, sum((s - mean_size) * (t - mean_time) for s, t in samples) / spread)
+        fixed = mean_time - per_byte * mean_size
+        if fixed < 0:
+            fixed, per_byte = 0.0, mean_time / mean_size
+        return fixed + per_byte * size
+    # One size seen so far: same again near it, else scaled with size
+    if mean_size and not 0.5 <= size / mean_size <= 2:
+        return mean_time * size / mean_size
+    return mean_time
+
+def format_profile_menu(info):
+    """Ask for a format profile, showing what each does and how long it took here before"""
+    profiles = list(FORMAT_PROFILES)
+    default = get_format_profile()
+    size = get_volume_bytes(info['device'])
+    times = load_format_times()
+    print("Select format profile:")
+    for i, profile in enumerate(profiles, 1):
+        expected = [estimate_format_time(format_time_key(fs, profile, info), size, times) for fs in ('vfat', 'ntfs', 'ext4')]
+        timing = ", ".join(f"{fs} ~{format_duration(t)}" for fs, t in zip(('FAT32', 'NTFS', 'EXT4'), expected) if t is not None)
+        print(f"[{i}] {profile} - {FORMAT_PROFILE_HELP[profile]}" + (f" (expected {timing})" if timing else ""))
+    choice = click.prompt("Choice", type=int, default=profiles.index(default) + 1)
+    return profiles[choice - 1] if 1 <= choice <= len(profiles) else default
+
+def format_duration(seconds):
+    if seconds < 10:
+        return f"{seconds:.1f}s"
+    return f"{seconds:.0f}s" if seconds < 120 else f"{seconds / 60:.1f}min"
+
+def parse_mkfs_progress(text):
+    """(step, fraction or None) from one mkfs output update ('Writing inode tables: 12/80', 'zeroes: 42%')"""
+    step = text.split(':')[0].strip() if ':' in text else text
+    match = MKFS_PROGRESS.search(text)
+    if not match:
+        return step, None
+    if match.group(1):
+        done, total = int(match.group(1)), int(match.group(2))
+        return step, done / total if total else None
+    return step, min(float(match.group(3)) / 100, 1.0)
+
+def probe_volume(device):
+    """Filesystem signature (type, label, uuid) at the start of one partition or unpartitioned disk, or None"""
+    head = read_device_ranges(device, [(0, PROBE_FS_BYTES)])[0]
+    fs = parse_fs_signature(head) if len(head) >= 512 else None
+    if fs and fs.get('label_at'):
+        fs['label'] = parse_fs_label(fs, read_device_ranges(device, [fs['label_at']])[0])
+    if fs:
+        for key in ('label_at', 'label_kind', 'sector'):
+            fs.pop(key, None)
+    return fs
+
+def verify_format(target, fstype, label):
+    """None if target now holds the filesystem mkfs was asked for, else what is wrong"""
+    fs = probe_volume(target)
+    if not fs:
+        return "no filesystem signature after mkfs"
+    if fs['type'] != fstype:
+        return f"found {fs['type']} instead of {fstype}"
+    expected = label[:11] if fstype == 'vfat' else label
+    if (fs.get('label') or '').lower() != expected.lower():
+        return f"label is {fs.get('label')!r}, expected {expected!r}"
+    return None
+
+@traced('format')
+def format_drive_result(info, fstype, label, progress=None, profile=None):
+    """Unmount, mkfs (with a format profile) and verify a drive; returns a result record with per-phase timings
+    and the expected time. progress(device, phase=None, fraction=None, note=None) is called as mkfs reports progress."""
+    start = time.monotonic()
+    target = info['device']
+    report = progress or no_progress
+    profile = profile or get_format_profile()
+    size = get_volume_bytes(target)
+    timing_key = format_time_key(fstype, profile, info)
+    result = {'device': target, 'name': label, 'fstype': fstype, 'status': 'formatted', 'error': None,
+              'driver': f"mkfs.{fstype}", 'profile': profile, 'expected': estimate_format_time(timing_key, size),
+              'phases': {}}
+
+    def finish(error=None):
+        if error:
+            result.update(status='failed', error=error)
+        result['elapsed'] = time.monotonic() - start
+        report(target, 'failed' if error else 'done', note=error.splitlines()[-1] if error else f"{label} ready")
+        metrics.observe_result('format', result, info)
+        return result
+
+    try:
+        check_format_label(fstype, label)
+    except ValueError as e:
+        return finish(str(e))
+    mount_point = info.get('mountpoint') or get_mount_table().mountpoint_of(target)
+    name = info.get('label') or target.split('/')[-1]
+    if not mount_point and is_mounted(name):
+        mount_point = f"/media/{get_user()}/{name}"
+    if mount_point:
+        report(target, 'unmount', note=mount_point)
+        phase = time.monotonic()
+        unmounted = unmount_path_result(name, target, mount_point)
+        result['phases']['unmount'] = time.monotonic() - phase
+        if unmounted['status'] != 'unmounted':
+            return finish(f"could not unmount {mount_point}: {unmounted['error']}")
+
+    rotational, discard = get_disk_queue(info)
+    if profile in FORMAT_DISCARD_PROFILES and discard and not rotational:
+        # TRIM the whole volume up front: the flash starts clean and mkfs has nothing to zero
+        report(target, 'discard')
+        phase = time.monotonic()
+        try:
+            proc = run_command(['sudo', 'blkdiscard', target], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if proc.returncode != 0:
+                result['discard_error'] = proc.stderr.decode('utf-8', 'replace').strip()
+        except OSError as e:
+            result['discard_error'] = str(e)
+        result['phases']['discard'] = time.monotonic() - phase
+
+    bad = get_bad_ranges(target)
+    badblocks = None
+    if bad:
+        # Known bad sectors from a surface scan: ext4 and FAT take a block list, mkntfs has no way to skip them
+        result['bad_blocks'] = {'ranges': len(bad), 'bytes': sum(length for _, length in bad),
+                                'excluded': fstype in BADBLOCK_LIST_UNITS}
+        if fstype in BADBLOCK_LIST_UNITS:
+            badblocks = write_bad_block_list(bad, BADBLOCK_LIST_UNITS[fstype])
+    report(target, 'mkfs', note=f"mkfs.{fstype} ({profile})")
+    phase = time.monotonic()
+    try:
+        def on_output(text):
+            step, fraction = parse_mkfs_progress(text)
+            report(target, fraction=fraction, note=step)
+        sector = int(read_sysfs(os.path.join(SYS_BLOCK, get_disk_device(info).split('/')[-1], 'queue', 'logical_block_size'), '512') or 512)
+        returncode, tail = stream_command(get_format_command(fstype, label, target, profile, size, sector, badblocks), on_output)
+    except (OSError, ValueError) as e:
+        return finish(str(e))
+    finally:
+        result['phases']['mkfs'] = time.monotonic() - phase
+        get_inventory().invalidate(target)
+        if badblocks:
+            os.unlink(badblocks)
+    if returncode != 0:
+        return finish("\n".join(tail[-3:]) or f"mkfs exited with code {returncode}")
+    try:
+        record_format_time(timing_key, size, result['phases']['mkfs'] + result['phases'].get('discard', 0.0))
+    except OSError:
+        pass
+
+    report(target, 'verify')
+    phase = time.monotonic()
+    problem = verify_format(target, fstype, label)
+    result['phases']['verify'] = time.monotonic() - phase
+    return finish(f"verify: {problem}" if problem else None)
+
+def expand_label(template, index, info):
+    """Label for the index-th (1-based) drive of a batch: {n} ({n:02d} pads it), {model}, {size}, {device}"""
+    try:
+        return template.format(n=index, model=(info.get('model') or '').strip(), size=info['size'],
+                               device=info['device'].split('/')[-1])
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"bad label template {template!r}: {e}")
+
+def get_system_disks():
+    """Disks holding the root, boot or other system filesystems (through device-mapper/md layers too); batch
+    formatting, wiping and the helper's raw reads never touch these"""
+    table = get_mount_table()
+    names = []
+    for mount_point in SYSTEM_MOUNTS:
+        entry = table.by_path.get(mount_point)
+        if entry and entry['source'].startswith('/dev/'):
+            names.append(get_parent_disk_name(os.path.basename(os.path.realpath(entry['source']))))
+    disks = set()
+    while names:
+        name = names.pop()
+        if f"/dev/{name}" in disks:
+            continue
+        disks.add(f"/dev/{name}")
+        try:
+            names += [get_parent_disk_name(slave) for slave in os.listdir(os.path.join(SYS_BLOCK, name, 'slaves'))]
+        except OSError:
+            pass
+    return disks
+
+def format_all_parallel(drives, fstype, label_template, workers=None, progress=None, profile=None):
+    """Format drives concurrently: different disks in parallel, partitions of one disk in order.
+    Labels come from label_template (see expand_label); drives on system disks are skipped. Raises ValueError,
+    before touching any drive, for a bad template or a label the filesystem would truncate."""
+    labels = {path: expand_label(label_template, i, info) for i, (path, info) in enumerate(drives.items(), 1)}
+    for label in labels.values():
+        check_format_label(fstype, label)
+    system = get_system_disks()
+    by_disk = {}
+    for path, info in drives.items():
+        by_disk.setdefault(info.get('parent') or path, []).append((path, info))
+
+    def not_formatted(path, info, status, error):
+        if progress:
+            progress(info['device'], 'failed', note=error)
+        return {'device': info['device'], 'name': labels[path], 'fstype': fstype, 'status': status, 'error': error,
+                'driver': f"mkfs.{fstype}", 'profile': profile or get_format_profile(), 'expected': None,
+                'phases': {}, 'elapsed': 0.0}
+    if not prime_sudo(min(len(by_disk), get_worker_count(workers))):
+        return [not_formatted(path, info, 'failed', SUDO_FAILED) for path, info in drives.items()]
+
+    def format_disk(entries):
+        results = []
+        for path, info in entries:
+            if (info.get('parent') or path) in system:
+                results.append(not_formatted(path, info, 'skipped', 'on a system disk'))
+                continue
+            results.append(format_drive_result(info, fstype, labels[path], progress, profile))
+        return results
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=get_worker_count(workers)) as pool:
+        for disk_results in pool.map(format_disk, by_disk.values()):
+            for r in disk_results:
+                results[r['device']] = r
+    return [results[info['device']] for info in drives.values()]
+
+def print_format_report(results, elapsed=None):
+    """Per-device format results with phase timings"""
+    print_separator()
+    print(f"{Colors.MAGENTA}{Colors.BOLD}💾 FORMAT REPORT{Colors.END}")
+    print_separator()
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+        ok = r['status'] == 'formatted'
+        icon, color = ("✅", Colors.GREEN) if ok else ("❌", Colors.RED)
+        phases = " · ".join(f"{phase} {seconds:.1f}s" for phase, seconds in r.get('phases', {}).items())
+        expected = f", expected ~{format_duration(r['expected'])}" if r.get('expected') is not None else ""
+        print(f"{icon} {Colors.WHITE}{r['name']}{Colors.END} [{r['device']}] {color}{r['status']}{Colors.END} "
+              f"{r['fstype']} {r.get('profile', '')} ({r['elapsed']:.1f}s{': ' + phases if phases else ''}{expected})")
+        if r.get('discard_error'):
+            print(f"   {Colors.YELLOW}TRIM skipped: {r['discard_error']}{Colors.END}")
+        if r.get('bad_blocks'):
+            bad = r['bad_blocks']
+            print(f"   {Colors.YELLOW}{bad['ranges']} known bad range(s) ({format_size(bad['bytes'])}) "
+                  f"{'excluded' if bad['excluded'] else 'NOT excluded: ' + r['fstype'] + ' cannot skip bad blocks'}{Colors.END}")
+        if r['error']:
+            print(f"   {Colors.RED}{r['error']}{Colors.END}")
+    summary = ", ".join(f"{n} {status}" for status, n in counts.items())
+    print_info(f"{len(results)} drive(s): {summary}" + (f" in {elapsed:.1f}s" if elapsed is not None else ""))
+
 def format_drive_enhanced(name, info):
     """UI for formatting a drive"""
     print_warning(f"WARNING: ALL DATA ON {name} ({info['device']}) WILL BE ERASED!")
@@ -603,23 +4367,318 @@ def format_drive_enhanced(name, info):
     
     print(f"Select Filesystem:\n[1] FAT32\n[2] NTFS\n[3] EXT4")
     fs_choice = click.prompt("Choice", type=int)
+    fstype = {1: 'vfat', 2: 'ntfs', 3: 'ext4'}.get(fs_choice)
+    if not fstype:
+        print_error("Invalid filesystem choice.")
+        return
     
-    # Unmount first
-    unmount_drive(name)
-    
-    target = info['device']
-    print_loading(f"Formatting {target}...")
+    try:
+        check_format_label(fstype, name)
+    except ValueError as e:
+        print_error(f"{e}; rename the drive or pick another filesystem.")
+        return
+
+    profile = format_profile_menu(info)
     
+    if info['type'] == 'USB' and click.confirm("Verify the real capacity first (detects fake-capacity sticks)?", default=True):
+        if not verify_capacity_before_format(name, info):
+            return
+
+    board = ProgressBoard([info['device']])
+    result = format_drive_result(info, fstype, name, board.update, profile)
+    board.finish()
+    if result['status'] == 'formatted':
+        print_success(f"Format completed in {result['elapsed']:.1f}s ({profile} profile)")
+    else:
+        print_error(f"Format failed: {result['error']}")
+
+def verify_capacity_before_format(name, info):
+    """Pre-format capacity check of the drive's disk; False if the user backs out"""
+    disk = get_disk_device(info)
+    on_disk = {d['device']: d for d in get_inventory().on_disk(disk)}
+    targets = get_unmount_targets(on_disk)
+    for device, d in on_disk.items():
+        mount_point = d.get('mountpoint') or get_mount_table().mountpoint_of(device)
+        if mount_point:
+            targets.setdefault(mount_point, (os.path.basename(mount_point), device))
+    for unmounted in unmount_in_order(add_nested_targets(targets)):
+        if unmounted['status'] != 'unmounted':
+            print_error(f"Could not unmount {unmounted['mount_point']}: {unmounted['error']}")
+            return click.confirm("Format without the capacity check?", default=False)
+
+    print_loading(f"Checking real capacity of {disk}...")
+    result = check_capacity_all([disk])[0]
+    if result['status'] == 'ok':
+        print_success(f"Capacity verified: {format_size(result['verified_bytes'])} ({result['tests']} probes, {result['elapsed']:.1f}s)")
+        return True
+    if result['status'] == 'fake':
+        print_error(f"FAKE CAPACITY: {result['error']}")
+        return click.confirm("Format anyway?", default=False)
+    print_warning(f"Capacity check failed: {result['error']}")
+    return click.confirm("Format without the capacity check?", default=False)
+
+class ImageMap:
+    """Rescue map of a device image: contiguous [pos, size, status] areas, with the statuses and text layout of
+    GNU ddrescue's mapfile (? untried, * failed a large read, / failed trimming, - bad sector, + rescued)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.areas = [[0, size, '?']]
+        # Bytes per status, kept up to date by mark()
+        self.counts = {'?': size}
+        self.pos = 0
+        self.status = '?'
+        self.pass_no = 1
+
+    @classmethod
+    def load(cls, path, size):
+        """The map saved at path, or None if it is missing, unreadable or for a device of another size"""
+        try:
+            with open(path) as f:
+                lines = [line.split() for line in f if line.strip() and not line.startswith('#')]
+            imap = cls(size)
+            imap.pos, imap.status, imap.pass_no = int(lines[0][0], 0), lines[0][1], int(lines[0][2])
+            imap.areas = [[int(pos, 0), int(length, 0), status] for pos, length, status in lines[1:]]
+        except (OSError, ValueError, IndexError):
+            return None
+        covered = 0
+        imap.counts = {}
+        for pos, length, status in imap.areas:
+            if pos != covered:
+                return None
+            covered += length
+            imap.counts[status] = imap.counts.get(status, 0) + length
+        return imap if covered == size else None
+
+    def save(self, path):
+        """Write the map atomically (temp file, fsync, rename) so an interruption never loses it"""
+        write_file_atomic(path, f"# Rescue map of a device image, written by drive-master {VERSION}\n"
+                                f"# current_pos  current_status  current_pass\n"
+                                f"0x{self.pos:08X}     {self.status}               {self.pass_no}\n"
+                                f"#      pos        size  status\n"
+                          + "".join(f"0x{pos:08X}  0x{length:08X}  {status}\n" for pos, length, status in self.areas),
+                          mode=0o644, sync=True)
+
+    def mark(self, pos, length, status):
+        """Set the status of [pos, pos + length), splitting and merging areas as needed"""
+        first = bisect.bisect_right(self.areas, [pos, float('inf')]) - 1
+        last = bisect.bisect_right(self.areas, [pos + length - 1, float('inf')]) - 1
+        head, tail = self.areas[first], self.areas[last]
+        for area_pos, area_length, area_status in self.areas[first:last + 1]:
+            overlap = min(area_pos + area_length, pos + length) - max(area_pos, pos)
+            self.counts[area_status] -= overlap
+        self.counts[status] = self.counts.get(status, 0) + length
+        pieces = []
+        if head[0] < pos:
+            pieces.append([head[0], pos - head[0], head[2]])
+        pieces.append([pos, length, status])
+        end = tail[0] + tail[1]
+        if end > pos + length:
+            pieces.append([pos + length, end - pos - length, tail[2]])
+        low = max(first - 1, 0)
+        merged = []
+        for area in self.areas[low:first] + pieces + self.areas[last + 1:last + 2]:
+            if merged and merged[-1][2] == area[2]:
+                merged[-1][1] += area[1]
+            else:
+                merged.append(area)
+        self.areas[low:last + 2] = merged
+
+    def find(self, status):
+        """(pos, size) of every area with this status"""
+        return [(pos, length) for pos, length, s in self.areas if s == status]
+
+    def count(self, statuses):
+        """Bytes in areas with any of these statuses"""
+        return sum(self.counts.get(status, 0) for status in statuses)
+
+class DiskImager:
+    """Copy a device to a sparse image file in ddrescue-style passes: large reads that skip ahead past errors,
+    then a fill of what was skipped, then trimming and scraping the failed areas in ever smaller reads, then
+    sector retries. Progress is kept in a map file, so an interrupted image resumes where it stopped."""
+
+    # (phase, areas read, read size (None: one sector), status an area gets when its read fails, skip past errors)
+    PASSES = [('copy', '?', IMAGE_BLOCK, '*', True), ('fill', '?', IMAGE_BLOCK, '*', False),
+              ('trim', '*', IMAGE_TRIM_BLOCK, '/', False), ('scrape', '/', None, '-', False)] + \
+             [('retry', '-', None, '-', False)] * IMAGE_RETRIES
+
+    def __init__(self, device, image, map_path=None, progress=None):
+        self.device = device
+        self.image = image
+        self.map_path = map_path or image + '.map'
+        self.report = progress or no_progress
+        self.sector = get_logical_sector(device)
+        self.map = None
+        self.resumed = False
+        self.copied = 0
+        self.src = self.dst = None
+        self.buf = mmap.mmap(-1, IMAGE_BLOCK)
+        self.zero = bytes(IMAGE_BLOCK)
+        self.saved_at = 0.0
+
+    def save(self, force=False):
+        now = time.monotonic()
+        if force or now - self.saved_at >= IMAGE_MAP_INTERVAL:
+            # Data first, then the map that vouches for it
+            os.fdatasync(self.dst)
+            self.map.save(self.map_path)
+            self.saved_at = now
+
+    def copy(self, pos, length):
+        """Read one block into the image (holes stay for all-zero blocks); False if the read failed"""
+        view = memoryview(self.buf)[:length]
+        try:
+            if os.preadv(self.src, [view], pos) != length:
+                return False
+        except OSError:
+            return False
+        if self.buf[:length] != self.zero[:length]:
+            os.pwrite(self.dst, view, pos)
+        self.copied += length
+        return True
+
+    def run_pass(self, index, phase, status, block, fail, skip):
+        todo = self.map.find(status)
+        total = sum(length for _, length in todo)
+        if not total:
+            return
+        self.map.status, self.map.pass_no = status, index
+        self.report(self.device, phase)
+        block = block or self.sector
+        done, start = 0, time.monotonic()
+        for pos, length in todo:
+            end, jump = pos + length, block
+            while pos < end:
+                size = min(block, end - pos)
+                if self.copy(pos, size):
+                    self.map.mark(pos, size, '+')
+                    jump = block
+                    step = size
+                else:
+                    self.map.mark(pos, size, fail)
+                    # Leave the next stretch untried (for the fill pass) rather than grind through a bad area
+                    step = size + (min(jump, end - pos - size) if skip else 0)
+                    jump = min(jump * 2, IMAGE_SKIP_MAX)
+                pos += step
+                done += step
+                self.map.pos = pos
+                self.save()
+                bad = self.map.count('*/-')
+                self.report(self.device, fraction=done / total,
+                            note=format_rate(done, time.monotonic() - start) + (f", {format_size(bad)} unread" if bad else ""))
+
+    def run(self):
+        """The final map; raises OSError if the device or image cannot be opened"""
+        self.src = open_direct(self.device)[0]
+        try:
+            size = os.lseek(self.src, 0, os.SEEK_END)
+            self.map = ImageMap.load(self.map_path, size)
+            try:
+                image_size = os.stat(self.image).st_size
+            except OSError:
+                image_size = None
+            # The map only vouches for an image that is still there, at the device's size
+            if image_size != size:
+                self.map = None
+            self.resumed = self.map is not None
+            flags = os.O_WRONLY | os.O_CREAT | (0 if self.resumed else os.O_TRUNC)
+            self.dst = os.open(self.image, flags, 0o644)
+            self.map = self.map or ImageMap(size)
+            # Sparse: unwritten (and all-zero) areas take no space
+            os.ftruncate(self.dst, size)
+            try:
+                for index, (phase, status, block, fail, skip) in enumerate(self.PASSES, 1):
+                    self.run_pass(index, phase, status, block, fail, skip)
+                self.map.status, self.map.pos = '+', 0
+            finally:
+                self.save(force=True)
+                os.close(self.dst)
+            return self.map
+        finally:
+            os.close(self.src)
+            self.buf.close()
+
+@traced('image')
+def image_device(device, image, map_path=None, progress=None):
+    """Image one device (resuming from its map); returns a result record (status imaged, partial, busy or failed)"""
+    start = time.monotonic()
+    imager = DiskImager(device, image, map_path, progress)
+    result = {'device': device, 'name': device.split('/')[-1], 'image': image, 'map': imager.map_path,
+              'status': 'imaged', 'error': None, 'resumed': False, 'bytes': 0, 'rescued': 0, 'bad_bytes': 0,
+              'bad_areas': 0, 'mb_per_s': None}
     try:
-        if fs_choice == 1:
-            subprocess.run(['sudo', 'mkfs.vfat', '-F', '32', '-n', name[:11], target])
-        elif fs_choice == 2:
-            subprocess.run(['sudo', 'mkfs.ntfs', '-f', '-L', name, target])
-        elif fs_choice == 3:
-            subprocess.run(['sudo', 'mkfs.ext4', '-F', '-L', name, target])
-        print_success("Format completed!")
-    except Exception as e:
-        print_error(f"Format failed: {e}")
+        imap = imager.run()
+        bad = [(pos, length) for pos, length, status in imap.areas if status != '+']
+        result.update(resumed=imager.resumed, bytes=imap.size, rescued=imap.count('+'),
+                      bad_bytes=sum(length for _, length in bad), bad_areas=len(bad))
+        if bad:
+            result['status'] = 'partial'
+            result['error'] = f"{format_size(result['bad_bytes'])} unreadable in {len(bad)} area(s)"
+        owner = os.environ.get('SUDO_UID')
+        if owner:
+            # Imaged through sudo: hand the image and map to the user who asked for them
+            for path in (image, imager.map_path):
+                os.chown(path, int(owner), int(os.environ.get('SUDO_GID', -1)))
+    except OSError as e:
+        result['status'] = 'busy' if e.errno == errno.EBUSY else 'failed'
+        result['error'] = e.strerror or str(e)
+    result['elapsed'] = time.monotonic() - start
+    if imager.copied and result['elapsed']:
+        result['mb_per_s'] = imager.copied / result['elapsed'] / 1e6
+    imager.report(device, 'done' if result['status'] == 'imaged' else 'failed',
+                  note=(format_rate(imager.copied, result['elapsed']) if imager.copied else 'already complete')
+                  if result['status'] == 'imaged' else result['error'])
+    return result
+
+def image_device_any(device, image, progress=None):
+    """image_device, re-run through sudo when the device is not readable (progress then comes on stderr)"""
+    fields = {'image': image, 'map': image + '.map', 'resumed': False, 'bytes': 0, 'rescued': 0, 'bad_bytes': 0,
+              'bad_areas': 0, 'mb_per_s': None}
+    results = run_on_devices('image', [device], lambda d: image_device(d, image, progress=progress), fields,
+                             access=os.R_OK, args=[device, image])
+    return results[0] if results else device_result(device, 'failed', "no result from imaging", fields)
+
+def print_image_report(result):
+    rate = f" at {result['mb_per_s']:.0f} MB/s" if result['mb_per_s'] else ""
+    resumed = " (resumed)" if result['resumed'] else ""
+    if result['status'] == 'imaged':
+        print_success(f"Imaged {result['device']} to {result['image']}: {format_size(result['rescued'])} "
+                      f"in {result['elapsed']:.1f}s{rate}{resumed}")
+    elif result['status'] == 'partial':
+        print_warning(f"Imaged {result['device']} to {result['image']} with gaps: {format_size(result['rescued'])} "
+                      f"rescued, {result['error']}{resumed}")
+        print_info(f"Run again with the same image path to retry the bad areas (map: {result['map']})")
+    else:
+        print_error(f"Imaging {result['device']} failed: {result['error']}")
+
+def recover_drive(info):
+    """Image a drive (resumably) and run testdisk on the copy, or on the drive itself if the user declines"""
+    device = info['device']
+    if not click.confirm("Image the drive first? (recommended: recovery then reads a copy, not the failing drive)", default=True):
+        run_command(['sudo', 'testdisk', device])
+        return
+    model = re.sub(r'[^\w.-]+', '_', (info.get('model') or 'drive').strip()) or 'drive'
+    image = os.path.expanduser(click.prompt("Image file", default=os.path.join(IMAGE_DIR, f"{model}-{device.split('/')[-1]}.img")))
+    directory = os.path.dirname(os.path.abspath(image))
+    os.makedirs(directory, exist_ok=True)
+    size = get_volume_bytes(device)
+    if size and shutil.disk_usage(directory).free < size:
+        print_warning(f"Only {format_size(shutil.disk_usage(directory).free)} free in {directory}; the image can take up to {format_size(size)}.")
+        if not click.confirm("Continue anyway?", default=False):
+            return
+    if os.path.exists(image + '.map'):
+        print_info("Found a map from an earlier run: resuming.")
+    board = ProgressBoard([device])
+    try:
+        result = image_device_any(device, image, board.update)
+    except KeyboardInterrupt:
+        board.finish()
+        print_warning(f"Interrupted. Progress is saved in {image}.map; choose the same image file to resume.")
+        return
+    board.finish()
+    print_image_report(result)
+    if result['status'] in ('imaged', 'partial'):
+        run_command((['sudo'] if not os.access(image, os.R_OK) else []) + ['testdisk', image])
 
 def recover_data_menu():
     """Recovery center"""
@@ -644,11 +4703,11 @@ def recover_from_usb():
     idx = int(click.prompt("Select", type=int)) - 1
     if 0 <= idx < len(drives):
         path = list(drives.keys())[idx]
-        subprocess.run(['sudo', 'testdisk', drives[path]['device']])
+        recover_drive(drives[path])
 
 def recover_from_internal():
     """Internal Recovery"""
-    all_drives = get_all_drives()
+    all_drives = get_inventory().get()
     drives = {path: info for path, info in all_drives.items() if info['type'] == 'Internal'}
     if not drives: return
     for i, (path, info) in enumerate(drives.items(), 1):
@@ -658,28 +4717,44 @@ def recover_from_internal():
     idx = int(click.prompt("Select", type=int)) - 1
     if 0 <= idx < len(drives):
         path = list(drives.keys())[idx]
-        subprocess.run(['sudo', 'testdisk', drives[path]['device']])
+        recover_drive(drives[path])
 
 def fix_hidden_drives():
     """Fix problematic drives"""
+    print_option("1", "🔧", "Repair an NTFS drive (ntfsfix)", Colors.ORANGE)
+    print_option("2", "🩺", "Surface scan for bad blocks", Colors.CYAN)
+    print_option("0", "⬅️", "Back", Colors.WHITE)
+    choice = click.prompt("Choose", type=str, default="1").strip()
+    if choice == '2':
+        surface_scan_menu()
+        return
+    if choice != '1':
+        return
     print_info("Scanning raw devices...")
     # Simplified fix logic
     try:
-        output = subprocess.check_output(['lsblk', '-d', '-o', 'NAME,SIZE,MODEL'], text=True)
+        output = check_output_command(['lsblk', '-d', '-o', 'NAME,SIZE,MODEL'], text=True)
         print(output)
         drive = click.prompt("Enter device name to fix (e.g. sda)", type=str).strip()
         if drive:
             path = f"/dev/{drive}"
             print_loading(f"Attempting to fix {path}...")
-            subprocess.run(['sudo', 'ntfsfix', path])
-            print_success("Fix attempted.")
+            start = time.monotonic()
+            proc = run_command(['sudo', 'ntfsfix', path], stderr=subprocess.PIPE, text=True)
+            transport = get_sysfs_transport(drive, os.path.join(SYS_BLOCK, drive), {})
+            metrics.observe('ntfsfix', time.monotonic() - start, proc.returncode == 0, fstype='ntfs', transport=transport,
+                            driver='ntfsfix', error=proc.stderr.strip() or None, device=path)
+            if proc.returncode == 0:
+                print_success("Fix attempted.")
+            else:
+                print_error(f"ntfsfix failed: {proc.stderr.strip() or f'exit code {proc.returncode}'}")
     except:
         pass
 
 def uninstall_drive_master():
     """Clean uninstall"""
     if click.confirm("Uninstall Drive Master?"):
-        subprocess.run(['sudo', 'rm', '-f', '/usr/local/bin/drive-master'])
+        run_command(['sudo', 'rm', '-f', '/usr/local/bin/drive-master'])
         print_success("Uninstalled.")
 
 def get_latest_version():
@@ -729,12 +4804,17 @@ def windows_password_menu(drives):
                     return
             
             # Fresh info to get mount point
-            user = os.getlogin()
+            user = get_user()
             mount_point = info.get('mountpoint') or f"/media/{user}/{name}"
             manage_windows_password(mount_point, info['device'])
     except Exception as e:
         print_error(f"Error: {e}")
 
+@traced('hive copy')
+def copy_hive(src, dst):
+    """Copy one registry hive file as root"""
+    return run_command(['sudo', 'cp', src, dst])
+
 def manage_windows_password(mount_point, dev_path):
     """Manual SAM management: Backup, Remove, and Restore (Advanced RegBack/Repair)"""
     # Find SAM (case insensitive check)
@@ -830,7 +4910,7 @@ def manage_windows_password(mount_point, dev_path):
         backup_path = os.path.join(config_dir, backup_name)
         dt_now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         print_loading(f"Creating secure backup of credentials ({dt_now})...")
-        subprocess.run(['sudo', 'cp', sam_path, backup_path])
+        copy_hive(sam_path, backup_path)
         
         # SMART RESET LOGIC
         reset_success = False
@@ -839,7 +4919,7 @@ def manage_windows_password(mount_point, dev_path):
         if regback_valid:
             print_loading("Attempting Smart Reset via RegBack...")
             src = os.path.join(regback_dir, "SAM")
-            subprocess.run(['sudo', 'cp', src, sam_path])
+            copy_hive(src, sam_path)
             reset_success = True
             print_success("✅ Smart Reset successful using RegBack!")
             
@@ -847,7 +4927,7 @@ def manage_windows_password(mount_point, dev_path):
         elif repair_valid:
             print_loading("Attempting Smart Reset via Repair folder...")
             src = os.path.join(repair_dir, "SAM")
-            subprocess.run(['sudo', 'cp', src, sam_path])
+            copy_hive(src, sam_path)
             reset_success = True
             print_success("✅ Smart Reset successful using Factory Repair!")
             
@@ -875,7 +4955,7 @@ def manage_windows_password(mount_point, dev_path):
                 target_backup = os.path.join(config_dir, backups[b_idx])
                 original_sam = os.path.join(config_dir, "SAM")
                 print_loading(f"Restoring {backups[b_idx]} to SAM...")
-                subprocess.run(['sudo', 'cp', target_backup, original_sam])
+                copy_hive(target_backup, original_sam)
                 print_success("✅ Credentials restored successfully!")
             else:
                 print_error("Invalid selection.")
@@ -891,7 +4971,7 @@ def manage_windows_password(mount_point, dev_path):
                 src = os.path.join(regback_dir, hive)
                 dst = os.path.join(config_dir, hive)
                 if os.path.exists(src):
-                    subprocess.run(['sudo', 'cp', src, dst])
+                    copy_hive(src, dst)
             print_success("✅ Registry hives restored from RegBack successfully!")
 
     elif choice == '4' and repair_valid:
@@ -903,10 +4983,586 @@ def manage_windows_password(mount_point, dev_path):
                 src = os.path.join(repair_dir, hive)
                 dst = os.path.join(config_dir, hive)
                 if os.path.exists(src):
-                    subprocess.run(['sudo', 'cp', src, dst])
+                    copy_hive(src, dst)
             print_success("✅ System Hives restored to Factory State successfully!")
     else:
         print_info("Action cancelled or unavailable.")
 
+class DriveMaster:
+    """Library API: drive inventory lookups plus mount/unmount/format that return results and never print
+
+        dm = DriveMaster()
+        for drive in dm.drives(): ...
+        dm.mount('Coding')  # -> {'status': 'mounted', 'mount_point': ..., ...}
+    """
+
+    def __init__(self, inventory=None):
+        self.inventory = inventory or get_inventory()
+
+    def drives(self):
+        return list(self.inventory.get().values())
+
+    def refresh(self):
+        self.inventory.invalidate()
+        return self.drives()
+
+    @property
+    def error(self):
+        """Why the last scan found no drives (e.g. lsblk failed), or None"""
+        return self.inventory.error
+
+    def find(self, ident):
+        """Drive by device, label or UUID (probes only that device when /dev/disk links exist)"""
+        if isinstance(ident, Drive):
+            return ident
+        return lookup_drive(ident)
+
+    def by_device(self, device):
+        return self.inventory.get().get(device)
+
+    def by_uuid(self, uuid):
+        return self.inventory.by_uuid(uuid)
+
+    def by_label(self, label):
+        return self.inventory.by_label(label)
+
+    def on_disk(self, parent):
+        return self.inventory.on_disk(parent)
+
+    def _not_found(self, ident):
+        return {'device': None, 'name': str(ident), 'mount_point': None, 'status': 'not found',
+                'error': f"drive not found: {ident}", 'elapsed': 0.0}
+
+    def mount(self, ident):
+        drive = self.find(ident)
+        if not drive:
+            return self._not_found(ident)
+        return mount_info_result(drive, drive.get('label') or drive['device'].split('/')[-1])
+
+    def unmount(self, ident, lazy=False):
+        drive = self.find(ident)
+        if not drive:
+            return self._not_found(ident)
+        name = drive.get('label') or drive['device'].split('/')[-1]
+        mount_point = drive['mountpoint'] or get_mount_table().mountpoint_of(drive['device'])
+        if not mount_point:
+            return {'device': drive['device'], 'name': name, 'mount_point': None, 'status': 'already unmounted',
+                    'error': None, 'holders': [], 'elapsed': 0.0}
+        syncfs_path(mount_point)
+        return unmount_path_result(name, drive['device'], mount_point, lazy=lazy)
+
+    def mount_all(self, workers=None):
+        drives = self.inventory.get()
+        return mount_all_parallel({p: d for p, d in drives.items()
+                                   if not is_drive_mounted(d) and d.get('status') != 'unresponsive'}, workers)
+
+    def unmount_all(self, workers=None, lazy=False):
+        targets = add_nested_targets(get_unmount_targets(self.inventory.get()))
+        sync_with_progress(list(targets), workers, progress=False)
+        results = unmount_in_order(targets, workers)
+        if lazy:
+            for i in sorted(range(len(results)), key=lambda i: -len(results[i]['mount_point'])):
+                r = results[i]
+                if r['status'] in ('busy', 'skipped'):
+                    results[i] = unmount_path_result(r['name'], r['device'], r['mount_point'], lazy=True)
+        return results
+
+    def format(self, ident, fstype, label=None, profile=None):
+        drive = self.find(ident)
+        if not drive:
+            return self._not_found(ident)
+        return format_drive_result(drive, fstype, label or drive.get('label') or drive['device'].split('/')[-1],
+                                   profile=profile)
+
+    def format_many(self, idents, fstype, label_template=FORMAT_LABEL_TEMPLATE, workers=None, progress=None, profile=None):
+        """Format several drives in parallel; labels from label_template ({n}, {model}, {size}, {device})"""
+        drives = [self.find(ident) for ident in idents]
+        if None in drives:
+            return [self._not_found(ident) for ident, drive in zip(idents, drives) if drive is None]
+        return format_all_parallel({drive['device']: drive for drive in drives}, fstype, label_template, workers,
+                                   progress, profile)
+
+    def check_capacity(self, idents, workers=None):
+        """Verify the real capacity of the disks holding the given drives (disks must be unmounted)"""
+        drives = [self.find(ident) for ident in idents]
+        if None in drives:
+            return [self._not_found(ident) for ident, drive in zip(idents, drives) if drive is None]
+        return check_capacity_all(sorted({get_disk_device(drive) for drive in drives}), workers)
+
+    def wipe(self, idents, method='auto', workers=None, whole_disk=False, progress=None):
+        """Securely erase the given drives (or their whole disks); they must be unmounted"""
+        drives = [self.find(ident) for ident in idents]
+        if None in drives:
+            return [self._not_found(ident) for ident, drive in zip(idents, drives) if drive is None]
+        devices = [get_disk_device(drive) if whole_disk else drive['device'] for drive in drives]
+        return wipe_all(list(dict.fromkeys(devices)), method, workers, progress=progress)
+
+    def surface_scan(self, idents, write_test=False, workers=None, progress=None):
+        """Scan the disks holding the given drives for bad blocks; the maps are saved for later formats"""
+        drives = [self.find(ident) for ident in idents]
+        if None in drives:
+            return [self._not_found(ident) for ident, drive in zip(idents, drives) if drive is None]
+        return surface_scan_all(sorted({get_disk_device(drive) for drive in drives}), write_test, workers, progress)
+
+    def image(self, ident, image, progress=None):
+        """Copy a drive to a sparse image file for recovery; running it again resumes from the map file"""
+        drive = self.find(ident)
+        if not drive:
+            return self._not_found(ident)
+        return image_device_any(drive['device'], image, progress)
+
+    def speed_test(self, idents=None, workers=None):
+        """Speed-probe the given (or all mounted) drives; results are also cached per UUID"""
+        if idents:
+            drives = [self.find(ident) for ident in idents]
+            if None in drives:
+                return [self._not_found(ident) for ident, drive in zip(idents, drives) if drive is None]
+        else:
+            drives = [drive for drive in self.drives() if is_drive_mounted(drive)]
+        return probe_speeds({drive['device']: drive for drive in drives}, workers)
+
+class AutomountDaemon:
+    """asyncio hotplug automounter: uevents in, debounced concurrent mounts out"""
+
+    def __init__(self, workers=None, include_internal=False, debounce=DAEMON_DEBOUNCE, log=None):
+        self.include_internal = include_internal
+        self.debounce = debounce
+        self.pool = ThreadPoolExecutor(max_workers=get_worker_count(workers))
+        self.log = log or (lambda msg: click.echo(f"[{datetime.now():%H:%M:%S}] {msg}"))
+        self.pending = {}
+        self.mounted = {}
+        self.in_flight = set()
+        self.latencies = []
+        self.source = None
+        self._first_pending = None
+        self._flush_handle = None
+        self._sock = None
+        self._inotify = None
+        self._known = set()
+
+    def _queue(self, name, action, seen, attempt=0):
+        """Add a device to the pending batch and (re)arm the debounce timer"""
+        if name in self.pending:
+            _, first_seen, _ = self.pending[name]
+            seen = min(seen, first_seen)
+        self.pending[name] = (action, seen, attempt)
+        now = time.monotonic()
+        if self._first_pending is None:
+            self._first_pending = now
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        # Keep waiting while a burst continues, but never longer than DAEMON_MAX_DELAY
+        delay = min(self.debounce, max(0.0, self._first_pending + DAEMON_MAX_DELAY - now))
+        self._flush_handle = self.loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    def _on_uevent(self):
+        now = time.monotonic()
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                break
+            event = parse_uevent(data)
+            if event.get('SUBSYSTEM') != 'block' or not event.get('DEVNAME'):
+                continue
+            self._queue(event['DEVNAME'].split('/')[-1], event.get('ACTION', 'change'), now)
+
+    def _on_inotify(self):
+        now = time.monotonic()
+        for name in read_inotify_names(self._inotify):
+            link = os.path.join(DISK_BY_UUID, name)
+            if os.path.exists(link):
+                self._queue(os.path.basename(os.path.realpath(link)), 'add', now)
+            else:
+                for device, (_, uuid) in list(self.mounted.items()):
+                    if uuid == name:
+                        self._queue(device.split('/')[-1], 'remove', now)
+
+    async def _poll(self):
+        """Last-resort watcher when neither netlink nor inotify is available"""
+        self._known = set(os.listdir(SYS_CLASS_BLOCK))
+        while True:
+            await asyncio.sleep(DAEMON_POLL_INTERVAL)
+            current = set(os.listdir(SYS_CLASS_BLOCK))
+            now = time.monotonic()
+            for name in current - self._known:
+                self._queue(name, 'add', now)
+            for name in self._known - current:
+                self._queue(name, 'remove', now)
+            self._known = current
+
+    async def _flush(self):
+        batch, self.pending = self.pending, {}
+        self._first_pending = None
+        self._flush_handle = None
+        await asyncio.gather(*(self._handle(name, action, seen, attempt)
+                               for name, (action, seen, attempt) in batch.items()))
+        if metrics.path:
+            await self.loop.run_in_executor(self.pool, metrics.write, metrics.path)
+
+    async def _handle(self, name, action, seen, attempt):
+        device = f"/dev/{name}"
+        if action == 'remove':
+            await self.loop.run_in_executor(self.pool, self._cleanup, device)
+            return
+        if device in self.in_flight:
+            return
+        info = await self.loop.run_in_executor(self.pool, probe_device, device)
+        if not info:
+            return
+        if not info['fstype']:
+            # udev may not have probed the new device yet
+            if attempt < DAEMON_PROBE_RETRIES:
+                self.loop.call_later(1.0, self._queue, name, action, seen, attempt + 1)
+            return
+        if info['type'] != 'USB' and not self.include_internal:
+            return
+        if is_drive_mounted(info) or info['fstype'] in ('swap', 'LVM2_member', 'crypto_LUKS'):
+            return
+        self.in_flight.add(device)
+        try:
+            mount_name = info.get('label') or name
+            result = await self.loop.run_in_executor(self.pool, mount_info_result, info, mount_name)
+        finally:
+            self.in_flight.discard(device)
+        latency = time.monotonic() - seen
+        if result['status'] == 'failed':
+            self.log(f"❌ {device} ({info['fstype']}): {result['error']}")
+            return
+        if result['status'] == 'already mounted':
+            # Someone else mounted it meanwhile; theirs to clean up
+            self.log(f"ℹ️  {device} ({info['fstype']}) was already mounted at {result['mount_point']}")
+            return
+        self.mounted[device] = (result['mount_point'], info['uuid'])
+        self.latencies.append(latency)
+        self.log(f"✅ {device} ({info['fstype']} via {result.get('driver') or 'auto'}) mounted at {result['mount_point']} in {latency:.2f}s from uevent")
+
+    def _cleanup(self, device):
+        """Drop the mount and its /media/<user>/<name> directory after a device is removed"""
+        entry = self.mounted.pop(device, None)
+        mount_point = entry[0] if entry else get_mount_table().mountpoint_of(device)
+        if not mount_point or not mount_point.startswith(f"/media/{get_user()}/"):
+            return
+        if get_mount_table().is_mounted(path=mount_point):
+            run_privileged([{'op': 'umount', 'target': mount_point, 'lazy': True}])
+        if os.path.isdir(mount_point) and not os.listdir(mount_point):
+            try:
+                os.rmdir(mount_point)
+            except OSError:
+                run_privileged([{'op': 'rmdir', 'path': mount_point}])
+        self.log(f"🧹 {device} removed, cleaned up {mount_point}")
+
+    async def run(self, mount_existing=False):
+        self.loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, stop.set)
+
+        poller = None
+        self._sock = open_uevent_socket()
+        if self._sock:
+            self.source = 'netlink'
+            self.loop.add_reader(self._sock.fileno(), self._on_uevent)
+        else:
+            self._inotify = open_inotify(DISK_BY_UUID, IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO)
+            if self._inotify is not None:
+                self.source = 'inotify'
+                self.loop.add_reader(self._inotify, self._on_inotify)
+            else:
+                self.source = 'polling'
+                poller = asyncio.ensure_future(self._poll())
+        self.log(f"Watching for block devices ({self.source})")
+
+        if mount_existing:
+            now = time.monotonic()
+            for path in get_sysfs_drives():
+                self._queue(path.split('/')[-1], 'add', now)
+
+        await stop.wait()
+        if poller:
+            poller.cancel()
+        if self.latencies:
+            self.log(f"Mounted {len(self.latencies)} device(s), mean uevent→mounted "
+                     f"{sum(self.latencies) / len(self.latencies):.2f}s, max {max(self.latencies):.2f}s")
+        self.pool.shutdown(wait=False)
+
+# Scriptable subcommands: no clear screen, banner or animations; results via exit codes
+
+def drive_record(info, speeds=None):
+    """JSON-friendly view of a drive"""
+    record = info.to_dict() if isinstance(info, Drive) else dict(info)
+    record['mounted'] = bool(info.get('mountpoint')) or is_drive_mounted(info)
+    record['speed'] = get_cached_speed(info, speeds)
+    return record
+
+def get_exit_code(results):
+    """Exit code for a list of result records"""
+    statuses = {r['status'] for r in results}
+    if 'not found' in statuses:
+        return EXIT_NOT_FOUND
+    if statuses & {'busy', 'skipped'}:
+        return EXIT_BUSY
+    if statuses & {'failed', 'fake', 'bad blocks', 'partial'}:
+        return EXIT_FAILED
+    return EXIT_OK
+
+def emit(data, as_json, text_lines):
+    """Print either JSON or plain text lines"""
+    if as_json:
+        click.echo(json.dumps(data, indent=2))
+    else:
+        for line in text_lines:
+            click.echo(line)
+
+@main.command('list')
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+@click.option('--type', 'drive_type', type=click.Choice(['usb', 'internal', 'other'], case_sensitive=False), help="Only this drive type")
+@click.option('--fstype', help="Only this filesystem type (ntfs, vfat, ext4, ...)")
+@click.option('--mounted/--unmounted', default=None, help="Only mounted or only unmounted drives")
+@click.option('--speed', is_flag=True, help="Speed-probe mounted drives first (read/write MB/s, 4K random IOPS)")
+@click.option('--workers', type=int, help=f"Drives probed at once with --speed (at most {SPEED_MAX_WORKERS})")
+@click.option('--table', is_flag=True, help="Aligned table instead of tab-separated lines")
+@click.option('--watch', is_flag=True, help="Keep the table on screen, redrawing rows as drives change")
+@click.option('--interval', type=float, default=1.0, show_default=True, help="Seconds between --watch refreshes")
+def list_command(as_json, drive_type, fstype, mounted, speed, workers, table, watch, interval):
+    """List drives without the interactive UI"""
+    if watch:
+        if as_json:
+            raise click.UsageError("--watch can't be combined with --json")
+        watch_drive_list(ListView(drive_type, fstype, mounted, compact=True), interval)
+        return
+    inventory = get_inventory()
+    drives = filter_drives(inventory.get(), drive_type, fstype, mounted)
+    if inventory.error:
+        click.echo(f"drive-master: {inventory.error}", err=True)
+    if speed:
+        probe_speeds({path: info for path, info in drives.items() if is_drive_mounted(info)}, workers)
+    speeds = load_speed_cache()
+    if table and not as_json:
+        screen = Screen()
+        render_drive_table(screen, drives, speeds)
+        screen.flush()
+        return
+    records = [drive_record(info, speeds) for info in drives.values()]
+    emit(records, as_json, [
+        "\t".join([r['device'], str(r['size']), str(r['fstype'] or '-'), str(r['label'] or '-'),
+                   r['type'], r['mountpoint'] or '-'] + ([format_speed(r['speed'])] if r['speed'] else []))
+        for r in records])
+
+@main.command('mount')
+@click.argument('ident')
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def mount_command(ident, as_json):
+    """Mount one drive by device, label or UUID"""
+    result = DriveMaster().mount(ident)
+    emit(result, as_json, [f"{result['device']}\t{result['status']}\t{result['mount_point']}\t{result.get('driver', '')}"] +
+         ([result['error']] if result['error'] else []))
+    sys.exit(get_exit_code([result]))
+
+@main.command('unmount')
+@click.argument('ident')
+@click.option('--lazy', is_flag=True, help="Detach now even if busy (umount -l)")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def unmount_command(ident, lazy, as_json):
+    """Unmount one drive by device, label or UUID"""
+    result = DriveMaster().unmount(ident, lazy=lazy)
+    emit(result, as_json, [f"{result['device']}\t{result['status']}"] +
+         ([result['error']] if result['error'] else []) +
+         ([f"in use by: {format_holders(result['holders'])}"] if result.get('holders') else []))
+    sys.exit(get_exit_code([result]))
+
+@main.command('mount-all')
+@click.option('--workers', type=int, help="Parallel mounts (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def mount_all_command(workers, as_json):
+    """Mount every unmounted drive"""
+    results = DriveMaster().mount_all(workers)
+    emit(results, as_json, [f"{r['device']}\t{r['status']}\t{r['mount_point']}" for r in results])
+    sys.exit(get_exit_code(results))
+
+@main.command('unmount-all')
+@click.option('--workers', type=int, help="Parallel unmounts (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--lazy', is_flag=True, help="Lazily unmount anything still busy")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def unmount_all_command(workers, lazy, as_json):
+    """Unmount every drive mounted under /media/<user>/"""
+    results = DriveMaster().unmount_all(workers, lazy=lazy)
+    emit(results, as_json, [f"{r['device']}\t{r['status']}\t{r['mount_point']}" for r in results])
+    sys.exit(get_exit_code(results))
+
+@main.command('daemon')
+@click.option('--workers', type=int, help="Parallel mounts (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--internal', is_flag=True, help="Also automount internal (non-USB) drives")
+@click.option('--mount-existing', is_flag=True, help="Mount drives already attached at startup")
+@click.option('--debounce', type=float, default=DAEMON_DEBOUNCE, show_default=True, help="Seconds to wait for a burst of uevents to settle")
+@click.option('--metrics-port', type=int, help="Serve /metrics and /failures on 127.0.0.1:PORT")
+def daemon_command(workers, internal, mount_existing, debounce, metrics_port):
+    """Automount drives as they are plugged in"""
+    daemon = AutomountDaemon(workers=workers, include_internal=internal, debounce=debounce)
+    if metrics_port:
+        serve_metrics(metrics_port)
+        daemon.log(f"Serving metrics on http://127.0.0.1:{metrics_port}/metrics")
+    asyncio.run(daemon.run(mount_existing=mount_existing))
+
+@main.command('probe')
+@click.argument('disks', nargs=-1, required=True)
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def probe_command(disks, as_json):
+    """Read partition tables and filesystem signatures straight from whole disks"""
+    disks = [disk if disk.startswith('/dev/') else f"/dev/{disk}" for disk in disks]
+    results = probe_disks(disks)
+    results = [results.get(disk) or {'device': disk, 'table': None, 'partitions': [], 'fs': None, 'error': 'skipped'}
+               for disk in disks]
+    lines = []
+    for r in results:
+        volumes = get_probed_volumes(r)
+        lines.append(f"{r['device']}\t{r['table'] or '-'}\t{r['error'] or 'ok'}")
+        lines += [f"  {device}\t{(fs or {}).get('type') or '-'}\t{(fs or {}).get('label') or '-'}"
+                  for device, (_, fs) in volumes.items()]
+    emit(results, as_json, lines)
+    sys.exit(EXIT_FAILED if any(r['error'] for r in results) else EXIT_OK)
+
+@main.command('check-capacity')
+@click.argument('devices', nargs=-1, required=True)
+@click.option('--workers', type=int, help="Disks checked at once (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def check_capacity_command(devices, workers, as_json):
+    """Detect fake-capacity disks with sparse tagged writes (unmount them first)"""
+    disks = []
+    for ident in devices:
+        info = lookup_drive(ident) if not ident.startswith('/dev/') else {'device': ident}
+        disks.append(get_disk_device(info) if info else ident)
+    results = check_capacity_all(sorted(set(disks)), workers)
+    emit(results, as_json, [f"{r['device']}\t{r['status']}\t{format_size(r['verified_bytes'] or 0)}"
+                            f" of {format_size(r['claimed_bytes'] or 0)}" + (f"\t{r['error']}" if r['error'] else "")
+                            for r in results])
+    sys.exit(get_exit_code(results))
+
+@main.command('format-batch')
+@click.argument('idents', nargs=-1)
+@click.option('--fs', 'fstype', type=click.Choice(['vfat', 'ntfs', 'ext4']), required=True, help="Filesystem to create")
+@click.option('--label', 'template', default=FORMAT_LABEL_TEMPLATE, show_default=True,
+              help="Label template: {n} counter ({n:02d} pads), {model}, {size}, {device}")
+@click.option('--type', 'drive_type', type=click.Choice(['usb', 'internal', 'other'], case_sensitive=False), help="Every drive of this type")
+@click.option('--model', help="Every drive whose model contains this text")
+@click.option('--size', help="Every drive of exactly this size (as listed, e.g. 29.8G)")
+@click.option('--profile', type=click.Choice(sorted(FORMAT_PROFILES)), envvar='DRIVE_MASTER_FORMAT_PROFILE',
+              help="fast (quick, lazy init, TRIM first), throughput (large clusters) or compat (default)")
+@click.option('--workers', type=int, help="Drives formatted at once (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--yes', is_flag=True, help="Don't ask for confirmation")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def format_batch_command(idents, fstype, template, drive_type, model, size, profile, workers, yes, as_json):
+    """Format many drives in parallel (unmount, mkfs, verify) with live progress"""
+    if not (idents or drive_type or model or size):
+        raise click.UsageError("name the drives, or select them with --type/--model/--size")
+    dm = DriveMaster()
+    if not idents:
+        idents = [path for path, info in filter_drives(dm.inventory.get(), drive_type).items()
+                  if (not model or model.lower() in (info.get('model') or '').lower())
+                  and (not size or info['size'] == size)]
+        if not idents:
+            raise click.UsageError("no drives match the selection")
+    if not yes:
+        click.confirm(f"Erase ALL data on {len(idents)} drive(s): {', '.join(idents)}?", abort=True, err=True)
+    board = None if as_json else ProgressBoard([(dm.find(ident) or {'device': ident})['device'] for ident in idents])
+    start = time.monotonic()
+    try:
+        results = dm.format_many(idents, fstype, template, workers, board.update if board else None, profile)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if board:
+        board.finish()
+    emit(results, as_json, [f"{r['device']}\t{r['status']}\t{r.get('name') or '-'}\t{r.get('profile') or '-'}\t{r.get('elapsed', 0):.1f}s"
+                            + (f"\t{r['error']}" if r['error'] else "") for r in results]
+         + [f"total\t{time.monotonic() - start:.1f}s"])
+    sys.exit(get_exit_code(results))
+
+@main.command('wipe')
+@click.argument('devices', nargs=-1, required=True)
+@click.option('--method', type=click.Choice(WIPE_METHODS), default='auto', show_default=True,
+              help="auto tries secure discard, then zero-out offload, then O_DIRECT zeros")
+@click.option('--disk', 'whole_disk', is_flag=True, help="Wipe the whole disk holding each drive")
+@click.option('--workers', type=int, help="Devices wiped at once (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--threads', type=int, default=WIPE_THREADS, show_default=True, help="Writer threads per device")
+@click.option('--yes', is_flag=True, help="Don't ask for confirmation")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON (progress goes to stderr)")
+def wipe_command(devices, method, whole_disk, workers, threads, yes, as_json):
+    """Securely erase devices and verify sampled blocks read back as written (unmount them first)"""
+    targets = []
+    for ident in devices:
+        info = lookup_drive(ident) if not ident.startswith('/dev/') else {'device': ident}
+        if not info:
+            emit([DriveMaster()._not_found(ident)], as_json, [f"{ident}\tnot found"])
+            sys.exit(EXIT_NOT_FOUND)
+        targets.append(get_disk_device(info) if whole_disk else info['device'])
+    targets = list(dict.fromkeys(targets))
+    if not yes:
+        click.confirm(f"DESTROY all data on {', '.join(targets)}?", abort=True, err=True)
+    board = ProgressBoard(targets, sys.stderr if as_json else None)
+    results = wipe_all(targets, method, workers, threads, board.update)
+    board.finish()
+    emit(results, as_json, [f"{r['device']}\t{r['status']}\t{r['method'] or '-'}\t{format_size(r['bytes'])}"
+                            f"\t{r['elapsed']:.1f}s" + (f"\t{r['mb_per_s']:.0f} MB/s" if r['mb_per_s'] else "")
+                            + (f"\t{r['error']}" if r['error'] else "") for r in results])
+    sys.exit(get_exit_code(results))
+
+@main.command('surface-scan')
+@click.argument('devices', nargs=-1, required=True)
+@click.option('--write', 'write_test', is_flag=True, help="Also write a pattern to each block and restore it (disks must be unmounted)")
+@click.option('--workers', type=int, help="Disks scanned at once (default: DRIVE_MASTER_WORKERS or 8)")
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON (progress goes to stderr)")
+def surface_scan_command(devices, write_test, workers, as_json):
+    """Read every sector of the disks, map bad ranges to the sector and save the map for the formatter"""
+    disks = []
+    for ident in devices:
+        info = lookup_drive(ident) if not ident.startswith('/dev/') else {'device': ident}
+        disks.append(get_disk_device(info) if info else ident)
+    disks = sorted(set(disks))
+    board = ProgressBoard(disks, sys.stderr if as_json else None)
+    results = surface_scan_all(disks, write_test, workers, board.update)
+    board.finish()
+    emit(results, as_json, [f"{r['device']}\t{r['status']}\t{format_size(r['bytes'])}\t{r['elapsed']:.1f}s"
+                            + (f"\t{r['mb_per_s']:.0f} MB/s" if r['mb_per_s'] else "")
+                            + (f"\t{r['error']}" if r['error'] else "") for r in results])
+    sys.exit(get_exit_code(results))
+
+@main.command('image')
+@click.argument('device')
+@click.argument('image', type=click.Path(dir_okay=False))
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON (progress goes to stderr)")
+def image_command(device, image, as_json):
+    """Copy DEVICE to a sparse IMAGE file ddrescue-style; IMAGE.map records progress, so re-running resumes"""
+    info = lookup_drive(device) if not device.startswith('/dev/') else {'device': device}
+    device = info['device'] if info else device
+    board = ProgressBoard([device], sys.stderr if as_json else None)
+    result = image_device_any(device, image, board.update)
+    board.finish()
+    emit([result], as_json, [f"{result['device']}\t{result['status']}\t{format_size(result['rescued'])} of "
+                             f"{format_size(result['bytes'])}\t{result['elapsed']:.1f}s"
+                             + (f"\t{result['mb_per_s']:.0f} MB/s" if result['mb_per_s'] else "")
+                             + (f"\t{result['error']}" if result['error'] else "")])
+    sys.exit(get_exit_code([result]))
+
+@main.command('status')
+@click.option('--json', 'as_json', is_flag=True, help="Output JSON")
+def status_command(as_json):
+    """Summary of drives and mounts"""
+    inventory = get_inventory()
+    speeds = load_speed_cache()
+    records = [drive_record(info, speeds) for info in inventory.get().values()]
+    by_type = {}
+    for r in records:
+        by_type[r['type']] = by_type.get(r['type'], 0) + 1
+    status = {
+        'version': VERSION,
+        'drives': len(records),
+        'mounted': sum(1 for r in records if r['mounted']),
+        'by_type': by_type,
+        'inventory': inventory.stats(),
+    }
+    emit(status, as_json, [f"{key}: {value}" for key, value in status.items()])
+
 if __name__ == '__main__':
     main()
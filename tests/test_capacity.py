@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+import mount_drive
+
+
+def make_disk(tmp_path, size=64 << 20):
+    path = tmp_path / 'disk.img'
+    with open(path, 'wb') as f:
+        for _ in range(size >> 20):
+            f.write(os.urandom(1 << 20))
+    return str(path)
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_real_capacity_is_verified_and_data_restored(tmp_path):
+    disk = make_disk(tmp_path)
+    before = digest(disk)
+    claimed, verified = mount_drive.CapacityProbe(disk).run(samples=16)
+    assert claimed == verified == 64 << 20
+    assert digest(disk) == before
+
+
+def test_wraparound_is_found_by_bisection(tmp_path, monkeypatch):
+    disk = make_disk(tmp_path)
+    real = 16 << 20
+    preadv, pwritev = os.preadv, os.pwritev
+    # A fake 64 MiB stick that only has 16 MiB: high address bits are ignored
+    monkeypatch.setattr(os, 'preadv', lambda fd, bufs, offset: preadv(fd, bufs, offset % real))
+    monkeypatch.setattr(os, 'pwritev', lambda fd, bufs, offset: pwritev(fd, bufs, offset % real))
+    probe = mount_drive.CapacityProbe(disk)
+    claimed, verified = probe.run(samples=16)
+    assert claimed == 64 << 20
+    assert real - mount_drive.CAPACITY_RESOLUTION <= verified <= real
+    assert probe.failure == 'wraparound'
+
+
+def test_block_is_not_restored_from_a_short_save(tmp_path, monkeypatch):
+    disk = make_disk(tmp_path)
+    before = digest(disk)
+    preadv = os.preadv
+    writes = []
+    monkeypatch.setattr(os, 'preadv', lambda fd, bufs, offset: preadv(fd, bufs, offset) // 2)
+    monkeypatch.setattr(os, 'pwritev', lambda fd, bufs, offset: writes.append(offset))
+    probe = mount_drive.CapacityProbe(disk)
+    probe.fd = os.open(disk, os.O_RDWR)
+    try:
+        probe.buf, probe.saved = bytearray(mount_drive.CAPACITY_BLOCK), bytearray(mount_drive.CAPACITY_BLOCK)
+        assert not probe.test(1 << 20)
+    finally:
+        os.close(probe.fd)
+    assert writes == [] and probe.failure == 'I/O errors'
+    assert digest(disk) == before
@@ -0,0 +1,112 @@
+import pytest
+
+import mount_drive
+
+CALLER = (1000, 1000)
+
+
+@pytest.fixture(autouse=True)
+def fake_devices(monkeypatch):
+    monkeypatch.setattr(mount_drive, 'check_block_device', lambda path: path)
+    monkeypatch.setattr(mount_drive, 'get_parent_disk_name', lambda name: name.rstrip('0123456789'))
+    monkeypatch.setattr(mount_drive, 'get_system_disks', lambda: {'/dev/sda'})
+
+
+def mount_op(options=None):
+    op = {'op': 'mount', 'fstype': 'vfat', 'source': '/dev/sdb1', 'target': '/media/user/STICK'}
+    if options is not None:
+        op['options'] = options
+    return op
+
+
+def test_mount_forces_nosuid_nodev():
+    cmd = mount_drive.helper_op_command(mount_op('noatime,uid=1000,gid=1000'), CALLER)
+    assert cmd[cmd.index('-o') + 1] == 'noatime,uid=1000,gid=1000,nosuid,nodev'
+
+
+def test_mount_without_options_still_gets_nosuid_nodev():
+    cmd = mount_drive.helper_op_command(mount_op(), CALLER)
+    assert cmd[cmd.index('-o') + 1] == 'nosuid,nodev'
+
+
+@pytest.mark.parametrize('options', ['suid', 'dev', 'exec', 'noatime,suid', 'loop', 'x-foo', 'iocharset=utf8;id',
+                                     'uid=0', 'gid=0', 'uid=abc'])
+def test_mount_rejects_options_off_the_allow_list(options):
+    with pytest.raises(ValueError):
+        mount_drive.helper_op_command(mount_op(options), CALLER)
+
+
+def test_mount_rejects_unknown_fstype_and_paths_outside_media():
+    with pytest.raises(ValueError):
+        mount_drive.helper_op_command(dict(mount_op(), fstype='nfs'), CALLER)
+    with pytest.raises(ValueError):
+        mount_drive.helper_op_command(dict(mount_op(), target='/etc'), CALLER)
+
+
+def test_chown_only_to_caller():
+    op = {'op': 'chown', 'path': '/media/user/STICK', 'uid': 1000, 'gid': 1000}
+    assert mount_drive.helper_op_command(op, CALLER)[1] == '1000:1000'
+    for uid, gid in ((0, 0), (1000, 0), (1001, 1000)):
+        with pytest.raises(ValueError):
+            mount_drive.helper_op_command(dict(op, uid=uid, gid=gid), CALLER)
+
+
+def test_probe_bounds_and_system_disks():
+    op = {'op': 'probe', 'device': '/dev/sdb', 'offset': 0, 'length': 4096}
+    assert mount_drive.helper_op_command(op, CALLER)[0] == 'dd'
+    for bad in ({'device': '/dev/sda'}, {'device': '/dev/sda2'}, {'length': 0}, {'offset': -1},
+                {'length': mount_drive.HELPER_MAX_PROBE + 1}):
+        with pytest.raises(ValueError):
+            mount_drive.helper_op_command(dict(op, **bad), CALLER)
+
+
+def test_unknown_op_rejected_and_batch_stops_after_failure():
+    with pytest.raises(ValueError):
+        mount_drive.helper_op_command({'op': 'rm', 'path': '/'}, CALLER)
+    results = mount_drive.run_op_batch([{'op': 'rm'}, {'op': 'mkdir', 'path': '/media/user/X'}],
+                                       lambda op: mount_drive.run_helper_op(op, CALLER))
+    assert not results[0]['ok'] and results[1]['error'] == 'skipped after earlier failure'
+
+
+@pytest.fixture
+def sudo_calls(monkeypatch):
+    """Run as a user without the helper; record sudo invocations, refusing sudo -v"""
+    calls = []
+
+    def run_command(cmd, **kwargs):
+        calls.append(cmd)
+        return type('Proc', (), {'returncode': 1 if cmd == ['sudo', '-v'] else 0, 'stderr': b''})()
+    monkeypatch.setattr(mount_drive.os, 'geteuid', lambda: 1000)
+    monkeypatch.delenv('DRIVE_MASTER_HELPER', raising=False)
+    monkeypatch.setattr(mount_drive, 'run_command', run_command)
+    return calls
+
+
+def test_bulk_operations_ask_for_sudo_once_and_abort_when_refused(sudo_calls, monkeypatch):
+    monkeypatch.setattr(mount_drive, 'get_user', lambda: 'user')
+    drives = {f"/dev/sd{c}1": {'device': f"/dev/sd{c}1", 'label': c.upper(), 'parent': f"/dev/sd{c}",
+                               'mountpoint': None, 'fstype': 'vfat', 'size': '8G'} for c in 'bcd'}
+    results = mount_drive.mount_all_parallel(drives, workers=4)
+    assert [r['status'] for r in results] == ['failed'] * 3 and results[0]['error'] == mount_drive.SUDO_FAILED
+    targets = {f"/media/user/{c}": (c, f"/dev/sd{c}1") for c in 'BC'}
+    assert {r['error'] for r in mount_drive.unmount_in_order(targets, workers=4)} == {mount_drive.SUDO_FAILED}
+    results = mount_drive.format_all_parallel(drives, 'ext4', 'KIT{n}', workers=4)
+    assert {r['status'] for r in results} == {'failed'}
+    assert sudo_calls == [['sudo', '-v']] * 3
+
+
+def test_single_job_needs_no_sudo_priming(sudo_calls):
+    assert mount_drive.prime_sudo(1)
+    assert not mount_drive.prime_sudo(4)
+    assert sudo_calls == [['sudo', '-v']]
+
+
+def test_mount_ui_handles_a_drive_mounted_meanwhile(monkeypatch, capsys):
+    info = {'device': '/dev/sdb1', 'mountpoint': None, 'fstype': 'ntfs'}
+    checks = iter([False, True])
+    monkeypatch.setattr(mount_drive, 'get_user', lambda: 'user')
+    monkeypatch.setattr(mount_drive, 'is_drive_mounted', lambda info: next(checks))
+    monkeypatch.setattr(mount_drive.get_mount_table(), 'mountpoint_of', lambda device: '/mnt/elsewhere')
+    monkeypatch.setattr(mount_drive.metrics, 'observe_result', lambda *a, **k: None)
+    assert mount_drive.mount_drive_enhanced(info, 'DATA')
+    assert 'already mounted at /mnt/elsewhere' in capsys.readouterr().out
@@ -0,0 +1,128 @@
+import os
+import random
+
+import pytest
+
+import mount_drive
+from mount_drive import ImageMap
+
+MIB = 1 << 20
+
+
+def recount(imap):
+    counts = {}
+    for _, length, status in imap.areas:
+        counts[status] = counts.get(status, 0) + length
+    return counts
+
+
+def test_mark_splits_and_merges_areas():
+    imap = ImageMap(100)
+    imap.mark(10, 10, '+')
+    assert imap.areas == [[0, 10, '?'], [10, 10, '+'], [20, 80, '?']]
+    imap.mark(0, 10, '+')
+    assert imap.areas == [[0, 20, '+'], [20, 80, '?']]
+    imap.mark(15, 70, '-')
+    assert imap.areas == [[0, 15, '+'], [15, 70, '-'], [85, 15, '?']]
+    imap.mark(85, 15, '-')
+    assert imap.areas == [[0, 15, '+'], [15, 85, '-']]
+    assert imap.count('+') == 15 and imap.count('-?') == 85
+    assert imap.find('-') == [(15, 85)]
+
+
+def test_running_counts_match_the_areas():
+    rng = random.Random(7)
+    imap = ImageMap(1 << 16)
+    for _ in range(2000):
+        pos = rng.randrange(imap.size)
+        imap.mark(pos, rng.randint(1, min(4096, imap.size - pos)), rng.choice('?*/-+'))
+        assert {s: n for s, n in imap.counts.items() if n} == recount(imap)
+    assert all(a[2] != b[2] and a[0] + a[1] == b[0] for a, b in zip(imap.areas, imap.areas[1:]))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'disk.img.map')
+    imap = ImageMap(8 * MIB)
+    imap.mark(MIB, 4096, '-')
+    imap.mark(0, MIB, '+')
+    imap.pos, imap.status, imap.pass_no = MIB + 4096, '*', 3
+    imap.save(path)
+    loaded = ImageMap.load(path, 8 * MIB)
+    assert loaded.areas == imap.areas and loaded.counts == recount(imap)
+    assert (loaded.pos, loaded.status, loaded.pass_no) == (MIB + 4096, '*', 3)
+    assert ImageMap.load(path, 4 * MIB) is None
+    assert ImageMap.load(str(tmp_path / 'missing.map'), 8 * MIB) is None
+    assert os.listdir(tmp_path) == ['disk.img.map']
+
+
+def test_load_rejects_gaps(tmp_path):
+    path = tmp_path / 'disk.img.map'
+    path.write_text("0x00000000 ? 1\n0x00000000 0x00000100 +\n0x00000200 0x00000100 ?\n")
+    assert ImageMap.load(str(path), 0x300) is None
+
+
+@pytest.fixture
+def failing_source(tmp_path, monkeypatch):
+    """8 MiB of random data whose reads fail (EIO) while they touch a bad range"""
+    source = tmp_path / 'source'
+    data = random.Random(1).randbytes(8 * MIB)
+    data = data[:2 * MIB] + bytes(MIB) + data[3 * MIB:]
+    source.write_bytes(data)
+    bad = [(5 * MIB + 4096, 1024)]
+    preadv = os.preadv
+
+    def flaky_preadv(fd, buffers, offset):
+        if os.readlink(f"/proc/self/fd/{fd}") == str(source):
+            length = sum(len(b) for b in buffers)
+            if any(offset < start + size and start < offset + length for start, size in bad):
+                raise OSError(5, "Input/output error")
+        return preadv(fd, buffers, offset)
+    monkeypatch.setattr(mount_drive.os, 'preadv', flaky_preadv)
+    return str(source), data, bad
+
+
+def test_image_rescues_all_but_bad_sectors(tmp_path, failing_source):
+    source, data, bad = failing_source
+    image = str(tmp_path / 'disk.img')
+    result = mount_drive.image_device(source, image)
+    assert result['status'] == 'partial' and not result['resumed']
+    assert (result['bad_bytes'], result['bad_areas'], result['rescued']) == (1024, 1, len(data) - 1024)
+    copy = open(image, 'rb').read()
+    start, size = bad[0]
+    assert copy[:start] == data[:start] and copy[start + size:] == data[start + size:]
+    assert copy[start:start + size] == bytes(size)
+    # The all-zero stretch was left as a hole
+    assert os.stat(image).st_blocks * 512 < len(data)
+    imap = ImageMap.load(image + '.map', len(data))
+    assert imap.find('-') == bad and imap.counts == recount(imap)
+
+
+def test_resume_retries_only_the_bad_areas(tmp_path, failing_source, monkeypatch):
+    source, data, bad = failing_source
+    image = str(tmp_path / 'disk.img')
+    mount_drive.image_device(source, image)
+    (start, _), = bad
+    bad.clear()
+    reads = []
+    preadv = mount_drive.os.preadv
+    monkeypatch.setattr(mount_drive.os, 'preadv',
+                        lambda fd, buffers, offset: reads.append(offset) or preadv(fd, buffers, offset))
+    result = mount_drive.image_device(source, image)
+    assert result['status'] == 'imaged' and result['resumed']
+    # open_direct()'s probe of offset 0, then the two bad sectors
+    assert reads == [0, start, start + 512] and open(image, 'rb').read() == data
+
+
+@pytest.mark.parametrize('damage', ['delete', 'truncate'])
+def test_map_is_ignored_without_a_matching_image(tmp_path, failing_source, damage):
+    source, data, bad = failing_source
+    image = str(tmp_path / 'disk.img')
+    mount_drive.image_device(source, image)
+    bad.clear()
+    if damage == 'delete':
+        os.unlink(image)
+    else:
+        os.truncate(image, MIB)
+    result = mount_drive.image_device(source, image)
+    assert result['status'] == 'imaged' and not result['resumed']
+    assert open(image, 'rb').read() == data
@@ -0,0 +1,19 @@
+from mount_drive import Metrics
+
+
+def test_first_menu_is_a_gauge_not_an_operation(tmp_path):
+    path = str(tmp_path / 'drive_master.prom')
+    old = Metrics()
+    old.observe('first_menu', 0.5, True, driver='scan')
+    old.observe('mount', 0.2, True, fstype='ntfs')
+    old.set_gauge('drive_master_first_menu_seconds', 0.5, source='scan')
+    old.write(path)
+
+    metrics = Metrics()
+    metrics.load(path)
+    metrics.set_gauge('drive_master_first_menu_seconds', 0.03, source='scan')
+    samples = metrics.samples()
+    assert samples['drive_master_first_menu_seconds{source="scan"}'] == 0.03
+    assert not any('first_menu' in name for name in samples if name.startswith('drive_master_operation'))
+    assert samples['drive_master_operations_total{op="mount",fstype="ntfs",transport="unknown",driver="unknown",result="ok"}'] == 1
+    assert '# TYPE drive_master_first_menu_seconds gauge' in metrics.render()
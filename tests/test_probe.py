@@ -0,0 +1,257 @@
+import os
+import shutil
+import subprocess
+import struct
+
+import pytest
+
+import benchmark
+import mount_drive
+
+SECTOR = 512
+
+
+@pytest.fixture
+def disk_dir(tmp_path, monkeypatch):
+    """Point the prober at tmp_path: /dev/<name> reads tmp_path/<name>, no sysfs (512-byte sectors)"""
+    monkeypatch.setattr(mount_drive, 'DEV_DIR', str(tmp_path))
+    monkeypatch.setattr(mount_drive, 'SYS_BLOCK', str(tmp_path / 'sys'))
+    monkeypatch.setattr(mount_drive, 'SYS_CLASS_BLOCK', str(tmp_path / 'sys'))
+    return tmp_path
+
+
+def fat32_boot(label, serial, sectors):
+    boot = bytearray(512)
+    boot[0:11] = b'\xebX\x90MSDOS5.0'
+    struct.pack_into('<HB', boot, 11, SECTOR, 8)
+    struct.pack_into('<I', boot, 0x20, sectors)
+    struct.pack_into('<I', boot, 0x43, serial)
+    boot[0x47:0x52] = label.encode().ljust(11)
+    boot[0x52:0x5A] = b'FAT32   '
+    boot[510:512] = b'\x55\xaa'
+    return boot
+
+
+def exfat_boot(label, serial, sectors):
+    """Boot sector plus (offset, root directory cluster holding the label entry)"""
+    boot = bytearray(512)
+    boot[0:11] = b'\xebv\x90EXFAT   '
+    struct.pack_into('<Q', boot, 0x48, sectors)
+    struct.pack_into('<III', boot, 0x58, 2048, 4, serial)
+    boot[0x6C], boot[0x6D] = 9, 3
+    boot[510:512] = b'\x55\xaa'
+    root = bytearray(4096)
+    name = label.encode('utf-16-le')
+    root[0], root[1], root[2:2 + len(name)] = 0x83, len(label), name
+    return boot, (2048 << 9) + 2 * 4096, root
+
+
+def ext4_superblock(label, blocks):
+    head = bytearray(2048)
+    sb = memoryview(head)[1024:]
+    struct.pack_into('<I', sb, 0x04, blocks)
+    struct.pack_into('<I', sb, 0x18, 2)
+    struct.pack_into('<H', sb, 0x38, mount_drive.EXT_MAGIC)
+    struct.pack_into('<III', sb, 0x5C, 0x4, 0x40, 0)
+    sb[0x68:0x78] = bytes(range(16))
+    sb[0x78:0x78 + len(label)] = label.encode()
+    return head
+
+
+def mbr(entries):
+    """Sector with up to four (boot, type, start LBA, sectors) slots"""
+    sector = bytearray(512)
+    for i, (boot, ptype, start, sectors) in enumerate(entries):
+        struct.pack_into('<B3xB3xII', sector, 446 + i * 16, boot, ptype, start, sectors)
+    sector[510:512] = b'\x55\xaa'
+    return sector
+
+
+def write_image(path, size, chunks):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        for offset, data in chunks:
+            f.seek(offset)
+            f.write(data)
+
+
+def volumes(probe):
+    return {device: (fs or {}).get('type') and (fs['type'], fs['label'])
+            for device, (_, fs) in mount_drive.get_probed_volumes(probe).items()}
+
+
+def test_gpt_with_ntfs_labels(disk_dir):
+    sectors = 1 << 16
+    benchmark.build_disk_image(str(disk_dir / 'sdx'), sectors, [(2048, 8192, 0x1234, 'DATA'), (10240, 8192, 0x5678, 'GAMES')])
+    probe = mount_drive.probe_disk('/dev/sdx')
+    assert probe['error'] is None and probe['table'] == 'gpt'
+    assert [(p['number'], p['start'], p['size']) for p in probe['partitions']] == [(1, 2048 * SECTOR, 8192 * SECTOR),
+                                                                                  (2, 10240 * SECTOR, 8192 * SECTOR)]
+    assert volumes(probe) == {'/dev/sdx1': ('ntfs', 'DATA'), '/dev/sdx2': ('ntfs', 'GAMES')}
+    assert probe['partitions'][0]['fs']['uuid'] == '0000000000001234'
+
+
+def test_gpt_falls_back_to_backup_header(disk_dir):
+    sectors = 1 << 16
+    path = disk_dir / 'sdx'
+    benchmark.build_disk_image(str(path), sectors, [(2048, 8192, 1, 'DATA')])
+    with open(path, 'r+b') as f:
+        f.seek(SECTOR)
+        f.write(bytes(SECTOR))
+    head = path.read_bytes()[:mount_drive.PROBE_HEAD_BYTES]
+    backup = path.read_bytes()[(sectors - 1) * SECTOR:sectors * SECTOR]
+    table, parts = mount_drive.read_partition_table('/dev/sdx', head, backup, SECTOR)
+    assert table == 'gpt' and [p['start'] for p in parts] == [2048 * SECTOR]
+
+
+def test_gpt_header_crc_is_checked():
+    header = bytearray(benchmark.gpt_header(1 << 16, 1, (1 << 16) - 1, 2, 0, bytes(16)))
+    assert mount_drive.parse_gpt_header(bytes(header))
+    header[40] ^= 1
+    assert mount_drive.parse_gpt_header(bytes(header)) is None
+
+
+def test_mbr_with_extended_partition_chain(disk_dir):
+    ext_start = 40960
+    chunks = [(0, mbr([(0x80, 0x0c, 2048, 16384), (0, 0x05, ext_start, 40960)])),
+              (2048 * SECTOR, fat32_boot('STICK', 0xABCD1234, 16384)),
+              # Logical 5 at ext+63, link to the next EBR at ext+20480; logical 6 at that EBR+63
+              (ext_start * SECTOR, mbr([(0, 0x83, 63, 10000), (0, 0x05, 20480, 20480)])),
+              ((ext_start + 63) * SECTOR, ext4_superblock('home', 1000)),
+              ((ext_start + 20480) * SECTOR, mbr([(0, 0x07, 63, 8192)])),
+              ((ext_start + 20480 + 63) * SECTOR, benchmark.ntfs_volume(8192, 7, 'X')[0])]
+    write_image(disk_dir / 'sdx', 100000 * SECTOR, chunks)
+    probe = mount_drive.probe_disk('/dev/sdx')
+    assert probe['table'] == 'dos'
+    assert [(p['number'], p['start'] // SECTOR, p['bootable']) for p in probe['partitions']] == [
+        (1, 2048, True), (5, ext_start + 63, False), (6, ext_start + 20480 + 63, False)]
+    found = volumes(probe)
+    assert found['/dev/sdx1'] == ('vfat', 'STICK')
+    assert found['/dev/sdx5'] == ('ext4', 'home')
+    assert found['/dev/sdx6'][0] == 'ntfs'
+    assert probe['partitions'][0]['fs']['uuid'] == 'ABCD-1234'
+
+
+def test_superfloppy_is_one_volume_not_a_partition_table(disk_dir):
+    boot = fat32_boot('FLOPPY', 0x11112222, 65536)
+    # Boot code that happens to look like partition slots
+    boot[446:510] = bytes(range(1, 65))
+    write_image(disk_dir / 'sdx', 65536 * SECTOR, [(0, boot)])
+    assert mount_drive.parse_mbr_entries(boot)
+    probe = mount_drive.probe_disk('/dev/sdx')
+    assert probe['table'] is None and probe['partitions'] == []
+    assert volumes(probe) == {'/dev/sdx': ('vfat', 'FLOPPY')}
+
+
+def test_exfat_label_from_root_directory(disk_dir):
+    boot, label_offset, root = exfat_boot('CAMERA', 0x0102ABCD, 1 << 20)
+    write_image(disk_dir / 'sdx', (1 << 20) * SECTOR, [(0, boot), (label_offset, root)])
+    probe = mount_drive.probe_disk('/dev/sdx')
+    assert probe['table'] is None
+    assert probe['fs']['type'] == 'exfat' and probe['fs']['label'] == 'CAMERA' and probe['fs']['uuid'] == '0102-ABCD'
+
+
+def test_signatures():
+    assert mount_drive.parse_fs_signature(bytes(4096)) is None
+    ext = mount_drive.parse_fs_signature(bytes(ext4_superblock('root', 1000)))
+    assert ext == {'type': 'ext4', 'label': 'root', 'uuid': '00010203-0405-0607-0809-0a0b0c0d0e0f', 'size': 4096000}
+    fat = fat32_boot('NO NAME', 1, 100)
+    assert mount_drive.parse_fs_signature(bytes(fat))['label'] is None
+    boot, record_offset, record = benchmark.ntfs_volume(8192, 0xFEED, 'Windows')
+    fs = mount_drive.parse_fs_signature(boot)
+    assert fs['type'] == 'ntfs' and fs['size'] == 8191 * SECTOR and fs['label_at'][0] == record_offset
+    assert mount_drive.parse_fs_label(fs, record) == 'Windows'
+
+
+def test_unreadable_disk_is_not_read_through_sudo_on_scanner_threads(disk_dir, monkeypatch):
+    write_image(disk_dir / 'sdx', 1 << 20, [])
+    monkeypatch.setattr(mount_drive.os, 'access', lambda path, mode: False)
+    monkeypatch.setattr(mount_drive, 'run_command', lambda *a, **k: pytest.fail("sudo from a scanner thread"))
+    monkeypatch.setattr(mount_drive._helper, 'running', lambda: False)
+    assert mount_drive.read_device_ranges('/dev/sdx', [(0, 512), (4096, 512)]) == [b'', b'']
+
+
+def test_unreadable_disk_is_read_in_one_helper_request(disk_dir, monkeypatch):
+    write_image(disk_dir / 'sdx', 1 << 20, [(4096, b'abc')])
+    calls = []
+
+    def call(ops):
+        calls.append(ops)
+        return [mount_drive.run_helper_op(op, (os.getuid(), os.getgid())) for op in ops]
+    monkeypatch.setattr(mount_drive.os, 'access', lambda path, mode: False)
+    monkeypatch.setattr(mount_drive._helper, 'running', lambda: True)
+    monkeypatch.setattr(mount_drive._helper, 'call', call)
+    monkeypatch.setattr(mount_drive, 'check_probe_device', lambda path: path)
+    assert mount_drive.read_device_ranges('/dev/sdx', [(0, 4), (4096, 3)]) == [b'\0' * 4, b'abc']
+    assert len(calls) == 1 and len(calls[0]) == 2
+
+
+def test_probe_disks_reprobes_unreadable_disks_in_one_sudo_call(disk_dir, monkeypatch):
+    for name in ('sdx', 'sdy'):
+        write_image(disk_dir / name, 1 << 20, [])
+    commands = []
+
+    def run_on_devices(command, devices, run_one, fields, **kwargs):
+        commands.append((command, list(devices)))
+        return [mount_drive.device_result(device, 'success', None, fields) for device in devices]
+    monkeypatch.setattr(mount_drive.os, 'access', lambda path, mode: False)
+    monkeypatch.setattr(mount_drive.os, 'geteuid', lambda: 1000)
+    monkeypatch.setattr(mount_drive, 'run_on_devices', run_on_devices)
+    probes = mount_drive.probe_disks(['/dev/sdx', '/dev/sdy'])
+    assert commands == [('probe', ['/dev/sdx', '/dev/sdy'])]
+    assert set(probes) == {'/dev/sdx', '/dev/sdy'}
+
+
+def test_parse_selection():
+    assert mount_drive.parse_selection('1,3,5-7', 9) == [0, 2, 4, 5, 6]
+    assert mount_drive.parse_selection(' ALL ', 3) == [0, 1, 2]
+    assert mount_drive.parse_selection('2,2,1-2', 3) == [1, 0]
+    for bad in ('0', '4', '1-9', 'x'):
+        with pytest.raises(ValueError):
+            mount_drive.parse_selection(bad, 3)
+
+
+def test_scan_deadline_from_environment(monkeypatch):
+    for value, expected in (('0.5', 0.5), ('abc', mount_drive.SCAN_DEADLINE), ('', mount_drive.SCAN_DEADLINE),
+                            ('-1', mount_drive.SCAN_DEADLINE), ('nan', mount_drive.SCAN_DEADLINE)):
+        monkeypatch.setenv('DRIVE_MASTER_SCAN_DEADLINE', value)
+        assert mount_drive.get_scan_deadline() == expected
+
+
+def test_ext4_labels_longer_than_16_bytes_are_rejected_before_mkfs(monkeypatch):
+    mount_drive.check_format_label('ext4', 'SIXTEEN_BYTES_OK')
+    mount_drive.check_format_label('vfat', 'A_VERY_LONG_FAT_LABEL')
+    with pytest.raises(ValueError):
+        mount_drive.check_format_label('ext4', 'SEVENTEEN_BYTES_X')
+    with pytest.raises(ValueError):
+        mount_drive.check_format_label('ext4', 'Ünïcödé_lábel')
+    monkeypatch.setattr(mount_drive, 'run_command', lambda *a, **k: pytest.fail("ran a command"))
+    monkeypatch.setattr(mount_drive, 'stream_command', lambda *a, **k: pytest.fail("ran mkfs"))
+    monkeypatch.setattr(mount_drive.metrics, 'observe_result', lambda *a: None)
+    result = mount_drive.format_drive_result({'device': '/dev/sdx1'}, 'ext4', 'SEVENTEEN_BYTES_X', profile='compat')
+    assert result['status'] == 'failed' and '16 bytes' in result['error']
+    with pytest.raises(ValueError):
+        mount_drive.format_all_parallel({'/dev/sdx1': {'device': '/dev/sdx1', 'size': '1G'}}, 'ext4', 'LONG_LABEL_{n:08d}')
+
+
+@pytest.mark.skipif(not shutil.which('mkfs.ext4'), reason="needs mkfs.ext4")
+def test_verify_format_reads_back_ext4_label(disk_dir):
+    path = disk_dir / 'sdx'
+    write_image(path, 8 << 20, [])
+    subprocess.run(['mkfs.ext4', '-q', '-F', '-L', 'SIXTEEN_BYTES_OK', str(path)], check=True)
+    assert mount_drive.verify_format('/dev/sdx', 'ext4', 'SIXTEEN_BYTES_OK') is None
+    assert 'label' in mount_drive.verify_format('/dev/sdx', 'ext4', 'OTHER')
+
+
+def test_failed_lsblk_fallback_is_reported_not_printed(disk_dir, monkeypatch, capsys):
+    def lsblk(*args, **kwargs):
+        raise subprocess.CalledProcessError(32, 'lsblk')
+    monkeypatch.setattr(mount_drive, 'check_output_command', lsblk)
+    with pytest.raises(subprocess.CalledProcessError):
+        mount_drive.get_probe_lsblk_drives()
+    inventory = mount_drive.DriveInventory()
+    inventory.source = 'test'
+    monkeypatch.setattr(inventory, 'save_snapshot', lambda: None)
+    dm = mount_drive.DriveMaster(inventory)
+    assert dm.drives() == [] and 'lsblk' in dm.error
+    assert capsys.readouterr().out == ''
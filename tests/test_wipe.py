@@ -0,0 +1,47 @@
+import pytest
+
+import mount_drive
+from mount_drive import DeviceWipe
+
+
+@pytest.fixture
+def device(tmp_path):
+    path = tmp_path / 'sdx'
+    path.write_bytes(b'\xaa' * (1 << 20))
+    return path
+
+
+def test_device_smaller_than_a_sample_block_is_read_back_whole(tmp_path):
+    path = tmp_path / 'tiny'
+    path.write_bytes(b'\xaa' * 1024)
+    result = mount_drive.wipe_device(str(path), 'zeros', threads=1)
+    assert result['status'] == 'wiped' and result['verified'] and result['samples'] == 1
+    assert path.read_bytes() == bytes(1024)
+
+
+def test_empty_device_has_nothing_to_verify(tmp_path):
+    path = tmp_path / 'empty'
+    path.write_bytes(b'')
+    wipe = DeviceWipe(str(path))
+    wipe.size = 0
+    assert wipe.verify() and wipe.samples == 0
+
+
+@pytest.mark.parametrize('caps, steps', [((True, True, True), ['secdiscard']), ((True, True, False), ['zeroout']),
+                                         ((True, False, False), ['zeros'])])
+def test_auto_only_tries_secure_discard_where_it_reads_back_as_zeroes(device, monkeypatch, caps, steps):
+    tried = []
+    monkeypatch.setattr(DeviceWipe, 'capabilities', lambda self: caps)
+    monkeypatch.setattr(DeviceWipe, 'ioctl_range', lambda self, fd, request, phase: tried.append(phase))
+    monkeypatch.setattr(DeviceWipe, 'overwrite', lambda self, pattern: tried.append(pattern))
+    monkeypatch.setattr(DeviceWipe, 'verify', lambda self: True)
+    assert DeviceWipe(str(device)).run() == steps[0] and tried == steps
+
+
+def test_forced_secure_discard_without_zeroes_is_not_verified(device, monkeypatch):
+    monkeypatch.setattr(DeviceWipe, 'capabilities', lambda self: (True, False, False))
+    monkeypatch.setattr(DeviceWipe, 'ioctl_range', lambda self, fd, request, phase: None)
+    monkeypatch.setattr(mount_drive, 'get_inventory', lambda: type('Inventory', (), {'invalidate': lambda self, d: None})())
+    result = mount_drive.wipe_device(str(device), 'secdiscard')
+    assert result['status'] == 'wiped' and not result['verified'] and result['samples'] == 0
+    assert 'discard' not in mount_drive.WIPE_METHODS